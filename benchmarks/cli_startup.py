@@ -0,0 +1,84 @@
+import sys
+from argparse import ArgumentParser
+from json import dumps
+from statistics import median
+from subprocess import DEVNULL, run as run_process
+from time import perf_counter
+
+
+COMMANDS = {
+    'python (baseline)': 'pass',
+    'import gcp_iac.cli': 'import gcp_iac.cli',
+    'giac --help': 'import sys; sys.argv = ["giac", "--help"]; from gcp_iac.cli import iac_parent; iac_parent()',
+}
+
+
+HEAVY_MODULES = ['ansible_runner', 'python_terraform', 'asyncio', 'gcp_iac.iac']
+
+
+def heavy_imports() -> list:
+    """Get the heavy modules that are loaded by giac --help. Only the apply and destroy code paths need them.
+
+    Returns:
+        list: names of the heavy modules loaded
+    """
+    code = (f'import sys; sys.argv = ["giac", "--help"]\nfrom gcp_iac.cli import iac_parent\ntry:\n    iac_parent()\n'
+            f'except SystemExit:\n    print("\\nloaded:" + ",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))')
+    rsp = run_process([sys.executable, '-c', code], capture_output=True, text=True)
+    return [name for name in rsp.stdout.rsplit('loaded:', 1)[-1].strip().split(',') if name]
+
+
+def check_budget(results: list, budget_ms: float) -> bool:
+    """Check that giac --help starts within the budget and loads none of the heavy modules
+
+    Args:
+        results (list): results of run()
+        budget_ms (float): max median wall time of giac --help in milliseconds
+
+    Returns:
+        bool: True if the budget is met, False otherwise
+    """
+    ok = True
+    for result in results:
+        if result['command'] == 'giac --help' and result['median_ms'] > budget_ms:
+            print(f'giac --help took {result["median_ms"]}ms, budget is {budget_ms}ms', file=sys.stderr)
+            ok = False
+    loaded = heavy_imports()
+    if loaded:
+        print(f'giac --help imported heavy modules: {", ".join(loaded)}', file=sys.stderr)
+        ok = False
+    return ok
+
+
+def run(repeat: int = 10) -> list:
+    """Measure the wall time of starting a fresh interpreter for the giac CLI
+
+    Args:
+        repeat (int, optional): number of runs per command. Defaults to 10.
+
+    Returns:
+        list: benchmark results
+    """
+    results = []
+    for name, code in COMMANDS.items():
+        times = []
+        for _ in range(repeat):
+            began = perf_counter()
+            rsp = run_process([sys.executable, '-c', code], stdout=DEVNULL, stderr=DEVNULL)
+            times.append(perf_counter() - began)
+        results.append({'command': name, 'returncode': rsp.returncode, 'runs': repeat,
+                        'median_ms': round(median(times) * 1000, 1), 'min_ms': round(min(times) * 1000, 1)})
+    return results
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmark giac CLI cold start')
+    parser.add_argument('-n', '--repeat', type=int, default=10)
+    parser.add_argument('-b', '--budget', type=float, help='Fail if giac --help median exceeds this many milliseconds '
+                        'or imports a heavy module')
+    args = parser.parse_args()
+    results = run(args.repeat)
+    for line in results:
+        print(dumps(line))
+    if args.budget and not check_budget(results, args.budget):
+        sys.exit(1)
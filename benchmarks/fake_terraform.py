@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Fake terraform executable for the offline benchmarks. It implements just enough of init, plan, show -json, apply,
+output -json and version for giac to run a full apply or destroy against a local terraform.tfstate.
+
+Instances are named docker-01..docker-NN and get the IP 127.0.0.<N> so the readiness prober can be pointed at local
+listener sockets. Environment variables:
+
+    FAKE_TF_LATENCY     seconds to sleep before every command (default 0)
+    FAKE_TF_COUNT       instance count when -var instance_count is not passed (default 1)
+    FAKE_TF_PADDING     bytes of extra attributes per resource in show -json output (default 2048)
+    FAKE_TF_STATE_BYTES bytes of attributes per instance in the show -json prior_state, about what a real
+                        google_compute_instance holds (default 8192)
+"""
+import sys
+from json import dumps, loads
+from os import environ
+from pathlib import Path
+from platform import machine, system
+from time import sleep
+from uuid import uuid4
+
+
+STATE_FILE = Path('terraform.tfstate')
+PROVIDER = 'registry.terraform.io/hashicorp/google'
+PROVIDER_VERSION = '6.8.0'
+
+
+def option(args: list, name: str) -> str | None:
+    """Get the value of a -name=value or -name value option"""
+    for index, arg in enumerate(args):
+        if arg.startswith(f'-{name}='):
+            return arg.split('=', 1)[1]
+        if arg == f'-{name}' and index + 1 < len(args):
+            return args[index + 1]
+    return None
+
+
+def positional(args: list) -> str:
+    """Get the last positional argument, such as the saved plan file"""
+    return [arg for arg in args if not arg.startswith('-')][-1]
+
+
+def variables(args: list) -> dict:
+    """Get the variables from -var-file files (JSON or simple key=value tfvars) and -var key=value options"""
+    values = {}
+    for index, arg in enumerate(args):
+        if arg.startswith('-var-file='):
+            text = Path(arg.split('=', 1)[1]).read_text()
+            if arg.endswith('.json'):
+                values.update({key: str(value) for key, value in loads(text).items()})
+                continue
+            lines = text.splitlines()
+        else:
+            lines = [arg[5:] if arg.startswith('-var=') else args[index + 1] if arg == '-var' else '']
+        for line in lines:
+            if '=' in line:
+                key, value = line.split('=', 1)
+                values[key.strip().strip('\'"')] = value.strip().strip('\'"')
+    return values
+
+
+def load_state() -> dict:
+    try:
+        return loads(STATE_FILE.read_text())
+    except FileNotFoundError:
+        return {'version': 4, 'serial': 0, 'lineage': str(uuid4()), 'outputs': {}, 'resources': []}
+
+
+def instances(state: dict) -> dict:
+    return state.get('outputs', {}).get('instances', {}).get('value', {})
+
+
+def resource_change(name: str, action: str) -> dict:
+    values = {'name': name, 'machine_type': 'e2-highcpu-2', 'zone': 'us-central1-a',
+              'metadata': {'startup-script': 'x' * int(environ.get('FAKE_TF_PADDING', '2048'))}}
+    return {
+        'address': f'google_compute_instance.vm_instance["{name}"]', 'mode': 'managed',
+        'type': 'google_compute_instance', 'name': 'vm_instance', 'index': name,
+        'change': {'actions': [action], 'before': values if action == 'delete' else None,
+                   'after': values if action == 'create' else None},
+    }
+
+
+def plan(args: list) -> int:
+    current = instances(load_state())
+    if '-destroy' in args or option(args, 'destroy') == 'true':
+        desired = []
+    else:
+        count = int(variables(args).get('instance_count', environ.get('FAKE_TF_COUNT', '1')))
+        desired = [f'docker-{index:02d}' for index in range(1, count + 1)]
+    changes = [resource_change(name, 'create') for name in desired if name not in current]
+    changes += [resource_change(name, 'delete') for name in current if name not in desired]
+    Path(option(args, 'out') or 'tfplan').write_text(dumps({'desired': desired, 'resource_changes': changes}))
+    return 2 if changes and '-detailed-exitcode' in args else 0
+
+
+def show(args: list) -> int:
+    """Print the saved plan like terraform show -json, with the prior state and configuration after resource_changes
+    as terraform writes them, so a reader that stops after resource_changes has to drain the rest of the pipe"""
+    saved = loads(Path(positional(args)).read_text())
+    padding = 'x' * int(environ.get('FAKE_TF_PADDING', '2048'))
+    attributes = 'x' * int(environ.get('FAKE_TF_STATE_BYTES', '8192'))
+    resources = [{'address': f'google_compute_instance.vm_instance["{name}"]', 'mode': 'managed',
+                  'type': 'google_compute_instance', 'name': 'vm_instance', 'index': name,
+                  'values': {'name': name, 'network_interface': [{'access_config': [{'nat_ip': ip}]}],
+                             'metadata': {'startup-script': attributes}}}
+                 for name, ip in instances(load_state()).items()]
+    configuration = {'provider_config': {'google': {'name': 'google', 'full_name': PROVIDER}},
+                     'root_module': {'resources': [{'address': 'google_compute_instance.vm_instance',
+                                                    'type': 'google_compute_instance', 'name': 'vm_instance',
+                                                    'expressions': {'metadata': {'constant_value': padding}}}]}}
+    print(dumps({'format_version': '1.2', 'terraform_version': '1.11.0', 'planned_values': {},
+                 'resource_changes': saved['resource_changes'],
+                 'prior_state': {'format_version': '1.0', 'values': {'root_module': {'resources': resources}}},
+                 'configuration': configuration}))
+    return 0
+
+
+def apply(args: list) -> int:
+    saved = loads(Path(positional(args)).read_text())
+    state = load_state()
+    state['serial'] += 1
+    hosts = {name: f'127.0.0.{int(name.split("-")[-1])}' for name in saved['desired']}
+    state['outputs'] = {'instances': {'value': hosts, 'type': ['map', 'string']}} if hosts else {}
+    STATE_FILE.write_text(dumps(state))
+    print(f'Apply complete! Resources: {len(saved["resource_changes"])} changed.')
+    return 0
+
+
+def output(args: list) -> int:
+    print(dumps({name: {**value, 'sensitive': False} for name, value in load_state().get('outputs', {}).items()}))
+    return 0
+
+
+def init(args: list) -> int:
+    platform = f'{system().lower()}_{ {"x86_64": "amd64", "aarch64": "arm64"}.get(machine(), machine())}'
+    package = Path('.terraform/providers', PROVIDER, PROVIDER_VERSION, platform)
+    package.mkdir(parents=True, exist_ok=True)
+    (package / f'terraform-provider-google_v{PROVIDER_VERSION}').write_bytes(b'\0' * 1024)
+    Path('.terraform.lock.hcl').write_text(f'provider "{PROVIDER}" {{\n  version = "{PROVIDER_VERSION}"\n}}\n')
+    return 0
+
+
+def main(argv: list) -> int:
+    sleep(float(environ.get('FAKE_TF_LATENCY', '0')))
+    if not argv:
+        return 1
+    commands = {'init': init, 'plan': plan, 'show': show, 'apply': apply, 'output': output}
+    if argv[0] in commands:
+        return commands[argv[0]](argv[1:])
+    if argv[0] == 'version':
+        print('Terraform v1.11.0')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,161 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from os import chmod, environ, pathsep
+from pathlib import Path
+from threading import Lock, Thread
+from time import sleep
+from types import ModuleType, SimpleNamespace
+from typing import Callable, Iterator
+
+
+FAKE_TASKS = [
+    ('Install and configure Docker', 'Install Docker CE'),
+    ('Install and configure Docker', 'Enable and start Docker service'),
+    ('Deploy Docker Compose App1 (nginx + php + mysql)', 'Copy web container files'),
+    ('Deploy Docker Compose App1 (nginx + php + mysql)', 'Deploy containers'),
+]
+
+
+def fake_ansible_runner(task_latency: float = 0.01, host_latency: Callable[[str], float] = None) -> ModuleType:
+    """Build a fake ansible_runner module. run() reads the hosts from the inventory file and runs every fake task on
+    them with a pool of forks workers. With the linear strategy (ANSIBLE_STRATEGY) every task waits for all hosts
+    before the next one starts, with the free strategy every host runs through its tasks on its own. It emits the
+    play, task, recap and status callbacks a real run would, then reports success.
+
+    Args:
+        task_latency (float, optional): seconds each fake task takes. Defaults to 0.01.
+        host_latency (Callable[[str], float], optional): seconds each fake task takes on a host. Defaults to None
+        (task_latency on every host).
+
+    Returns:
+        ModuleType: fake ansible_runner module
+    """
+    module = ModuleType('ansible_runner')
+
+    def run(event_handler=None, status_handler=None, inventory: str = None, forks: int = 5, envvars: dict = None,
+            **kwargs) -> SimpleNamespace:
+        hosts = [line.split()[0] for line in Path(inventory).read_text().splitlines() if 'ansible_host=' in line]
+        lock = Lock()
+
+        def emit(event: dict) -> None:
+            if event_handler:
+                with lock:
+                    event_handler(event)
+
+        def run_task(host: str, play_name: str, task: str) -> None:
+            latency = host_latency(host) if host_latency else task_latency
+            sleep(latency)
+            emit({'event': 'runner_on_ok', 'event_data': {
+                'host': host, 'play': play_name, 'task': task, 'duration': latency, 'res': {'changed': True}}})
+
+        def run_host(host: str) -> None:
+            for play_name, task in FAKE_TASKS:
+                run_task(host, play_name, task)
+
+        if status_handler:
+            status_handler({'status': 'starting'}, runner_config=None)
+        with ThreadPoolExecutor(max_workers=forks) as pool:
+            if (envvars or {}).get('ANSIBLE_STRATEGY') == 'free':
+                emit({'event': 'playbook_on_play_start', 'event_data': {'play': FAKE_TASKS[0][0]}})
+                list(pool.map(run_host, hosts))
+            else:
+                play = None
+                for play_name, task in FAKE_TASKS:
+                    if play_name != play:
+                        emit({'event': 'playbook_on_play_start', 'event_data': {'play': play_name}})
+                    play = play_name
+                    list(pool.map(run_task, hosts, [play_name] * len(hosts), [task] * len(hosts)))
+        stats = {'ok': {host: len(FAKE_TASKS) for host in hosts}, 'failures': {}, 'dark': {},
+                 'processed': {host: 1 for host in hosts}}
+        emit({'event': 'playbook_on_stats', 'event_data': stats})
+        if status_handler:
+            status_handler({'status': 'successful'}, runner_config=None)
+        return SimpleNamespace(rc=0, status='successful', stats=stats)
+
+    module.run = run
+    return module
+
+
+def install_fake_ansible_runner(task_latency: float = 0.01, host_latency: Callable[[str], float] = None) -> None:
+    """Replace ansible_runner in sys.modules with the fake. Must be called before gcp_iac.iac is imported.
+
+    Args:
+        task_latency (float, optional): seconds each fake task takes. Defaults to 0.01.
+        host_latency (Callable[[str], float], optional): seconds each fake task takes on a host. Defaults to None
+        (task_latency on every host).
+    """
+    sys.modules['ansible_runner'] = fake_ansible_runner(task_latency, host_latency)
+
+
+def install_fake_terraform(bin_dir: Path, latency: float = 0.0) -> None:
+    """Write a terraform wrapper running fake_terraform.py into bin_dir and put bin_dir first on PATH
+
+    Args:
+        bin_dir (Path): directory to write the terraform executable to
+        latency (float, optional): seconds every terraform command takes. Defaults to 0.0.
+    """
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    script = bin_dir / 'terraform'
+    script.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{Path(__file__).parent / "fake_terraform.py"}" "$@"\n')
+    chmod(script, 0o755)
+    environ['PATH'] = f'{bin_dir}{pathsep}{environ.get("PATH", "")}'
+    environ['FAKE_TF_LATENCY'] = str(latency)
+
+
+def install_fake_ssh(bin_dir: Path) -> None:
+    """Write an ssh wrapper into bin_dir that runs the remote command on this machine instead, and put bin_dir first
+    on PATH. Only commands are supported, not ControlMaster or -O control requests.
+
+    Args:
+        bin_dir (Path): directory to write the ssh executable to
+    """
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    script = bin_dir / 'ssh'
+    script.write_text('#!/bin/sh\nfor arg; do command="$arg"; done\nexec sh -c "$command"\n')
+    chmod(script, 0o755)
+    environ['PATH'] = f'{bin_dir}{pathsep}{environ.get("PATH", "")}'
+
+
+@contextmanager
+def banner_servers(count: int, banner: bytes = b'SSH-2.0-OpenSSH_9.6\r\n') -> Iterator[tuple]:
+    """Run SSH banner listeners on 127.0.0.1..127.0.0.<count>, all on the same port, in a background event loop
+
+    Args:
+        count (int): number of listeners (max 254)
+        banner (bytes, optional): banner sent to each client. Defaults to an OpenSSH banner.
+
+    Yields:
+        tuple: (port, host name to IP address mapping)
+    """
+    loop = asyncio.new_event_loop()
+    thread = Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(banner)
+        await writer.drain()
+        writer.close()
+
+    async def start() -> tuple:
+        first = await asyncio.start_server(handle, '127.0.0.1', 0)
+        port = first.sockets[0].getsockname()[1]
+        servers = [first]
+        for index in range(2, count + 1):
+            servers.append(await asyncio.start_server(handle, f'127.0.0.{index}', port))
+        return port, servers
+
+    port, servers = asyncio.run_coroutine_threadsafe(start(), loop).result()
+    try:
+        yield port, {f'docker-{index:02d}': f'127.0.0.{index}' for index in range(1, count + 1)}
+    finally:
+        async def close() -> None:
+            for server in servers:
+                server.close()
+                await server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
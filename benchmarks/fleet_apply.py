@@ -0,0 +1,126 @@
+import logging
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from io import StringIO
+from json import dumps
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.fakes import banner_servers, install_fake_ansible_runner, install_fake_ssh, install_fake_terraform
+
+
+def bench_iac(root: Path, port: int, strategy: str = 'linear'):
+    """Create a GCPIaC whose package directories, state and records all live in a temporary root directory
+
+    Args:
+        root (Path): temporary root directory holding terraform/, ansible/ and env.tfvars
+        port (int): port the SSH banner listeners accept on
+        strategy (str, optional): Ansible strategy. Defaults to 'linear'.
+
+    Raises:
+        ImportError: if a dependency of gcp_iac.iac is missing
+
+    Returns:
+        GCPIaC: instance to apply with
+    """
+    from gcp_iac.iac import GCPIaC
+    from gcp_iac.inventory import Inventory
+    from gcp_iac.probe import ReadinessProber
+    from gcp_iac.task_history import TaskHistory
+    from gcp_iac.workspace import Workspace
+
+    class BenchIaC(GCPIaC):
+        def __init__(self):
+            self.root = root
+            log = logging.getLogger('giac-bench')
+            log.addHandler(logging.NullHandler())
+            log.propagate = False
+            super().__init__(log, ssh_lifetime=0, strategy=strategy)
+            self.prober = ReadinessProber(port=port, deadline=30.0, base_delay=0.05)
+            self.task_history = TaskHistory(f'{root}/task_history.json')
+            self.workspace = Workspace(package_dir=str(root))
+            self.inventory = Inventory(f'{root}/inventory.db')
+            self.startup_gate.marker = f'{root}/startup-done.marker'
+
+        @property
+        def env_vars_file(self) -> str:
+            return f'{self.root}/env.tfvars'
+
+        @property
+        def terraform_dir(self) -> str:
+            return f'{self.root}/terraform'
+
+        @property
+        def ansible_dir(self) -> str:
+            return f'{self.root}/ansible'
+
+    return BenchIaC()
+
+
+def prepare_root(root: Path, tf_latency: float = 0.05) -> None:
+    """Lay out a temporary root directory for bench_iac with the startup marker already there, and install the fake
+    terraform and ssh executables
+
+    Args:
+        root (Path): temporary root directory
+        tf_latency (float, optional): seconds every fake terraform command takes. Defaults to 0.05.
+    """
+    (root / 'terraform').mkdir()
+    (root / 'env.tfvars').write_text('project_id="bench"')
+    (root / 'startup-done.marker').touch()
+    install_fake_terraform(root / 'bin', tf_latency)
+    install_fake_ssh(root / 'bin')
+
+
+def run(counts: list = None, workers: int = 10, task_latency: float = 0.05, tf_latency: float = 0.05) -> list:
+    """Measure an end to end apply of a fleet using the fake terraform executable, the fake ansible_runner and SSH
+    banner listeners on loopback addresses. Every fleet is applied, applied again without changes and scaled up by one
+    host, which reads a plan whose prior state holds the whole fleet. Every run uses a fresh temporary working
+    directory so the package directories are never written to.
+
+    Args:
+        counts (list, optional): fleet sizes to measure. Defaults to [1, 2, 4, 8, 16, 32, 64].
+        workers (int, optional): max number of hosts configured at the same time. Defaults to 10.
+        task_latency (float, optional): seconds each fake Ansible task takes. Defaults to 0.05.
+        tf_latency (float, optional): seconds every fake terraform command takes. Defaults to 0.05.
+
+    Returns:
+        list: benchmark results
+    """
+    install_fake_ansible_runner(task_latency)
+    logging.getLogger('python_terraform').setLevel(logging.ERROR)
+    results = []
+    for count in counts or [1, 2, 4, 8, 16, 32, 64]:
+        with TemporaryDirectory() as tmp, banner_servers(count + 1) as (port, _):
+            root = Path(tmp)
+            prepare_root(root, tf_latency)
+            try:
+                iac = bench_iac(root, port)
+            except ImportError as error:
+                return [{'skipped': f'{error}'}]
+            with redirect_stdout(StringIO()):
+                began = perf_counter()
+                applied = iac.apply_terraform(count, workers)
+                elapsed = perf_counter() - began
+                began = perf_counter()
+                noop = iac.apply_terraform(count, workers)
+                noop_elapsed = perf_counter() - began
+                began = perf_counter()
+                scaled = iac.apply_terraform(count + 1, workers)
+                scale_elapsed = perf_counter() - began
+        results.append({'hosts': count, 'workers': workers, 'successful': applied and noop and scaled,
+                        'apply_seconds': round(elapsed, 3), 'noop_apply_seconds': round(noop_elapsed, 3),
+                        'scale_up_seconds': round(scale_elapsed, 3)})
+    return results
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmark end to end fleet apply scaling offline')
+    parser.add_argument('-c', '--counts', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64])
+    parser.add_argument('-W', '--workers', type=int, default=10)
+    parser.add_argument('-t', '--task-latency', type=float, default=0.05)
+    parser.add_argument('-l', '--tf-latency', type=float, default=0.05)
+    args = parser.parse_args()
+    for line in run(args.counts, args.workers, args.task_latency, args.tf_latency):
+        print(dumps(line))
@@ -0,0 +1,71 @@
+import logging
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from io import StringIO
+from json import dumps
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.fakes import banner_servers, install_fake_ansible_runner
+from benchmarks.fleet_apply import bench_iac, prepare_root
+from gcp_iac.parallelism import auto_forks
+
+
+def run(hosts: int = 32, forks: list = None, task_latency: float = 0.05, slow_factor: float = 8.0,
+        straggle: float = 0.05) -> list:
+    """Measure the wall time of a fleet apply against the number of Ansible forks with the linear and free strategies.
+    A fake task takes task_latency, but straggles and takes slow_factor times longer with probability straggle, like a
+    slow package mirror or a noisy neighbour. Every host draws its stragglers from its own seeded generator, so every
+    fork count and strategy sees the same stragglers. With the linear strategy every task waits for its slowest host,
+    with the free strategy a straggler only delays its own host.
+
+    Args:
+        hosts (int, optional): fleet size. Defaults to 32.
+        forks (list, optional): fork counts to measure. Defaults to [1, 2, 5, 10, 20, 32, 64] plus 0 (auto).
+        task_latency (float, optional): seconds a fake Ansible task takes. Defaults to 0.05.
+        slow_factor (float, optional): how many times slower a straggling task is. Defaults to 8.0.
+        straggle (float, optional): probability that a task straggles. Defaults to 0.05.
+
+    Returns:
+        list: benchmark results
+    """
+    rngs = {}
+
+    def host_latency(host: str) -> float:
+        rng = rngs.setdefault(host, Random(f'42-{host}'))
+        return task_latency * (slow_factor if rng.random() < straggle else 1)
+
+    install_fake_ansible_runner(task_latency, host_latency)
+    logging.getLogger('python_terraform').setLevel(logging.ERROR)
+    results = []
+    for strategy in ['linear', 'free']:
+        for count in forks or [1, 2, 5, 10, 20, 32, 64, 0]:
+            rngs.clear()
+            with TemporaryDirectory() as tmp, banner_servers(hosts) as (port, _):
+                root = Path(tmp)
+                prepare_root(root, 0.0)
+                try:
+                    iac = bench_iac(root, port, strategy)
+                except ImportError as error:
+                    return [{'skipped': f'{error}'}]
+                with redirect_stdout(StringIO()):
+                    began = perf_counter()
+                    applied = iac.apply_terraform(hosts, count)
+                    elapsed = perf_counter() - began
+            results.append({'hosts': hosts, 'strategy': strategy, 'forks': count or f'auto ({auto_forks(hosts)})',
+                            'successful': applied, 'apply_seconds': round(elapsed, 3)})
+    return results
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmark fleet apply wall time against Ansible forks and strategy offline')
+    parser.add_argument('-c', '--hosts', type=int, default=32)
+    parser.add_argument('-f', '--forks', type=int, nargs='+', help='0 measures the automatic fork count')
+    parser.add_argument('-t', '--task-latency', type=float, default=0.05)
+    parser.add_argument('-s', '--slow-factor', type=float, default=8.0)
+    parser.add_argument('-p', '--straggle', type=float, default=0.05)
+    args = parser.parse_args()
+    for line in run(args.hosts, args.forks, args.task_latency, args.slow_factor, args.straggle):
+        print(dumps(line))
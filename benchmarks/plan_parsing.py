@@ -0,0 +1,100 @@
+from argparse import ArgumentParser
+from tempfile import NamedTemporaryFile
+from json import dumps, loads
+from time import perf_counter
+from tracemalloc import get_traced_memory, start, stop
+
+from gcp_iac.plan_stream import PlanStream
+
+
+def synthetic_plan(resources: int) -> str:
+    """Build a terraform show -json document with the given number of instance resources. Every resource carries a
+    realistic amount of before/after attributes, planned values and prior state like a real plan does.
+
+    Args:
+        resources (int): number of resources in the plan
+
+    Returns:
+        str: plan JSON
+    """
+    def instance(index: int) -> dict:
+        return {
+            'name': f'docker-{index:05d}', 'machine_type': 'e2-highcpu-2', 'zone': 'us-central1-a',
+            'metadata': {'ssh-keys': 'ansible:ssh-rsa ' + 'A' * 700, 'startup-script': '#!/bin/bash\n' * 40},
+            'network_interface': [{'network': 'default', 'access_config': [{'nat_ip': f'10.0.{index // 256 % 256}.'
+                                                                            f'{index % 256}'}]}],
+            'tags': ['web', 'ssh'], 'labels': {f'label-{n}': 'value' for n in range(10)},
+        }
+
+    values = [instance(index) for index in range(resources)]
+    changes = [{
+        'address': f'google_compute_instance.vm_instance["docker-{index:05d}"]',
+        'type': 'google_compute_instance', 'name': 'vm_instance', 'index': f'docker-{index:05d}',
+        'change': {'actions': ['delete'], 'before': values[index], 'after': None},
+    } for index in range(resources)]
+    resources_values = [{'address': change['address'], 'values': value} for change, value in zip(changes, values)]
+    return dumps({
+        'format_version': '1.2', 'terraform_version': '1.11.0',
+        'planned_values': {'root_module': {}},
+        'resource_changes': changes,
+        'prior_state': {'values': {'root_module': {'resources': resources_values}}},
+    })
+
+
+def measure(name: str, parse) -> dict:
+    """Measure the wall time and peak traced memory of a parse function
+
+    Args:
+        name (str): parser name
+        parse (Callable[[], int]): function returning the number of parsed resource changes
+
+    Returns:
+        dict: benchmark result
+    """
+    start()
+    began = perf_counter()
+    changes = parse()
+    elapsed = perf_counter() - began
+    peak = get_traced_memory()[1]
+    stop()
+    return {'parser': name, 'changes': changes, 'seconds': round(elapsed, 4), 'peak_mib': round(peak / 2**20, 2)}
+
+
+def run(resources: int) -> list:
+    """Compare json.loads of the whole plan with the streaming parser. The plan is read from a file like the stdout
+    pipe of terraform show -json and every resource change is only counted, not kept, so only the parser itself is
+    measured: json.loads holds the whole document, PlanStream one resource change at a time.
+
+    Args:
+        resources (int): number of resources in the synthetic plan
+
+    Returns:
+        list: benchmark results
+    """
+    plan = synthetic_plan(resources)
+    size = round(len(plan) / 2**20, 2)
+    with NamedTemporaryFile('w+', suffix='.json') as file:
+        file.write(plan)
+        del plan
+        file.flush()
+
+        def load() -> int:
+            file.seek(0)
+            return sum(1 for _ in loads(file.read())['resource_changes'])
+
+        def stream() -> int:
+            file.seek(0)
+            return sum(1 for _ in PlanStream(file).resource_changes())
+
+        results = [measure('json.loads', load), measure('PlanStream', stream)]
+    for result in results:
+        result.update({'resources': resources, 'plan_mib': size})
+    return results
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmark plan JSON parsing')
+    parser.add_argument('-r', '--resources', type=int, nargs='+', default=[100, 1000, 10000])
+    for count in parser.parse_args().resources:
+        for line in run(count):
+            print(dumps(line))
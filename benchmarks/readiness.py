@@ -0,0 +1,34 @@
+from argparse import ArgumentParser
+from json import dumps
+from time import perf_counter
+
+from benchmarks.fakes import banner_servers
+from gcp_iac.probe import ReadinessProber
+
+
+def run(counts: list = None) -> list:
+    """Measure how fast the readiness prober confirms many hosts that already send an SSH banner
+
+    Args:
+        counts (list, optional): host counts to measure. Defaults to [1, 16, 64, 254].
+
+    Returns:
+        list: benchmark results
+    """
+    results = []
+    for count in counts or [1, 16, 64, 254]:
+        with banner_servers(count) as (port, hosts):
+            prober = ReadinessProber(port=port, deadline=30.0, base_delay=0.05)
+            began = perf_counter()
+            ready = prober.run(hosts)
+            elapsed = perf_counter() - began
+        results.append({'hosts': count, 'ready': sum(ready.values()), 'seconds': round(elapsed, 4),
+                        'hosts_per_second': round(count / elapsed, 1)})
+    return results
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Benchmark readiness probe throughput on local listener sockets')
+    parser.add_argument('-c', '--counts', type=int, nargs='+', default=[1, 16, 64, 254])
+    for line in run(parser.parse_args().counts):
+        print(dumps(line))
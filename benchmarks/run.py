@@ -0,0 +1,38 @@
+import platform
+from argparse import ArgumentParser
+from datetime import datetime, timezone
+from json import dumps
+
+from benchmarks import cli_startup, fleet_apply, forks, plan_parsing, readiness
+
+
+def run() -> dict:
+    """Run every benchmark suite
+
+    Returns:
+        dict: results document
+    """
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': {
+            'cli_startup': cli_startup.run(),
+            'plan_parsing': [line for count in [100, 1000, 10000] for line in plan_parsing.run(count)],
+            'readiness': readiness.run(),
+            'fleet_apply': fleet_apply.run(),
+            'forks': forks.run(),
+        },
+    }
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description='Run the offline giac benchmark suite and emit the results as JSON')
+    parser.add_argument('-o', '--output', help='File to write the results to. Defaults to stdout')
+    output = parser.parse_args().output
+    document = dumps(run(), indent=2)
+    if output:
+        with open(output, 'w') as file:
+            file.write(document + '\n')
+    else:
+        print(document)
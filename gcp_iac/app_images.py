@@ -0,0 +1,158 @@
+from hashlib import sha256
+from json import dump, load
+from pathlib import Path
+from shutil import copyfile
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+
+SERVICES = {
+    'app1_web': {'web': ''},
+    'app1_php': {'php': '', 'web/index.php': 'index.php'},
+    'app1_db': {'sql': ''},
+}
+MANIFEST_TYPES = (
+    'application/vnd.oci.image.index.v1+json',
+    'application/vnd.oci.image.manifest.v1+json',
+    'application/vnd.docker.distribution.manifest.list.v2+json',
+    'application/vnd.docker.distribution.manifest.v2+json',
+)
+
+
+class AppImages():
+    def __init__(self, files_dir: str, registry: str, record_file: str):
+        """Content addressed container images of the app services. Each image is tagged by a hash of its build context
+        so it only has to be built and pushed once per change, after which every host just pulls it. A registry given
+        as http://host:port is treated as an insecure (plain HTTP) registry such as a local registry:2.
+
+        Args:
+            files_dir (str): path to the playbook files directory holding the build contexts
+            registry (str): registry to push to, e.g. 10.128.0.5:5000 or us-docker.pkg.dev/project/repo
+            record_file (str): path to the JSON file recording the pushed tags
+        """
+        self.files_dir = Path(files_dir)
+        self.insecure = registry.startswith('http://')
+        self.registry = registry.removeprefix('http://').removeprefix('https://').rstrip('/')
+        self.record_file = Path(record_file)
+
+    def context_files(self, service: str) -> dict:
+        """Get the files of a service build context. The php context also needs the index file of the web context.
+
+        Args:
+            service (str): service name
+
+        Returns:
+            dict: path inside the context to source file path mapping
+        """
+        files = {}
+        for source, target in SERVICES[service].items():
+            path = self.files_dir / source
+            if path.is_file():
+                files[target or path.name] = path
+                continue
+            for file in sorted(path.rglob('*')):
+                if file.is_file() and file.name != '__init__.py' and '__pycache__' not in file.parts:
+                    files[Path(target, file.relative_to(path)).as_posix()] = file
+        return files
+
+    def context_hash(self, service: str) -> str:
+        """Hash the paths and content of a service build context
+
+        Args:
+            service (str): service name
+
+        Returns:
+            str: first 16 hex characters of the sha256 digest
+        """
+        digest = sha256()
+        for name, path in sorted(self.context_files(service).items()):
+            digest.update(name.encode() + b'\0' + path.read_bytes() + b'\0')
+        return digest.hexdigest()[:16]
+
+    def tag(self, service: str) -> str:
+        """Get the registry tag of a service image
+
+        Args:
+            service (str): service name
+
+        Returns:
+            str: image tag
+        """
+        return f'{self.registry}/{service}:{self.context_hash(service)}'
+
+    def tags(self) -> dict:
+        """Get the registry tags of every service image
+
+        Returns:
+            dict: service name to image tag mapping
+        """
+        return {service: self.tag(service) for service in SERVICES}
+
+    def manifest_url(self, service: str) -> str:
+        """Get the registry API URL of the manifest of a service image
+
+        Args:
+            service (str): service name
+
+        Returns:
+            str: manifest URL
+        """
+        host, _, prefix = self.registry.partition('/')
+        repository = f'{prefix}/{service}' if prefix else service
+        scheme = 'http' if self.insecure else 'https'
+        return f'{scheme}://{host}/v2/{repository}/manifests/{self.context_hash(service)}'
+
+    def manifest_exists(self, service: str, timeout: float = 5.0) -> bool | None:
+        """Check if the registry has the image of a service with a HEAD request on its manifest. This only needs the
+        manifest headers, no docker client and no layer is involved.
+
+        Args:
+            service (str): service name
+            timeout (float, optional): seconds to wait for the registry. Defaults to 5.0.
+
+        Returns:
+            bool | None: True if the manifest exists, False if the registry does not have it or None if the registry
+            could not tell, e.g. it needs credentials or is unreachable
+        """
+        request = Request(self.manifest_url(service), method='HEAD', headers={'Accept': ', '.join(MANIFEST_TYPES)})
+        try:
+            with urlopen(request, timeout=timeout) as response:
+                return response.status == 200
+        except HTTPError as error:
+            return False if error.code == 404 else None
+        except (URLError, OSError, ValueError):
+            return None
+
+    def stage(self, service: str, directory: str) -> None:
+        """Copy a service build context to a directory
+
+        Args:
+            service (str): service name
+            directory (str): directory to build the image from
+        """
+        for name, path in self.context_files(service).items():
+            target = Path(directory, name)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            copyfile(path, target)
+
+    def pushed(self) -> set:
+        """Get the tags recorded as pushed
+
+        Returns:
+            set: image tags
+        """
+        try:
+            with open(self.record_file, 'r') as file:
+                return set(load(file).get('pushed', []))
+        except (FileNotFoundError, ValueError):
+            return set()
+
+    def record_pushed(self, tags: list) -> None:
+        """Record pushed tags
+
+        Args:
+            tags (list): image tags
+        """
+        self.record_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.record_file, 'w') as file:
+            dump({'pushed': sorted(self.pushed() | set(tags))}, file, indent=2)
@@ -0,0 +1,61 @@
+from hashlib import sha256
+from pathlib import Path
+from shutil import copyfile, copymode
+
+
+APP_FILES = {
+    'docker/app1-compose.yml': 'docker-compose.yml',
+    'web': 'web',
+    'php': 'php',
+    'web/index.php': 'php/index.php',
+    'sql': 'mysql',
+}
+
+
+class AppSync():
+    def __init__(self, files_dir: str):
+        """Hash manifest of the app files deployed to /opt/app1. The manifest lists the sha256 and deployed path of
+        every file so the deploy playbook can diff it against the manifest stored on the host and ship only the
+        changed files in a single archive.
+
+        Args:
+            files_dir (str): path to the playbook files directory
+        """
+        self.files_dir = Path(files_dir)
+
+    def files(self) -> dict:
+        """Get the app files by their path under the app directory on the host
+
+        Returns:
+            dict: deployed path to source file path mapping
+        """
+        files = {}
+        for source, target in APP_FILES.items():
+            path = self.files_dir / source
+            if path.is_file():
+                files[target] = path
+                continue
+            for file in sorted(path.rglob('*')):
+                if file.is_file() and file.name != '__init__.py' and '__pycache__' not in file.parts:
+                    files[Path(target, file.relative_to(path)).as_posix()] = file
+        return files
+
+    def manifest(self) -> list:
+        """Build the manifest of the app files in sha256sum format
+
+        Returns:
+            list: sorted '<sha256>  <deployed path>' entries
+        """
+        return sorted(f'{sha256(path.read_bytes()).hexdigest()}  {name}' for name, path in self.files().items())
+
+    def stage(self, directory: str) -> None:
+        """Copy the app files to a directory laid out like the app directory on the host, keeping file modes
+
+        Args:
+            directory (str): staging directory
+        """
+        for name, path in self.files().items():
+            target = Path(directory, name)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            copyfile(path, target)
+            copymode(path, target)
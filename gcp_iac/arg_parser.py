@@ -22,6 +22,7 @@ class CustomHelpFormatter(HelpFormatter):
         """
         super().__init__(prog, indent_increment, max_help_position, width)
         self.color = color
+        self.__color = Color()
 
     def _format_action(self, action):
         """Adds color and adds a line space between each argument for better readability
@@ -32,7 +33,7 @@ class CustomHelpFormatter(HelpFormatter):
         Returns:
             str: formatted option argument
         """
-        return Color().format_message(f'{super()._format_action(action)}\n', self.color, _format='italic')
+        return self.__color.format_message(f'{super()._format_action(action)}\n', self.color, _format='italic')
 
 
 class ArgParser(ArgumentParser):
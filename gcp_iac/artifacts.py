@@ -0,0 +1,205 @@
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from json import dump, load
+from os import replace
+from pathlib import Path
+from shutil import rmtree
+
+from gcp_iac.workspace import file_lock
+
+
+class ArtifactStore():
+    def __init__(self, clients_dir: str, keep: int = 10, max_bytes: int = 512 * 1024 * 1024, workers: int = 8):
+        """Retention of the ansible_runner artifact trees (job events, stdout, fact cache) written under the Ansible
+        clients directory. The newest keep runs of every playbook stay as they are, older runs are compacted into one
+        gzip compressed tar archive each and listed in a small JSON index, so a run can still be looked up by its id.
+        The oldest archives are deleted once the archives take more than max_bytes. Compaction and deletion run in a
+        thread pool since both are dominated by file system calls on many small files.
+
+        Args:
+            clients_dir (str): Ansible clients directory
+            keep (int, optional): number of most recent runs kept uncompressed per artifact directory. Defaults to 10.
+            max_bytes (int, optional): max total size of the archives, 0 disables the limit. Defaults to 512 MiB.
+            workers (int, optional): max number of runs compacted or deleted at the same time. Defaults to 8.
+        """
+        self.clients_dir = Path(clients_dir)
+        self.keep = keep
+        self.max_bytes = max_bytes
+        self.workers = workers
+
+    @property
+    def archive_dir(self) -> Path:
+        """Get the directory of the compacted runs
+
+        Returns:
+            Path: archive directory
+        """
+        return self.clients_dir / '.archive'
+
+    @property
+    def index_file(self) -> Path:
+        """Get the index of the compacted runs
+
+        Returns:
+            Path: index file
+        """
+        return self.archive_dir / 'index.json'
+
+    def index(self) -> list:
+        """Get the index of the compacted runs
+
+        Returns:
+            list: archive records, oldest first
+        """
+        try:
+            with open(self.index_file, 'r') as file:
+                return load(file)
+        except (FileNotFoundError, ValueError):
+            return []
+
+    def __save_index(self, records: list) -> None:
+        """Write the index of the compacted runs
+
+        Args:
+            records (list): archive records
+        """
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_suffix('.tmp')
+        with open(tmp, 'w') as file:
+            dump(records, file, indent=2)
+        replace(tmp, self.index_file)
+
+    def lookup(self, ident: str) -> dict | None:
+        """Find a compacted run by its ansible_runner id
+
+        Args:
+            ident (str): run id (name of the run directory in artifacts)
+
+        Returns:
+            dict | None: archive record or None if the run is not archived
+        """
+        return next((record for record in self.index() if record['ident'] == ident), None)
+
+    def artifact_dirs(self) -> list:
+        """Get the artifact directories of the clients directory: one per playbook run directory, and one per host
+        for client directories written by earlier releases
+
+        Returns:
+            list: artifact directories
+        """
+        return [path for pattern in ['.runs/*/artifacts', '*/artifacts'] for path in self.clients_dir.glob(pattern)
+                if path.is_dir()]
+
+    def expired_runs(self) -> list:
+        """Get the runs past the keep newest of every artifact directory
+
+        Returns:
+            list: run directories, oldest first
+        """
+        expired = []
+        for artifacts in self.artifact_dirs():
+            runs = sorted((path for path in artifacts.iterdir() if path.is_dir()),
+                          key=lambda path: path.stat().st_mtime)
+            expired += runs[:max(0, len(runs) - self.keep)]
+        return sorted(expired, key=lambda path: path.stat().st_mtime)
+
+    @staticmethod
+    def __read(run: Path, name: str) -> str:
+        """Read a small result file of a run
+
+        Args:
+            run (Path): run directory
+            name (str): file name, e.g. status or rc
+
+        Returns:
+            str: file content or an empty string if it is missing
+        """
+        try:
+            return (run / name).read_text().strip()
+        except OSError:
+            return ''
+
+    def __compact(self, run: Path) -> dict:
+        """Compress a run directory into an archive and delete it
+
+        Args:
+            run (Path): run directory
+
+        Returns:
+            dict: archive record
+        """
+        source = run.parent.parent.relative_to(self.clients_dir)
+        archive = self.archive_dir / source / f'{run.name}.tar.gz'
+        archive.parent.mkdir(parents=True, exist_ok=True)
+        created = datetime.fromtimestamp(run.stat().st_mtime, timezone.utc).isoformat(timespec='seconds')
+        try:
+            with tarfile.open(archive, 'w:gz') as tar:
+                tar.add(run, arcname=run.name)
+        except BaseException:
+            archive.unlink(missing_ok=True)
+            raise
+        record = {'ident': run.name, 'source': str(source), 'status': self.__read(run, 'status'),
+                  'rc': self.__read(run, 'rc'), 'created': created,
+                  'archive': str(archive.relative_to(self.archive_dir)), 'bytes': archive.stat().st_size}
+        rmtree(run)
+        return record
+
+    def remove(self, paths: list) -> list:
+        """Delete directory trees in parallel
+
+        Args:
+            paths (list): directories to delete
+
+        Returns:
+            list: directories that could not be deleted
+        """
+        def delete(path: Path) -> bool:
+            try:
+                rmtree(path)
+                return True
+            except FileNotFoundError:
+                return True
+            except OSError:
+                return False
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(paths)))) as pool:
+            return [path for path, deleted in zip(paths, pool.map(delete, paths)) if not deleted]
+
+    def prune(self) -> tuple:
+        """Compact the runs past the keep newest of every artifact directory and delete the oldest archives while the
+        archives take more than max_bytes. Holds a lock on the archive directory, since a bake and an apply of the
+        default workspace share the clients directory. A run that fails to compact is left in place and reported, the
+        index always records the runs that were archived.
+
+        Returns:
+            tuple: (number of runs compacted, number of archives deleted, list of (run directory, error) failures)
+        """
+        with file_lock(str(self.archive_dir / '.giac.lock'), timeout=60.0):
+            expired = self.expired_runs()
+            records = self.index()
+            compacted = []
+            failed = []
+            if expired:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(expired))) as pool:
+                    futures = {pool.submit(self.__compact, run): run for run in expired}
+                    for future, run in futures.items():
+                        try:
+                            compacted.append(future.result())
+                        except Exception as error:
+                            failed.append((run, error))
+            records += compacted
+            dropped = []
+            try:
+                if self.max_bytes:
+                    total = sum(record['bytes'] for record in records)
+                    while records and total > self.max_bytes:
+                        record = records.pop(0)
+                        total -= record['bytes']
+                        dropped.append(self.archive_dir / record['archive'])
+                    with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(dropped)))) as pool:
+                        list(pool.map(lambda path: path.unlink(missing_ok=True), dropped))
+            finally:
+                if compacted or dropped:
+                    self.__save_index(records)
+        return len(compacted), len(dropped), failed
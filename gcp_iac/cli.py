@@ -1,16 +1,44 @@
 from argparse import REMAINDER
 
 from gcp_iac.arg_parser import ArgParser
-from gcp_iac.iac import GCPIaC
+from gcp_iac.parallelism import STRATEGIES
 
 
 def parse_parent_args(args: dict):
     if args.get('init'):
         return iac_init(args['init'])
-    if args.get('apply'):
-        return GCPIaC().apply_terraform()
-    if args.get('destroy'):
-        return GCPIaC().destroy_terraform()
+    if args.get('list') or args.get('status'):
+        from pathlib import Path
+        from gcp_iac.inventory import Inventory
+        inventory = Inventory(f'{Path(__file__).parent}/gcp_env/inventory.db')
+        print(inventory.list_table() if args.get('list') else inventory.status_table(), end='')
+        return True
+    if args.get('apply') or args.get('destroy') or args.get('bake'):
+        from gcp_iac.iac import GCPIaC
+        from gcp_iac.logger import get_logger
+        from gcp_iac.workspace import DEFAULT_WORKSPACE
+        # Workspaces are applied at the same time, each gets its own log file since rotation is not process safe
+        workspace = args.get('workspace') or DEFAULT_WORKSPACE
+        logger = get_logger('gcp-iac', json_lines=args.get('jsonLogs'), queued=args.get('queueLogs'),
+                            file_name='gcp-iac' if workspace == DEFAULT_WORKSPACE else f'gcp-iac-{workspace}')
+        try:
+            iac = GCPIaC(logger, profile=args.get('profile'), registry=args.get('registry'),
+                         ssh_lifetime=args.get('sshLifetime'), workspace=args.get('workspace'),
+                         timeout=args.get('timeout'), strategy=args.get('strategy') or 'linear',
+                         keep_artifacts=args.get('keepArtifacts', 10),
+                         max_artifact_bytes=args.get('maxArtifactMB', 512) * 1024 * 1024)
+        except ValueError as error:
+            GCPIaC.display_failed(f'{error}')
+            return False
+        try:
+            if args.get('bake'):
+                return iac.bake_image()
+            if args.get('apply'):
+                return iac.apply_terraform(args.get('count'), args.get('workers'), args.get('reconfigure'),
+                                           args.get('cache'))
+            return iac.destroy_terraform()
+        finally:
+            iac.save_profile()
     return True
 
 
@@ -31,6 +59,113 @@ def iac_parent():
             'help': 'Destroy GCP IaC Configuration',
             'action': 'store_true',
         },
+        'bake': {
+            'short': 'B',
+            'help': 'Bake a golden image with Python, Docker and the app base images installed. apply boots new hosts '
+                    'from it while it matches the startup script and the bake playbooks',
+            'action': 'store_true',
+        },
+        'list': {
+            'short': 'l',
+            'help': 'List the deployed instances of every workspace with their IP, boot image and last configuration '
+                    'status from the local inventory index, without calling Terraform',
+            'action': 'store_true',
+        },
+        'status': {
+            'short': 's',
+            'help': 'Summarize the deployed instances and configuration results per workspace from the local '
+                    'inventory index',
+            'action': 'store_true',
+        },
+        'workspace': {
+            'short': 'w',
+            'help': 'Environment to apply, destroy or bake in. Each workspace has its own Terraform working directory, '
+                    'tfvars, state and Ansible client directories and is locked while in use. Defaults to default',
+            'default': 'default',
+        },
+        'count': {
+            'short': 'c',
+            'help': 'Number of instances to deploy with apply (fleet mode), saved to the workspace tfvars. Defaults to '
+                    'tfvars or 1',
+            'type': int,
+        },
+        'workers': {
+            'short': 'W',
+            'help': 'Max number of hosts to configure in parallel (Ansible forks). Defaults to 0, picked from the '
+                    'host count and the local CPUs and memory',
+            'type': int,
+            'default': 0,
+        },
+        'strategy': {
+            'short': 'S',
+            'help': 'Ansible strategy of the playbooks: linear runs every task on all hosts before the next task, free '
+                    'lets every host run through the play at its own pace so a slow host does not hold the others '
+                    'back. Defaults to linear',
+            'choices': STRATEGIES,
+            'default': 'linear',
+        },
+        'reconfigure': {
+            'short': 'r',
+            'help': 'Run the Ansible configuration on every host with apply, not only new or replaced hosts',
+            'action': 'store_true',
+        },
+        'cache': {
+            'short': 'C',
+            'help': 'Create a fleet cache VM with apply that proxies the distro and Docker package repositories and '
+                    'mirrors Docker Hub, so every host downloads through it instead of the internet. Saved to the '
+                    'workspace tfvars',
+            'action': 'store_true',
+        },
+        'registry': {
+            'short': 'R',
+            'help': 'Registry to build and push the app images to once, hosts pull them instead of building them. '
+                    'Use http://host:port for an insecure registry such as a local registry:2',
+        },
+        'sshLifetime': {
+            'short': 'L',
+            'help': 'Seconds to keep the shared SSH connection of each host open while idle during apply. '
+                    'Defaults to 1800, 0 disables it',
+            'type': int,
+            'default': 1800,
+        },
+        'timeout': {
+            'short': 'T',
+            'help': 'Seconds a terraform apply or docker build/push may run before it is killed. Defaults to 3600, '
+                    '0 disables it',
+            'type': int,
+            'default': 3600,
+        },
+        'keepArtifacts': {
+            'short': 'K',
+            'help': 'Number of most recent Ansible runs per playbook whose artifacts are kept as they are, older '
+                    'runs are compacted into compressed archives. Defaults to 10',
+            'type': int,
+            'default': 10,
+        },
+        'maxArtifactMB': {
+            'short': 'M',
+            'help': 'Max total size in MiB of the compacted Ansible runs, the oldest are deleted past it. Defaults to '
+                    '512, 0 disables it',
+            'type': int,
+            'default': 512,
+        },
+        'jsonLogs': {
+            'short': 'J',
+            'help': 'Write the log file as JSON lines with host, phase and duration fields',
+            'action': 'store_true',
+        },
+        'queueLogs': {
+            'short': 'Q',
+            'help': 'Log through a queue written by a background thread so logging never blocks provisioning',
+            'action': 'store_true',
+        },
+        'profile': {
+            'short': 'P',
+            'help': 'Record the time spent in each phase of apply or destroy and write a Chrome trace JSON file '
+                    '(open in ui.perfetto.dev). Defaults to giac-trace.json',
+            'nargs': '?',
+            'const': 'giac-trace.json',
+        },
     }).set_arguments()
     if not parse_parent_args(args):
         exit(1)
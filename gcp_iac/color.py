@@ -1,4 +1,67 @@
+_ESC = '\033['
+
+
 class Color:
+    """Console color and formatting helper. The escape sequences are built once when the class is defined so formatting
+    a message is a couple of dict lookups.
+    """
+    COLORS = {
+        'foreground': {
+            'black': '30m',
+            'red': '31m',
+            'green': '32m',
+            'yellow': '33m',
+            'blue': '34m',
+            'magenta': '35m',
+            'cyan': '36m',
+            'white': '37m',
+            'bright-black': '90m',
+            'bright-red': '91m',
+            'bright-green': '92m',
+            'bright-yellow': '93m',
+            'bright-blue': '94m',
+            'bright-magenta': '95m',
+            'bright-cyan': '96m',
+            'bright-white': '97m'
+        },
+        'background': {
+            'black': '40m',
+            'red': '41m',
+            'green': '42m',
+            'yellow': '43m',
+            'blue': '44m',
+            'magenta': '45m',
+            'cyan': '46m',
+            'white': '47m',
+            'bright-black': '100m',
+            'bright-red': '101m',
+            'bright-green': '102m',
+            'bright-yellow': '103m',
+            'bright-blue': '104m',
+            'bright-magenta': '105m',
+            'bright-cyan': '106m',
+            'bright-white': '107m'
+        }
+    }
+
+    FORMATTING = {
+        'reset': '00m',
+        'default': '10m',
+        'bold': '01m',
+        'dim': '02m',
+        'italic': '03m',
+        'underline': '04m',
+        'double-underline': '21m',
+        'slow-blink': '05m',
+        'rapid-blink': '06m',
+        'invert': '07m',
+        'hide': '08m',
+        'strike': '09m'
+    }
+
+    COLOR_ESCAPES = {ground: {color: f'{_ESC}{code}' for color, code in codes.items()}
+                     for ground, codes in COLORS.items()}
+    FORMAT_ESCAPES = {name: f'{_ESC}{code}' for name, code in FORMATTING.items()}
 
     @property
     def colors(self) -> dict:
@@ -7,44 +70,7 @@ class Color:
         Returns:
             dict: color options
         """
-        return {
-            'foreground': {
-                'black': '30m',
-                'red': '31m',
-                'green': '32m',
-                'yellow': '33m',
-                'blue': '34m',
-                'magenta': '35m',
-                'cyan': '36m',
-                'white': '37m',
-                'bright-black': '90m',
-                'bright-red': '91m',
-                'bright-green': '92m',
-                'bright-yellow': '93m',
-                'bright-blue': '94m',
-                'bright-magenta': '95m',
-                'bright-cyan': '96m',
-                'bright-white': '97m'
-            },
-            'background': {
-                'black': '40m',
-                'red': '41m',
-                'green': '42m',
-                'yellow': '43m',
-                'blue': '44m',
-                'magenta': '45m',
-                'cyan': '46m',
-                'white': '47m',
-                'bright-black': '100m',
-                'bright-red': '101m',
-                'bright-green': '102m',
-                'bright-yellow': '103m',
-                'bright-blue': '104m',
-                'bright-magenta': '105m',
-                'bright-cyan': '106m',
-                'bright-white': '107m'
-            }
-        }
+        return self.COLORS
 
     @property
     def formatting(self) -> dict:
@@ -53,20 +79,7 @@ class Color:
         Returns:
             dict: formatting options
         """
-        return {
-            'reset': '00m',
-            'default': '10m',
-            'bold': '01m',
-            'dim': '02m',
-            'italic': '03m',
-            'underline': '04m',
-            'double-underline': '21m',
-            'slow-blink': '05m',
-            'rapid-blink': '06m',
-            'invert': '07m',
-            'hide': '08m',
-            'strike': '09m'
-        }
+        return self.FORMATTING
 
     @property
     def esc(self) -> str:
@@ -75,7 +88,7 @@ class Color:
         Returns:
             str: escape character
         """
-        return '\033['
+        return _ESC
 
     @property
     def reset(self) -> str:
@@ -84,7 +97,7 @@ class Color:
         Returns:
             str: reset formatting
         """
-        return f'{self.esc}{self.formatting["reset"]}'
+        return self.FORMAT_ESCAPES['reset']
 
     def __build_format(self, _format: str = 'default'):
         """Build formatting string
@@ -96,7 +109,7 @@ class Color:
             str: formatted string
         """
         try:
-            return f'{self.esc}{self.formatting[_format]}'
+            return self.FORMAT_ESCAPES[_format]
         except KeyError:
             print(f'Failed to get formatting using key: {_format}')
         return ''
@@ -112,10 +125,10 @@ class Color:
             str: color string
         """
         try:
-            return f'{self.esc}{self.colors[ground][color]}'
+            return self.COLOR_ESCAPES[ground][color]
         except KeyError:
             print(f'Failed to get color format using keys: {ground}, {color}')
-        ''
+        return ''
 
     def print_message(self, msg: str, color: str, ground: str = 'foreground', _format: str = 'default'):
         """Print formatted message
@@ -0,0 +1,99 @@
+from collections import deque
+from logging import Logger
+from os import killpg, read
+from selectors import EVENT_READ, DefaultSelector
+from signal import SIGKILL, SIGTERM
+from subprocess import DEVNULL, PIPE, STDOUT, Popen, TimeoutExpired
+from time import monotonic
+from typing import Callable
+
+
+class CommandRunner():
+    def __init__(self, logger: Logger = None, tail_lines: int = 200, kill_grace: float = 5.0):
+        """Run commands from an argv list without a shell and stream their output. stdout and stderr are merged and
+        every line is handed to a callback as soon as it is read, and only the last tail_lines lines are kept for error
+        reporting, so a long running command shows progress without holding its whole output in memory. A command that
+        runs past its timeout gets its whole process group terminated, then killed after kill_grace seconds.
+
+        Args:
+            logger (Logger, optional): logger to write the output lines to at debug level. Defaults to None.
+            tail_lines (int, optional): number of output lines kept for error reporting. Defaults to 200.
+            kill_grace (float, optional): seconds between SIGTERM and SIGKILL on timeout. Defaults to 5.0.
+        """
+        self.log = logger
+        self.tail_lines = tail_lines
+        self.kill_grace = kill_grace
+
+    def __kill(self, process: Popen) -> None:
+        """Terminate the process group of a command and kill it if it does not exit in time
+
+        Args:
+            process (Popen): command process
+        """
+        for sig in [SIGTERM, SIGKILL]:
+            try:
+                killpg(process.pid, sig)
+            except ProcessLookupError:
+                return
+            try:
+                process.wait(self.kill_grace)
+                return
+            except TimeoutExpired:
+                continue
+
+    def run(self, argv: list, on_line: Callable[[str], None] = None, cwd: str = None, env: dict = None,
+            timeout: float = None) -> tuple:
+        """Run a command and stream its output lines
+
+        Args:
+            argv (list): command and arguments
+            on_line (Callable[[str], None], optional): called with every output line. Defaults to None.
+            cwd (str, optional): working directory. Defaults to None.
+            env (dict, optional): environment variables. Defaults to None (inherit).
+            timeout (float, optional): wall clock seconds before the command is killed. Defaults to None (no limit).
+
+        Returns:
+            tuple: (return code, last output lines, True if the command timed out)
+        """
+        tail = deque(maxlen=self.tail_lines)
+
+        def emit(data: bytes) -> None:
+            line = data.decode(errors='replace').rstrip('\r')
+            tail.append(line)
+            if self.log:
+                self.log.debug(f'{argv[0]}: {line}')
+            if on_line:
+                on_line(line)
+
+        deadline = monotonic() + timeout if timeout else None
+        timed_out = False
+        process = Popen(argv, stdin=DEVNULL, stdout=PIPE, stderr=STDOUT, cwd=cwd, env=env, start_new_session=True)
+        try:
+            buffer = b''
+            with DefaultSelector() as selector:
+                selector.register(process.stdout, EVENT_READ)
+                while True:
+                    remaining = None if deadline is None else deadline - monotonic()
+                    if remaining is not None and remaining <= 0:
+                        timed_out = True
+                        break
+                    if not selector.select(remaining):
+                        continue
+                    chunk = read(process.stdout.fileno(), 65536)
+                    if not chunk:
+                        break
+                    *lines, buffer = (buffer + chunk).split(b'\n')
+                    for line in lines:
+                        emit(line)
+            if buffer:
+                emit(buffer)
+            if not timed_out:
+                try:
+                    process.wait(None if deadline is None else max(0.0, deadline - monotonic()))
+                except TimeoutExpired:
+                    timed_out = True
+        finally:
+            if timed_out or process.poll() is None:
+                self.__kill(process)
+            process.stdout.close()
+        return process.wait(), '\n'.join(tail), timed_out
@@ -1,26 +1,94 @@
-import socket
 from pathlib import Path
 from logging import Logger
-from time import sleep
-from json import loads
-from subprocess import run
-
-import ansible_runner
-from python_terraform import Terraform
+from subprocess import Popen, PIPE
+from concurrent.futures import ThreadPoolExecutor
+from shlex import split
+from tempfile import TemporaryDirectory, TemporaryFile
+from time import perf_counter
+from typing import Callable, TYPE_CHECKING
 
 from gcp_iac.logger import get_logger
 from gcp_iac.color import Color
+from gcp_iac.probe import ReadinessProber
+from gcp_iac.plan_cache import PlanCache
+from gcp_iac.plan_stream import PlanStream, created_instances
+from gcp_iac.profiler import Profiler
+from gcp_iac.task_history import TaskHistory
+from gcp_iac.image import GoldenImage
+from gcp_iac.app_images import AppImages, SERVICES
+from gcp_iac.app_sync import AppSync
+from gcp_iac.ssh_master import SSHMasters
+from gcp_iac.provider_cache import ProviderCache
+from gcp_iac.workspace import DEFAULT_WORKSPACE, Workspace, WorkspaceLocked, file_lock, save_tf_vars
+from gcp_iac.command import CommandRunner
+from gcp_iac.state_reader import StateReader
+from gcp_iac.inventory import Inventory
+from gcp_iac.parallelism import STRATEGIES, auto_forks
+from gcp_iac.artifacts import ArtifactStore
+from gcp_iac.startup_gate import StartupGate
+from gcp_iac.performance import machine_resources, performance_profile
+
+if TYPE_CHECKING:
+    from python_terraform import Terraform
 
 
 class GCPIaC():
-    def __init__(self, logger: Logger = None):
+    def __init__(self, logger: Logger = None, profile: str = None, registry: str = None, ssh_lifetime: int = 1800,
+                 workspace: str = None, timeout: int = 3600, strategy: str = 'linear', keep_artifacts: int = 10,
+                 max_artifact_bytes: int = 512 * 1024 * 1024):
         """GCP IaC class to manage GCP infrastructure as code using Terraform and Ansible.
 
         Args:
             logger (Logger, optional): logging object to use. Defaults to None.
+            profile (str, optional): path to write a Chrome trace of the run phases to. Defaults to None (disabled).
+            registry (str, optional): registry to push the app images to so hosts pull them instead of building them.
+            Defaults to None (build on the hosts).
+            ssh_lifetime (int, optional): seconds to keep the shared SSH connection of each host open once it is idle.
+            Defaults to 1800, 0 disables the shared connections.
+            workspace (str, optional): name of the environment to work in, each has its own Terraform working directory,
+            tfvars, state and Ansible client directories. Defaults to None (default workspace).
+            timeout (int, optional): wall clock seconds a terraform apply or docker command may run before it is
+            killed. Defaults to 3600, 0 disables it.
+            strategy (str, optional): Ansible strategy of the playbooks, linear runs every task on all hosts before the
+            next task, free lets every host run through the play at its own pace. Defaults to 'linear'.
+            keep_artifacts (int, optional): number of most recent Ansible runs whose artifacts are kept uncompressed,
+            older runs are compacted into archives. Defaults to 10.
+            max_artifact_bytes (int, optional): max total size of the compacted Ansible runs, the oldest are deleted
+            past it. Defaults to 512 MiB, 0 disables it.
+
+        Raises:
+            ValueError: if the workspace name or the strategy is invalid
         """
+        if strategy not in STRATEGIES:
+            raise ValueError(f'Invalid Ansible strategy: {strategy!r} (use {" or ".join(STRATEGIES)})')
         self.log = logger or get_logger('gcp-iac')
-        self.__tf: Terraform | None = None
+        self.workspace = Workspace(workspace or DEFAULT_WORKSPACE)
+        self.runner = CommandRunner(self.log)
+        self.timeout = timeout or None
+        self.strategy = strategy
+        self.keep_artifacts = keep_artifacts
+        self.max_artifact_bytes = max_artifact_bytes
+        self.__tf: 'Terraform | None' = None
+        self.__bake_tf: 'Terraform | None' = None
+        self.prober = ReadinessProber()
+        self.plan_cache = PlanCache(self.terraform_dir, self.env_vars_file)
+        self.state = StateReader(f'{self.terraform_dir}/terraform.tfstate')
+        self.provider_cache = ProviderCache()
+        self.inventory = Inventory(f'{Path(__file__).parent}/gcp_env/inventory.db')
+        self.profile = profile
+        self.profiler = Profiler(enabled=bool(profile))
+        self.task_history = TaskHistory(f'{self.workspace.directory}/task_history.json')
+        self.golden_image = GoldenImage(f'{self.terraform_dir}/startup.sh', f'{self.ansible_dir}/playbooks',
+                                        f'{Path(__file__).parent}/gcp_env/golden_image.json')
+        self.app_images = None
+        if registry:
+            self.app_images = AppImages(f'{self.ansible_dir}/playbooks/files', registry,
+                                        f'{Path(__file__).parent}/gcp_env/app_images.json')
+        self.app_sync = AppSync(f'{self.ansible_dir}/playbooks/files')
+        self.ssh_masters = (SSHMasters(self.ssh_key, port=self.prober.port, lifetime=ssh_lifetime) if ssh_lifetime
+                            else None)
+        self.startup_gate = StartupGate(self.ssh_key, port=self.prober.port)
+        self.ansible_extravars = {}
 
     @property
     def env_vars_file(self) -> str:
@@ -29,7 +97,7 @@ class GCPIaC():
         Returns:
             str: Path to the environment variables file
         """
-        return f'{Path(__file__).parent}/gcp_env/env.tfvars'
+        return str(self.workspace.env_vars_file)
 
     @property
     def ssh_key(self) -> str:
@@ -50,28 +118,86 @@ class GCPIaC():
         return f'{Path(__file__).parent}/ansible'
 
     @property
-    def tf(self) -> Terraform:
-        """Get the Terraform object
+    def terraform_dir(self) -> str:
+        """Get the path to the Terraform working directory
+
+        Returns:
+            str: Path to the Terraform working directory
+        """
+        return str(self.workspace.terraform_dir)
+
+    @property
+    def clients_dir(self) -> str:
+        """Get the path to the Ansible client directories
+
+        Returns:
+            str: Path to the Ansible client directories
+        """
+        if self.workspace.is_default:
+            return f'{self.ansible_dir}/clients'
+        return str(self.workspace.clients_dir)
+
+    @property
+    def artifacts(self) -> ArtifactStore:
+        """Get the retention manager of the Ansible run artifacts of the workspace
+
+        Returns:
+            ArtifactStore: artifact retention manager
+        """
+        return ArtifactStore(self.clients_dir, self.keep_artifacts, self.max_artifact_bytes)
+
+    @property
+    def plan_file(self) -> str:
+        """Get the path to the saved Terraform plan file
+
+        Returns:
+            str: Path to the plan file
+        """
+        return f'{self.terraform_dir}/tfplan'
+
+    @property
+    def tf(self) -> 'Terraform':
+        """Get the Terraform object. python_terraform is imported on first use to keep the CLI startup fast.
 
         Returns:
             Terraform: Terraform object
         """
         if self.__tf is None:
-            self.__tf = Terraform(working_dir=f'{Path(__file__).parent}/terraform')
+            from python_terraform import Terraform
+            self.__tf = Terraform(working_dir=self.terraform_dir)
         return self.__tf
 
+    @property
+    def bake_tf(self) -> 'Terraform':
+        """Get the Terraform object of the golden image bake module
+
+        Returns:
+            Terraform: Terraform object
+        """
+        if self.__bake_tf is None:
+            from python_terraform import Terraform
+            self.__bake_tf = Terraform(working_dir=f'{Path(__file__).parent}/terraform/bake')
+        return self.__bake_tf
+
     @property
     def ansible_env_vars(self) -> dict:
-        """Get Ansible environment variables
+        """Get Ansible environment variables. Facts are cached per workspace since every workspace names its hosts
+        docker-NN.
 
         Returns:
             dict: Ansible environment variables
         """
-        return {
+        env_vars = {
             'ANSIBLE_CONFIG': f'{self.ansible_dir}/ansible.cfg',
             'ANSIBLE_PYTHON_INTERPRETER': '/usr/bin/python3',
             'ANSIBLE_PRIVATE_KEY_FILE': self.ssh_key,
+            'ANSIBLE_STRATEGY': self.strategy,
+            'ANSIBLE_CACHE_PLUGIN_CONNECTION': str(self.workspace.facts_dir),
         }
+        if self.ssh_masters:
+            env_vars['ANSIBLE_SSH_ARGS'] = f'-o ControlMaster=auto -o ControlPersist={self.ssh_masters.lifetime}s'
+            env_vars['ANSIBLE_SSH_CONTROL_PATH'] = self.ssh_masters.ansible_control_path
+        return env_vars
 
     @staticmethod
     def display_successful(msg: str) -> None:
@@ -100,138 +226,182 @@ class GCPIaC():
         """
         Color().print_message(msg, 'yellow')
 
-    def run_cmd(self, cmd: str, ignore_error: bool = False, log_output: bool = False) -> tuple:
-        """Run a command and return the output
+    def run_cmd(self, cmd: str | list, ignore_error: bool = False, log_output: bool = False,
+                on_line: Callable[[str], None] = None, timeout: float = None, cwd: str = None) -> tuple:
+        """Run a command without a shell and return the last lines of its output. The output is streamed line by line
+        to on_line and the debug log while the command runs.
 
         Args:
-            cmd (str): Command to run
+            cmd (str | list): Command to run as an argv list, a string is split like a shell would (no expansion)
             ignore_error (bool, optional): ignore errors. Defaults to False
             log_output (bool, optional): Log command output. Defaults to False.
+            on_line (Callable[[str], None], optional): called with every output line. Defaults to None.
+            timeout (float, optional): seconds before the command is killed. Defaults to None (no limit).
+            cwd (str, optional): working directory. Defaults to None.
 
         Returns:
-            tuple: (stdout, True. '') on success or (stdout, False, error) on failure
+            tuple: (output, True, '') on success or (output, False, error) on failure
         """
-        state = True
-        error = ''
-        output = run(cmd, shell=True, capture_output=True, text=True)
-        if output.returncode != 0:
-            state = False
-            error = output.stderr
+        argv = split(cmd) if isinstance(cmd, str) else [str(arg) for arg in cmd]
+        try:
+            return_code, output, timed_out = self.runner.run(argv, on_line, cwd=cwd, timeout=timeout)
+        except OSError as error:
+            return_code, output, timed_out = 127, f'{error}', False
+        if return_code != 0:
+            error = f'Timed out after {timeout}s\n{output}' if timed_out else output
             if not ignore_error:
-                self.log.error(f'Command: {cmd}\nExit Code: {output.returncode}\nError: {error}')
-                return '', state, error
-        stdout = output.stdout
+                self.log.error(f'Command: {" ".join(argv)}\nExit Code: {return_code}\nError: {error}')
+            return output, False, error
         if log_output:
-            self.log.info(f'Command: {cmd}\nOutput: {stdout}')
-        return stdout, state, error
+            self.log.info(f'Command: {" ".join(argv)}\nOutput: {output}')
+        return output, True, ''
 
-    def __create_ansible_client_directory(self, client_dir: Path, name: str, ip: str) -> bool:
-        """Create the Ansible client directory and inventory file
+    def __create_ansible_run_directory(self, run_dir: Path, hosts: dict, role: str) -> bool:
+        """Create the Ansible run directory and the inventory of every host, grouped by role
 
         Args:
-            client_dir (Path): Path to the client directory
-            name (str): client name
-            ip (str): client IP address
+            run_dir (Path): Path to the run directory
+            hosts (dict): host name to IP address mapping
+            role (str): inventory group of the hosts
 
         Returns:
             bool: True on success, False otherwise
         """
         try:
-            Path.mkdir(client_dir, parents=True, exist_ok=True)
-            data = f"[all]\n{name} ansible_host={ip}\n"
-            with open(f'{client_dir}/inventory.ini', 'w') as f:
+            Path.mkdir(run_dir, parents=True, exist_ok=True)
+            data = f"[{role}]\n"
+            for name, ip in sorted(hosts.items()):
+                data += f"{name} ansible_host={ip}\n"
+            data += f"\n[all:children]\n{role}\n"
+            with open(f'{run_dir}/inventory.ini', 'w') as f:
                 f.write(data)
             return True
         except Exception:
-            self.log.exception('Failed to create client directory')
+            self.log.exception('Failed to create Ansible run directory')
             return False
 
-    def __is_port_open(self, ip: str, port: int = 22, timeout: int = 5, max_attempts: int = 12) -> bool:
-        """Check if a port is open on a given IP address. Will check for 1 minute before giving up with the default
-        timeout and max attempts set.
+    def __cleanup_ansible_client_dirs(self, client_names: list) -> bool:
+        """Clean up the Ansible client directories of destroyed VMs. The directories are deleted in parallel.
 
         Args:
-            ip (str): ip address to check
-            port (int, optional): port to check. Defaults to 22.
-            timeout (int, optional): timeout between checks. Defaults to 5.
-            max_attempts (int, optional): max attempts before giving up. Defaults to 12
+            client_names (list): names of the clients to clean up
 
         Returns:
-            bool: True if the port is open, False otherwise
+            bool: True on success, False otherwise
         """
-        self.display_successful(f'Waiting for {ip}:{port} to be open')
-        while max_attempts > 0:
-            try:
-                with socket.create_connection((ip, port), timeout=timeout):
-                    self.display_successful(f'{ip}:{port} is open, running Ansible playbook')
-                    return True
-            except (socket.timeout, ConnectionRefusedError, OSError):
-                self.display_warning(f'{ip}:{port} is not open. Retrying in {timeout} seconds')
-                sleep(timeout)
-                max_attempts -= 1
-                continue
-        self.display_failed('Failed to determine if port is open')
-        return False
+        paths = [path for path in (Path(f'{self.clients_dir}/{name}') for name in client_names) if path.exists()]
+        if not paths:
+            return True
+        failed = self.artifacts.remove(paths)
+        for path in paths:
+            if path in failed:
+                self.log.error(f'Failed to clean up ansible client directory: {path.name}')
+                self.display_failed(f'Failed to clean up ansible client directory: {path.name}')
+            else:
+                self.display_successful(f'Cleaned up ansible client directory: {path.name}')
+        return not failed
 
-    def __cleanup_ansible_client_dir(self, client_name: str) -> bool:
-        """Clean up the Ansible client directory by removing it when the VM is destroyed.
+    def __prune_artifacts(self) -> None:
+        """Compact old Ansible run artifacts and delete the oldest archives past the size limit. A failure is logged
+        but does not fail the run."""
+        try:
+            compacted, deleted, failed = self.artifacts.prune()
+        except Exception:
+            self.log.exception('Failed to prune Ansible artifacts')
+            return
+        for run, error in failed:
+            self.log.warning(f'Failed to compact Ansible run {run}: {error}')
+        if compacted or deleted:
+            self.log.info(f'Compacted {compacted} Ansible run(s) and deleted {deleted} archive(s)')
 
-        Args:
-            client_name (str): name of the client to clean up
+    def __cache_tf_plan(self, key: str, plan: dict) -> None:
+        """Store the saved tfplan file and its plan data in the plan cache. A cache failure is logged but does not fail
+        the run.
 
-        Returns:
-            bool: True on success, False otherwise
+        Args:
+            key (str): plan cache key
+            plan (dict): Terraform plan data
         """
-        path = Path(self.ansible_dir + f'/clients/{client_name}')
-        if path.exists():
-            if self.run_cmd(f'rm -rf {path}')[1]:
-                self.display_successful(f'Cleaned up ansible client directory: {client_name}')
-            else:
-                return False
-        return True
+        try:
+            self.plan_cache.store(key, self.plan_file, plan)
+        except Exception:
+            self.log.exception('Failed to cache Terraform plan')
 
-    def __plan_tf_destroy(self) -> dict:
-        """Plan the Terraform destroy operation and return the plan data. This is needed to get the VM name of the VM
-        that will be destroyed so we can clean up the Ansible client directory.
+    def __plan_tf_destroy(self) -> bool:
+        """Plan the Terraform destroy operation and save it to the tfplan file. The plan is not read back since the
+        destroyed instances are known from the state. A cached plan is reused when the state and configuration have
+        not changed since it was made.
 
         Returns:
-            dict: plan data or empty dict on failure
+            bool: True on success, False otherwise
         """
+        key = self.plan_cache.key('destroy')
+        if self.plan_cache.load(key, self.plan_file) is not None:
+            self.log.info('Using cached Terraform destroy plan')
+            return True
         try:
-            rsp = self.tf.plan(var_file=self.env_vars_file, destroy=True, out='tfplan')
+            with self.profiler.span('terraform plan -destroy', 'terraform'):
+                rsp = self.tf.plan(var_file=self.env_vars_file, destroy=True, out='tfplan')
             if rsp[2]:
                 self.display_failed(f'Failed to plan Terraform destroy: {rsp[2]}')
-                return {}
+                return False
         except Exception:
             self.log.exception('Failed to plan Terraform destroy')
-            return {}
-        return self.__get_tf_plan_data()
+            return False
+        self.__cache_tf_plan(key, {'created_instances': []})
+        return True
 
     def __get_tf_plan_data(self) -> dict:
-        """Get the Terraform plan data from the tfplan file and load the json str to dict format
+        """Get the Terraform plan data from the tfplan file. The output of terraform show -json is streamed and each
+        resource change is folded into the set of created instances as it is decoded, so neither the plan nor the list
+        of its resource changes is ever held in memory.
 
         Returns:
-            dict: Terraform plan data or empty dict on failure
+            dict: Terraform plan data with the sorted created_instances list or empty dict on failure
         """
         try:
-            return_code, plan_json, stderr = self.tf.show('tfplan', json=True)
-            if return_code != 0:
+            with self.profiler.span('terraform show', 'terraform'), TemporaryFile('w+') as errors, \
+                    Popen([self.tf.terraform_bin_path, 'show', '-json', 'tfplan'], cwd=self.terraform_dir, stdout=PIPE,
+                          stderr=errors, text=True) as proc:
+                created = created_instances(PlanStream(proc.stdout).resource_changes())
+                # terraform still writes prior_state and configuration after resource_changes, it blocks on a full pipe
+                while proc.stdout.read(65536):
+                    pass
+                proc.wait()
+                errors.seek(0)
+                stderr = errors.read()
+            if proc.returncode != 0:
                 self.display_failed(f'Failed to get Terraform plan data: {stderr}')
                 return {}
-            return loads(plan_json)
+            return {'created_instances': sorted(created)}
         except Exception:
             self.log.exception('Failed to get Terraform plan data')
             return {}
 
+    def __apply_saved_plan(self) -> tuple:
+        """Apply the saved tfplan file, streaming the Terraform progress lines to the console as they are written
+
+        Returns:
+            tuple: run_cmd result
+        """
+        def on_line(line: str) -> None:
+            if line.strip():
+                self.display_successful(f'  {line}')
+
+        return self.run_cmd([self.tf.terraform_bin_path, 'apply', '-input=false', '-no-color', 'tfplan'],
+                            on_line=on_line, timeout=self.timeout, cwd=self.terraform_dir)
+
     def __destroy_tf(self) -> bool:
-        """Destroy the Terraform state (Delete the VM in GCP)
+        """Destroy the Terraform state (Delete the VM in GCP) by applying the saved destroy plan instead of planning
+        the destroy again
 
         Returns:
             bool: True on success, False otherwise
         """
         try:
-            rsp = self.tf.cmd('destroy', f'-var-file={self.env_vars_file}', '-auto-approve')
-            if rsp[0] != 0:
+            with self.profiler.span('terraform apply -destroy', 'terraform'):
+                rsp = self.__apply_saved_plan()
+            if not rsp[1]:
                 self.display_failed(f'Failed to destroy Terraform: {rsp[2]}')
                 return False
             return True
@@ -239,49 +409,476 @@ class GCPIaC():
             self.log.exception('Failed to destroy Terraform')
             return False
 
-    def __display_tf_destroy_changes(self, plan: dict) -> None:
-        """Display the changes that will be made by the Terraform destroy operation.
+    def __display_tf_destroy_changes(self, removed: list) -> bool:
+        """Clean up the Ansible client directories of the destroyed instances and display them
 
         Args:
-            plan (dict): Terraform plan data
+            removed (list): names of the destroyed instances
 
         Returns:
-            None
+            bool: True on success, False otherwise
         """
+        if not self.__cleanup_ansible_client_dirs(removed):
+            return False
         payload = 'Successfully destroyed Terraform State\n'
-        for change in plan.get('resource_changes', []):
-            change = change.get('change', {})
-            if change.get('actions', []) == ['delete']:
-                name = change.get('before', {}).get('name', '')
-                if name:
-                    if not self.__cleanup_ansible_client_dir(name):
-                        return False
-                    payload += f"  Removed Instance: {name}\n"
+        for name in removed:
+            payload += f"  Removed Instance: {name}\n"
         self.display_successful(payload)
+        return True
+
+    def __display_ansible_event(self, kind: str, data: dict) -> None:
+        """Display a one line progress message for an Ansible play start or task result
+
+        Args:
+            kind (str): ansible_runner event type
+            data (dict): ansible_runner event data
+        """
+        name = data.get('host', '')
+        task = data.get('task', '')
+        if kind == 'playbook_on_play_start':
+            self.display_successful(f'  PLAY [{data.get("play", "")}]')
+        elif kind == 'runner_on_ok':
+            status = 'changed' if data.get('res', {}).get('changed') else 'ok'
+            self.display_successful(f'  {name}: {status}: {task} ({float(data.get("duration", 0)):.1f}s)')
+        elif kind == 'runner_on_failed' and not data.get('ignore_errors'):
+            self.display_failed(f'  {name}: failed: {task}')
+        elif kind == 'runner_on_unreachable':
+            self.display_failed(f'  {name}: unreachable: {task}')
+
+    def __ansible_event_handler(self, hosts: dict, stats: dict, quiet: bool = False) -> Callable[[dict], bool]:
+        """Get the ansible_runner event handler of a fleet run. Task results are routed to the host they ran on: every
+        task duration is added to the task history and the profiler lane of the host is fed. The final play recap is
+        stored in stats. When the Ansible console output is suppressed, plays and task results are streamed to the
+        console as one line per event instead.
+
+        Args:
+            hosts (dict): host name to IP address mapping
+            stats (dict): filled with the play recap (ok, failures, dark, processed... per host)
+            quiet (bool, optional): the Ansible console output is suppressed. Defaults to False.
+
+        Returns:
+            Callable[[dict], bool]: event handler
+        """
+        profile_handlers = {name: self.profiler.ansible_event_handler(name) for name in hosts}
+
+        def handler(event: dict) -> bool:
+            kind = event.get('event', '')
+            data = event.get('event_data', {})
+            name = data.get('host')
+            for host, profile_handler in profile_handlers.items():
+                if profile_handler and (name is None or name == host):
+                    profile_handler(event)
+            if kind == 'runner_on_ok' and name and 'duration' in data:
+                task = f'{data.get("play", "")}: {data.get("task", "")}'
+                self.task_history.add(name, task, float(data['duration']))
+                self.log.info(f'{name}: {task}', extra={'host': name, 'phase': task,
+                                                        'duration': float(data['duration'])})
+            elif kind == 'playbook_on_stats':
+                stats.update(data)
+            if quiet:
+                self.__display_ansible_event(kind, data)
+            return True
+
+        return handler
 
-    def __run_ansible_playbook(self, name: str, ip: str) -> bool:
-        """Run the Ansible playbook to configure the VM. This will configure the VM with Docker and deploy app1
+    def __ansible_status_handler(self, playbook: str, quiet: bool = False) -> Callable[..., None]:
+        """Get the ansible_runner status handler of a fleet run. The run status is only displayed when the Ansible
+        console output is suppressed.
+
+        Args:
+            playbook (str): playbook being run
+            quiet (bool, optional): the Ansible console output is suppressed. Defaults to False.
+
+        Returns:
+            Callable[..., None]: status handler
+        """
+        def handler(data: dict, runner_config=None) -> None:
+            if quiet:
+                self.display_successful(f'  {playbook}: Ansible run {data.get("status", "")}')
+
+        return handler
+
+    def __report_slow_tasks(self) -> None:
+        """Warn about the tasks of this run that got slower than their rolling baseline and save the task durations to
+        the task history
+        """
+        for host, task, duration, baseline in self.task_history.slow_tasks():
+            self.display_warning(f'{host}: {task} took {duration / baseline:.1f}x its p50 '
+                                 f'({duration:.1f}s vs {baseline:.1f}s)')
+        try:
+            self.task_history.save()
+        except Exception:
+            self.log.exception('Failed to save task history')
+
+    def __start_ssh_master(self, name: str, ip: str) -> bool:
+        """Open the shared SSH connection of a host that every Ansible task multiplexes over. A failure is logged but
+        does not fail the run, Ansible then opens its own connection.
 
         Args:
             name (str): name of the VM
             ip (str): IP address of the VM
 
         Returns:
-            bool: True on success, False otherwise
+            bool: True if the shared connection is up, False otherwise
         """
-        client_dir = Path(f'{self.ansible_dir}/clients/{name}')
-        self.__create_ansible_client_directory(client_dir, name, ip)
-        result = ansible_runner.run(
-            private_data_dir=client_dir.absolute(),
-            playbook=f'{self.ansible_dir}/playbooks/configure_host_and_deploy_app.yml',
-            inventory=f'{client_dir}/inventory.ini',
-            artifact_dir=f'{client_dir}/artifacts',
-            envvars=self.ansible_env_vars)
-        if result.rc == 0:
+        if not self.ssh_masters:
+            return False
+        with self.profiler.span('ssh master', 'ssh', name):
+            if self.ssh_masters.start(ip):
+                return True
+        self.log.warning(f'Failed to open the shared SSH connection to {name} ({ip})',
+                         extra={'host': name, 'phase': 'ssh master'})
+        return False
+
+    def __wait_for_startup(self, name: str, ip: str) -> bool:
+        """Open the shared SSH connection of a host and wait for its startup script marker over it
+
+        Args:
+            name (str): name of the VM
+            ip (str): IP address of the VM
+
+        Returns:
+            bool: True once the startup script is done, False otherwise
+        """
+        control_path = self.ssh_masters.control_path(ip) if self.__start_ssh_master(name, ip) else None
+        start = perf_counter()
+        with self.profiler.span('startup marker', 'readiness', name):
+            done, error = self.startup_gate.wait(ip, control_path)
+        extra = {'host': name, 'phase': 'startup marker', 'duration': round(perf_counter() - start, 3)}
+        if done:
+            self.log.info(f'Startup script finished on {name}', extra=extra)
+            self.display_successful(f'{name} ({ip}) finished its startup script')
             return True
-        self.log.error(f'Failed to run Ansible playbook: {result.status}')
+        self.log.error(f'Failed to wait for the startup script on {name}: {error}', extra=extra)
+        self.display_failed(f'{name} ({ip}): {error}')
         return False
 
+    def __run_ansible_playbook(self, hosts: dict, workers: int = 0, quiet: bool = False,
+                               playbook: str = 'configure_host_and_deploy_app.yml', role: str = 'app') -> dict:
+        """Run the Ansible playbook once across all hosts from a single inventory. Ansible configures up to workers
+        hosts at the same time (forks) and keeps going on the other hosts when one fails, so the result of every host
+        is read from the play recap.
+
+        Args:
+            hosts (dict): host name to IP address mapping
+            workers (int, optional): max number of hosts to configure at the same time. Defaults to 0 (picked from
+            the host count and the local memory).
+            quiet (bool, optional): suppress the Ansible console output. Defaults to False.
+            playbook (str, optional): playbook to run. Defaults to 'configure_host_and_deploy_app.yml'.
+            role (str, optional): inventory group of the hosts. Defaults to 'app'.
+
+        Returns:
+            dict: host name to configuration result mapping
+        """
+        import ansible_runner
+        run_dir = Path(f'{self.clients_dir}/.runs/{Path(playbook).stem}')
+        if not self.__create_ansible_run_directory(run_dir, hosts, role):
+            return {name: False for name in hosts}
+        forks = min(workers, len(hosts)) if workers else auto_forks(len(hosts))
+        self.display_successful(f'Running Ansible playbook {playbook} on {len(hosts)} host(s) with {forks} fork(s) '
+                                f'and the {self.strategy} strategy')
+        stats = {}
+        start = perf_counter()
+        with self.profiler.span(playbook, 'ansible', 'fleet'):
+            result = ansible_runner.run(
+                private_data_dir=run_dir.absolute(),
+                playbook=f'{self.ansible_dir}/playbooks/{playbook}',
+                inventory=f'{run_dir}/inventory.ini',
+                artifact_dir=f'{run_dir}/artifacts',
+                forks=forks,
+                envvars=self.ansible_env_vars,
+                extravars=self.ansible_extravars or None,
+                event_handler=self.__ansible_event_handler(hosts, stats, quiet),
+                status_handler=self.__ansible_status_handler(playbook, quiet),
+                quiet=quiet)
+        duration = round(perf_counter() - start, 3)
+        failed = set(stats.get('failures') or {}) | set(stats.get('dark') or {})
+        processed = set(stats.get('processed') or {})
+        results = {}
+        for name in hosts:
+            results[name] = name not in failed and (result.rc == 0 or name in processed)
+            extra = {'host': name, 'phase': playbook, 'duration': duration}
+            if results[name]:
+                self.log.info(f'Ansible playbook {playbook} succeeded on {name}', extra=extra)
+            else:
+                self.log.error(f'Failed to run Ansible playbook on {name}: {result.status}', extra=extra)
+        return results
+
+    def __publish_app_image(self, service: str, pushed: set) -> bool:
+        """Build and push the image of an app service unless its content addressed tag is already in the registry. A
+        tag recorded as pushed is only trusted once a HEAD request on its manifest finds it, since the registry storage
+        may have been wiped since. docker manifest inspect is used when the registry needs credentials.
+
+        Args:
+            service (str): service name
+            pushed (set): tags recorded as pushed
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        tag = self.app_images.tag(service)
+        exists = self.app_images.manifest_exists(service)
+        if exists is None:
+            insecure = ['--insecure'] if self.app_images.insecure else []
+            exists = self.run_cmd(['docker', 'manifest', 'inspect', *insecure, tag], ignore_error=True, timeout=60)[1]
+        if exists:
+            state = 'up to date' if tag in pushed else 'already in the registry'
+            self.display_successful(f'{service} image {tag} is {state}')
+            return True
+        if tag in pushed:
+            self.display_warning(f'{service} image {tag} was pushed before but is missing from the registry, pushing '
+                                 'it again')
+        with TemporaryDirectory() as context:
+            self.app_images.stage(service, context)
+            with self.profiler.span(f'docker build {service}', 'docker'):
+                if not self.run_cmd(['docker', 'build', '-t', tag, context], timeout=self.timeout)[1]:
+                    self.display_failed(f'Failed to build {service} image {tag}')
+                    return False
+        with self.profiler.span(f'docker push {service}', 'docker'):
+            if not self.run_cmd(['docker', 'push', tag], timeout=self.timeout)[1]:
+                self.display_failed(f'Failed to push {service} image {tag}')
+                return False
+        self.display_successful(f'Built and pushed {service} image {tag}')
+        return True
+
+    def __publish_app_images(self) -> bool:
+        """Build and push the app service images in parallel when a registry is set and pass their tags to Ansible so
+        the hosts pull them instead of building them. Images whose build context did not change are skipped.
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        if self.app_images is None:
+            return True
+        pushed = self.app_images.pushed()
+        with ThreadPoolExecutor(max_workers=len(SERVICES)) as pool:
+            futures = {service: pool.submit(self.__publish_app_image, service, pushed) for service in SERVICES}
+        if not all(future.result() for future in futures.values()):
+            return False
+        tags = self.app_images.tags()
+        try:
+            self.app_images.record_pushed(list(tags.values()))
+        except Exception:
+            self.log.exception('Failed to record pushed app images')
+        self.ansible_extravars.update({'app_images': tags, 'app_registry': self.app_images.registry,
+                                       'app_registry_insecure': self.app_images.insecure})
+        return True
+
+    def __stage_app_files(self, directory: str) -> bool:
+        """Stage the app files laid out like the app directory on the hosts and pass the staging directory and the file
+        manifest to Ansible. The deploy playbook diffs the manifest against the one stored on each host and ships only
+        the changed files as a single archive.
+
+        Args:
+            directory (str): staging directory
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        try:
+            self.app_sync.stage(directory)
+            self.ansible_extravars.update({'app_stage_dir': directory, 'app_manifest': self.app_sync.manifest()})
+            return True
+        except Exception:
+            self.log.exception('Failed to stage app files')
+            return False
+
+    def __display_fleet_results(self, hosts: dict, results: dict) -> None:
+        """Display the per host configuration result of a fleet run
+
+        Args:
+            hosts (dict): host name to IP address mapping
+            results (dict): host name to configuration result mapping
+        """
+        for name, ip in sorted(hosts.items()):
+            if results.get(name):
+                self.display_successful(f'  {name} ({ip}): configured')
+            else:
+                self.display_failed(f'  {name} ({ip}): failed')
+
+    def __update_inventory(self, method: Callable[..., None], *args) -> None:
+        """Update the local inventory index. A failure is only reported as a warning since the index does not affect
+        the deployment.
+
+        Args:
+            method (Callable[..., None]): Inventory method to call with the workspace name and args
+        """
+        try:
+            method(self.workspace.name, *args)
+        except Exception:
+            self.log.exception('Failed to update the inventory index')
+            self.display_warning('Failed to update the inventory index, giac --list may be out of date')
+
+    def __configure_hosts(self, hosts: dict, workers: int = 0,
+                          playbook: str = 'configure_host_and_deploy_app.yml', record: bool = False,
+                          role: str = 'app') -> bool:
+        """Configure all hosts with a single Ansible run. Every host is probed for readiness at the same time. As soon
+        as a host is ready a shared SSH connection is opened to it and its startup script marker is waited for from a
+        single SSH session over it. Once every host is done or timed out, the playbook runs once across the ready
+        hosts with up to workers hosts configured in parallel, so Python and Ansible start only once per fleet. The
+        shared connections are closed once the run is done. Ansible console output is suppressed when more than one
+        host is configured to keep the output readable, and replaced by one line per task result.
+
+        Args:
+            hosts (dict): host name to IP address mapping
+            workers (int, optional): max number of hosts to configure at the same time. Defaults to 0 (picked from
+            the host count and the local memory).
+            playbook (str, optional): playbook to run. Defaults to 'configure_host_and_deploy_app.yml'.
+            record (bool, optional): record the result of every host in the inventory index. Defaults to False.
+            role (str, optional): inventory group of the hosts. Defaults to 'app'.
+
+        Returns:
+            bool: True if every host was configured, False otherwise
+        """
+        if not hosts:
+            return True
+        quiet = len(hosts) > 1
+        results = {}
+        ready_hosts = {}
+        gates = {}
+        gate_pool = ThreadPoolExecutor(max_workers=min(32, len(hosts)))
+        try:
+
+            def on_ready(name: str, ip: str) -> None:
+                self.profiler.add('ssh readiness', 'readiness', probe_start, perf_counter(), name)
+                self.display_successful(f'{name} ({ip}) is ready, waiting for its startup script')
+                gates[name] = gate_pool.submit(self.__wait_for_startup, name, ip)
+
+            self.display_successful(f'Waiting for {len(hosts)} host(s) to accept SSH on port {self.prober.port}')
+            probe_start = perf_counter()
+            for name, ready in self.prober.run(hosts, on_ready).items():
+                if not ready:
+                    self.profiler.add('ssh readiness', 'readiness', probe_start, perf_counter(), name,
+                                      status='timeout')
+                    self.display_failed(f'{name} ({hosts[name]}) did not become ready in {self.prober.deadline}s')
+                    results[name] = False
+            for name, gate in gates.items():
+                try:
+                    done = gate.result()
+                except Exception:
+                    self.log.exception(f'Failed to wait for the startup script on {name}')
+                    done = False
+                if done:
+                    ready_hosts[name] = hosts[name]
+                else:
+                    results[name] = False
+            if ready_hosts:
+                try:
+                    results.update(self.__run_ansible_playbook(ready_hosts, workers, quiet, playbook, role))
+                except Exception:
+                    self.log.exception(f'Failed to run Ansible playbook {playbook}')
+                    results.update({name: False for name in ready_hosts})
+        finally:
+            gate_pool.shutdown()
+            if self.ssh_masters:
+                self.ssh_masters.stop_all()
+        self.__prune_artifacts()
+        if record:
+            self.__update_inventory(self.inventory.set_status, {name: results.get(name, False) for name in hosts})
+        configured = sum(1 for result in results.values() if result)
+        self.display_successful(f'Configured {configured}/{len(hosts)} hosts')
+        self.__display_fleet_results(hosts, results)
+        self.__report_slow_tasks()
+        return configured == len(hosts)
+
+    def save_profile(self) -> bool:
+        """Write the Chrome trace of the recorded phases to the profile path and display the summary table. Does
+        nothing when profiling is disabled.
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        if not self.profile:
+            return True
+        try:
+            self.profiler.write_trace(self.profile)
+        except Exception:
+            self.log.exception('Failed to write profile trace')
+            return False
+        self.display_successful(f'Profile summary (trace written to {self.profile})\n{self.profiler.summary_table()}')
+        return True
+
+    @property
+    def workspace_label(self) -> str:
+        """Get the workspace suffix of the console messages
+
+        Returns:
+            str: ' (workspace <name>)' or an empty string for the default workspace
+        """
+        return '' if self.workspace.is_default else f' (workspace {self.workspace.name})'
+
+    def __prepare_workspace(self, init: bool = True) -> bool:
+        """Create the workspace files and initialize its Terraform working directory on first use
+
+        Args:
+            init (bool, optional): run terraform init if the working directory was never initialized. Defaults to True.
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        try:
+            self.workspace.create()
+        except Exception:
+            self.log.exception(f'Failed to prepare workspace {self.workspace.name}')
+            return False
+        return not init or self.init_terraform(self.tf, self.terraform_dir)
+
+    def init_terraform(self, tf: 'Terraform', working_dir: str, force: bool = False) -> bool:
+        """Initialize a Terraform working directory unless its installed providers already match its dependency lock
+        file. Providers missing from the working directory are hard linked from the shared provider cache first (the
+        lock file of the package working directory is used if it has none) and only if that is not enough terraform
+        init runs, after which the installed providers are added to the cache.
+
+        Args:
+            tf (Terraform): Terraform object of the working directory
+            working_dir (str): Terraform working directory
+            force (bool, optional): always run terraform init. Defaults to False.
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        try:
+            if not force:
+                if self.provider_cache.is_initialized(working_dir):
+                    self.log.info(f'Terraform providers of {working_dir} are up to date, skipping init')
+                    return True
+                with self.profiler.span('terraform providers (cache)', 'terraform'):
+                    seeded = self.provider_cache.seed(working_dir, f'{Path(__file__).parent}/terraform')
+                if seeded:
+                    self.log.info(f'Linked Terraform providers of {working_dir} from {self.provider_cache.cache_dir}')
+                    return True
+            with self.profiler.span('terraform init', 'terraform'):
+                return_code, _, stderr = tf.init()
+            if return_code != 0:
+                self.display_failed(f'Failed to initialize Terraform in {working_dir}: {stderr}')
+                return False
+            self.provider_cache.store(working_dir)
+            return True
+        except Exception:
+            self.log.exception(f'Failed to initialize Terraform in {working_dir}')
+            return False
+
+    def __run_locked(self, action: Callable[[], bool], lock=None, init: bool = True) -> bool:
+        """Run an action while holding the workspace lock so two giac runs never share a working directory, plan file
+        or Ansible client directory
+
+        Args:
+            action (Callable[[], bool]): action to run
+            lock (ContextManager, optional): lock to hold. Defaults to None (the workspace lock).
+            init (bool, optional): initialize the Terraform working directory first. Defaults to True.
+
+        Returns:
+            bool: result of the action or False if the lock is held by another run
+        """
+        try:
+            with lock or self.workspace.lock():
+                if not self.__prepare_workspace(init):
+                    return False
+                return action()
+        except WorkspaceLocked as error:
+            self.display_failed(f'{error}')
+            return False
+
     def destroy_terraform(self) -> bool:
         """Destroy the Terraform state (Delete the VM in GCP) and clean up the Ansible client directory. Display what
         changed have been made to the user on console.
@@ -289,39 +886,402 @@ class GCPIaC():
         Returns:
             bool: True on success, False otherwise
         """
-        self.display_successful('Destroying Terraform State')
-        plan = self.__plan_tf_destroy()
-        if not plan:
+        return self.__run_locked(self.__destroy_terraform)
+
+    def __destroy_terraform(self) -> bool:
+        """Destroy the Terraform state while holding the workspace lock
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        self.display_successful(f'Destroying Terraform State{self.workspace_label}')
+        hosts = self.__get_tf_hosts()
+        if hosts is None or not self.__plan_tf_destroy():
             return False
+        try:
+            known = set(hosts) | set(self.inventory.names(self.workspace.name))
+        except Exception:
+            self.log.exception('Failed to read the inventory index')
+            known = set(hosts)
         if not self.__destroy_tf():
             return False
-        self.__display_tf_destroy_changes(plan)
+        remaining = self.__get_tf_hosts() or {}
+        destroyed = sorted(known - set(remaining))
+        self.__update_inventory(self.inventory.remove, destroyed)
+        return self.__display_tf_destroy_changes(destroyed)
+
+    def __plan_tf_apply(self, tf_vars: dict = None) -> dict | None:
+        """Plan the Terraform apply operation and save it to the tfplan file. The plan data is only loaded when the plan
+        has changes so a no-op apply only costs a single plan. A cached plan is reused when the state and configuration
+        have not changed since it was made.
+
+        Args:
+            tf_vars (dict, optional): extra Terraform variables. Defaults to None.
+
+        Returns:
+            dict | None: plan data, empty dict if there are no changes or None on failure
+        """
+        key = self.plan_cache.key('apply', tf_vars)
+        plan = self.plan_cache.load(key, self.plan_file)
+        if plan is not None:
+            self.log.info('Using cached Terraform apply plan')
+            return plan
+        try:
+            with self.profiler.span('terraform plan', 'terraform'):
+                return_code, _, stderr = self.tf.plan(var_file=self.env_vars_file, var=tf_vars, out='tfplan')
+            if return_code == 0:
+                return {}
+            if return_code != 2:
+                self.display_failed(f'Failed to plan Terraform apply: {stderr}')
+                return None
+        except Exception:
+            self.log.exception('Failed to plan Terraform apply')
+            return None
+        plan = self.__get_tf_plan_data()
+        if not plan:
+            return None
+        self.__cache_tf_plan(key, plan)
+        return plan
+
+    def __apply_tf_plan(self) -> bool:
+        """Apply the saved tfplan file
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        try:
+            with self.profiler.span('terraform apply', 'terraform'):
+                rsp = self.__apply_saved_plan()
+            if not rsp[1]:
+                self.display_failed(f'Failed to apply Terraform: {rsp[2]}')
+                return False
+            return True
+        except Exception:
+            self.log.exception('Failed to apply Terraform')
+            return False
+
+    @staticmethod
+    def __get_created_instances(plan: dict) -> set:
+        """Get the names of the instances the plan will create or replace. These are the only hosts that need to be
+        configured after the apply. Plans cached by an older release still carry their resource changes.
+
+        Args:
+            plan (dict): Terraform plan data
+
+        Returns:
+            set: instance names
+        """
+        if 'created_instances' in plan:
+            return set(plan['created_instances'])
+        return created_instances(plan.get('resource_changes', []))
+
+    def __get_tf_hosts(self, tf: 'Terraform' = None) -> dict | None:
+        """Get the instance name to IP address mapping from the Terraform outputs. The outputs are read straight from
+        the local state file, terraform output is only run when there is none (e.g. a remote backend).
+
+        Args:
+            tf (Terraform, optional): Terraform object to read the outputs from. Defaults to None (self.tf).
+
+        Returns:
+            dict | None: host name to IP address mapping or None on failure
+        """
+        state = self.state if tf is None else StateReader(f'{tf.working_dir}/terraform.tfstate')
+        try:
+            if state.version():
+                return state.output('instances', {})
+        except Exception:
+            self.log.exception(f'Failed to read Terraform state {state.path}')
+        try:
+            with self.profiler.span('terraform output', 'terraform'):
+                outputs = (tf or self.tf).output()
+            if outputs is None:
+                self.display_failed('Failed to get Terraform outputs')
+                return None
+            return outputs.get('instances', {}).get('value', {})
+        except Exception:
+            self.log.exception('Failed to get Terraform outputs')
+            return None
+
+    def __read_state_output(self, name: str, default=None):
+        """Read a Terraform output from the local state file
+
+        Args:
+            name (str): output name
+            default (optional): value returned when there is no state or no such output. Defaults to None.
+
+        Returns:
+            output value or default
+        """
+        try:
+            return self.state.output(name, default) if self.state.version() else default
+        except Exception:
+            self.log.exception(f'Failed to read Terraform state {self.state.path}')
+            return default
+
+    def __use_fleet_cache(self) -> None:
+        """Point the Ansible package and image pulls at the fleet cache VM when the Terraform state has one. The hosts'
+        startup script already switched the distro repositories and the Docker daemon to it.
+        """
+        mirrors = self.__read_state_output('cache', {})
+        if mirrors:
+            self.ansible_extravars.update(mirrors)
+            self.display_successful(f'Using fleet cache {mirrors.get("package_mirror", "")}')
+
+    def __use_performance_profile(self) -> None:
+        """Size the nginx and php-fpm configuration rendered by the deploy playbook to the machine type of the hosts"""
+        machine_type = self.__read_state_output('machine_type', '')
+        if machine_type and machine_resources(machine_type) is None:
+            self.display_warning(f'Unknown machine type {machine_type!r}, using the default performance profile')
+        profile = performance_profile(machine_type)
+        self.ansible_extravars['performance_profile'] = profile
+        self.display_successful(f'Using performance profile of {profile["vcpus"]} vCPU, {profile["memory_mb"]} MiB: '
+                                f'{profile["nginx_worker_processes"]} nginx workers, '
+                                f'{profile["php_pm_max_children"]} php-fpm children')
+
+    def __save_tf_vars(self, values: dict) -> bool:
+        """Save variables given on the command line to the workspace tfvars, so a later apply without them keeps the
+        fleet size and the cache instead of planning back to the tfvars values
+
+        Args:
+            values (dict): variable name to value mapping
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        if not values:
+            return True
+        try:
+            save_tf_vars(self.env_vars_file, values)
+        except Exception:
+            self.log.exception(f'Failed to save Terraform variables to {self.env_vars_file}')
+            self.display_failed(f'Failed to save Terraform variables to {self.env_vars_file}')
+            return False
+        self.display_successful(f'Saved {", ".join(f"{var}={value}" for var, value in values.items())} to '
+                                f'{self.env_vars_file}')
         return True
 
-    def apply_terraform(self) -> bool:
-        """Apply the Terraform state (Create the VM in GCP) and run the Ansible playbook to configure the VM.
+    def __unconfigured_hosts(self) -> set:
+        """Get the hosts of the workspace whose last configuration failed or never finished, from the inventory index
+
+        Returns:
+            set: host names
+        """
+        try:
+            return {instance['name'] for instance in self.inventory.instances(self.workspace.name)
+                    if instance['status'] != 'configured'}
+        except Exception:
+            self.log.exception('Failed to read the inventory index')
+            self.display_warning('Failed to read the inventory index, hosts that failed to configure are not retried')
+            return set()
+
+    def apply_terraform(self, count: int = None, workers: int = 0, reconfigure: bool = False,
+                        cache: bool = False) -> bool:
+        """Apply the Terraform state (Create the VMs in GCP) and run the Ansible playbook to configure the VMs. The
+        apply is incremental: Terraform is skipped when the plan is empty and only the hosts that were created or
+        replaced, or whose last configuration failed, are configured. When a golden image baked from the current
+        sources exists the VMs boot from it and only the app deploy playbook is run.
+
+        Args:
+            count (int, optional): number of instances to create, saved to the workspace tfvars. Defaults to None
+            (use tfvars or variable default).
+            workers (int, optional): max number of hosts to configure at the same time. Defaults to 0 (picked from
+            the host count and the local memory).
+            reconfigure (bool, optional): run the Ansible playbook on every host, not only the new ones.
+            Defaults to False.
+            cache (bool, optional): create the fleet cache VM, a package proxy and registry mirror the hosts install
+            through, saved to the workspace tfvars. Defaults to False (keep the cache_enabled tfvars setting).
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        return self.__run_locked(lambda: self.__apply_terraform(count, workers, reconfigure, cache))
+
+    def __apply_terraform(self, count: int = None, workers: int = 0, reconfigure: bool = False,
+                          cache: bool = False) -> bool:
+        """Apply the Terraform state and configure the VMs while holding the workspace lock
+
+        Args:
+            count (int, optional): number of instances to create, saved to the workspace tfvars. Defaults to None
+            (use tfvars or variable default).
+            workers (int, optional): max number of hosts to configure at the same time. Defaults to 0 (picked from
+            the host count and the local memory).
+            reconfigure (bool, optional): run the Ansible playbook on every host, not only the new ones.
+            Defaults to False.
+            cache (bool, optional): create the fleet cache VM, a package proxy and registry mirror the hosts install
+            through, saved to the workspace tfvars. Defaults to False (keep the cache_enabled tfvars setting).
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        self.display_successful(f'Applying Terraform State{self.workspace_label}')
+        saved_vars = {'instance_count': count} if count else {}
+        if cache:
+            saved_vars['cache_enabled'] = True
+        if not self.__save_tf_vars(saved_vars):
+            return False
+        tf_vars = {}
+        image = self.golden_image.select()
+        if image:
+            self.display_successful(f'Using baked golden image {image}')
+            tf_vars.update({'boot_image': image, 'baked_image': True})
+        elif self.golden_image.load_record():
+            self.display_warning(f'Golden image {self.golden_image.load_record().get("name")} was baked from an older '
+                                 'startup script or bake playbooks, new hosts boot from the stock image and are fully '
+                                 'configured. Run giac -B to bake it again')
+        plan = self.__plan_tf_apply(tf_vars or None)
+        if plan is None:
+            return False
+        if plan:
+            if not self.__apply_tf_plan():
+                return False
+        else:
+            self.display_successful('No Terraform changes detected')
+        hosts = self.__get_tf_hosts()
+        if hosts is None:
+            return False
+        created = self.__get_created_instances(plan)
+        self.__update_inventory(self.inventory.sync, hosts, self.__boot_images(hosts, created, image))
+        self.__use_fleet_cache()
+        self.__use_performance_profile()
+        payload = 'Successfully applied Terraform State\n'
+        for name, ip in sorted(hosts.items()):
+            payload += f'  Name: {name}, IP: {ip}{" (new)" if name in created else ""}\n'
+        self.display_successful(payload)
+        if not reconfigure:
+            pending = self.__unconfigured_hosts() - set(created)
+            if pending & set(hosts):
+                self.display_successful(f'Retrying the configuration of {", ".join(sorted(pending & set(hosts)))}')
+            hosts = {name: ip for name, ip in hosts.items() if name in created or name in pending}
+            if not hosts:
+                self.display_successful('All hosts are up to date, nothing to configure')
+                return True
+        if not self.__publish_app_images():
+            return False
+        playbook = 'configure_host_and_deploy_app.yml'
+        if image and all(boot_image == image for boot_image in self.__boot_images(hosts, created, image).values()):
+            playbook = 'deploy_app1.yml'
+        with TemporaryDirectory() as stage:
+            if not self.__stage_app_files(stage):
+                return False
+            return self.__configure_hosts(hosts, workers, playbook, record=True)
+
+    def __boot_images(self, hosts: dict, created: set, image: str = None) -> dict:
+        """Get the image every instance booted from. Running instances keep their image when the golden image changes,
+        so only the instances created by this apply are known to boot from the selected one when the state does not
+        record it.
+
+        Args:
+            hosts (dict): host name to IP address mapping
+            created (set): names of the instances created or replaced by this apply
+            image (str, optional): golden image selected for this apply. Defaults to None (stock image).
+
+        Returns:
+            dict: host name to image name mapping, '' for unknown or stock images of the state-less case
+        """
+        recorded = self.__read_state_output('boot_images', {})
+        images = {}
+        for name in hosts:
+            boot_image = recorded.get(name) or (image if name in created else '') or ''
+            images[name] = boot_image.rsplit('/', 1)[-1]
+        return images
+
+    def __apply_bake_tf(self, tf_vars: dict) -> bool:
+        """Apply the golden image bake module
+
+        Args:
+            tf_vars (dict): Terraform variables
 
         Returns:
             bool: True on success, False otherwise
         """
-        self.display_successful('Applying Terraform State')
         try:
-            self.tf.destroy()
-            return_code, _, stderr = self.tf.apply(var_file=self.env_vars_file, skip_plan=True, auto_approve=True)
+            with self.profiler.span('terraform apply (bake)', 'terraform'):
+                return_code, _, stderr = self.bake_tf.apply(var_file=self.env_vars_file, var=tf_vars, skip_plan=True,
+                                                            auto_approve=True)
             if return_code != 0:
-                self.display_failed(f'Failed to apply Terraform: {stderr}')
+                self.display_failed(f'Failed to apply Terraform bake module: {stderr}')
                 return False
-            outputs = self.tf.output()
-            ip = outputs["instance_ip"]["value"]
-            name = outputs["instance_name"]["value"]
-            self.display_successful(f'Successfully applied Terraform State\n  Name: {name}, IP: {ip}')
+            return True
         except Exception:
-            self.log.exception('Failed to apply Terraform')
+            self.log.exception('Failed to apply Terraform bake module')
             return False
-        if self.__is_port_open(ip):
-            return self.__run_ansible_playbook(name, ip)
-        self.log.error('Failed to configure system')
-        return False
+
+    def __release_golden_image(self) -> bool:
+        """Remove the golden image from the bake module state so destroying the builder instance keeps the image
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        try:
+            rsp = self.bake_tf.cmd('state rm', 'google_compute_image.golden[0]')
+            if rsp[0] != 0:
+                self.display_failed(f'Failed to release golden image from Terraform state: {rsp[2]}')
+                return False
+            return True
+        except Exception:
+            self.log.exception('Failed to release golden image from Terraform state')
+            return False
+
+    def __destroy_bake_builder(self) -> bool:
+        """Destroy the builder instance of the bake module
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        try:
+            with self.profiler.span('terraform destroy (bake)', 'terraform'):
+                rsp = self.bake_tf.cmd('destroy', f'-var-file={self.env_vars_file}', '-auto-approve')
+            if rsp[0] != 0:
+                self.display_failed(f'Failed to destroy bake builder instance: {rsp[2]}')
+                return False
+            return True
+        except Exception:
+            self.log.exception('Failed to destroy bake builder instance')
+            return False
+
+    def bake_image(self) -> bool:
+        """Bake the golden image. A temporary builder VM runs the startup script and the bake playbook (Docker and the
+        app base images), then it is stopped and its boot disk is saved as an image named by the content hash of the
+        startup script and the bake playbooks. The builder VM is always destroyed. Nothing is done if the image for the
+        current sources was already baked. The bake module is shared by all workspaces so it has its own lock.
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        lock = file_lock(f'{Path(__file__).parent}/terraform/bake/.giac.lock')
+        return self.__run_locked(self.__bake_image, lock, init=False)
+
+    def __bake_image(self) -> bool:
+        """Bake the golden image while holding the bake lock
+
+        Returns:
+            bool: True on success, False otherwise
+        """
+        content_hash = self.golden_image.content_hash()
+        name = self.golden_image.image_name(content_hash)
+        if self.golden_image.select(content_hash=content_hash):
+            self.display_successful(f'Golden image {name} is up to date, nothing to bake')
+            return True
+        self.display_successful(f'Baking golden image {name}')
+        baked = False
+        hosts = {}
+        try:
+            if not self.__apply_bake_tf({'image_name': name, 'create_image': False}):
+                return False
+            hosts = self.__get_tf_hosts(self.bake_tf)
+            if not hosts or not self.__configure_hosts(hosts, 1, 'bake_image.yml', role='builder'):
+                return False
+            if not self.__apply_bake_tf({'image_name': name, 'create_image': True}):
+                return False
+            baked = self.__release_golden_image()
+        finally:
+            self.__destroy_bake_builder()
+            self.__cleanup_ansible_client_dirs(list(hosts or {}))
+        if not baked:
+            return False
+        self.golden_image.save_record(content_hash)
+        self.display_successful(f'Successfully baked golden image {name}')
+        return True
 
 
 class Init(GCPIaC):
@@ -388,25 +1348,28 @@ class Init(GCPIaC):
         name = f'{Path(__file__).parent}/gcp_env/keys/.ansible_rsa'
         if Path(name).exists():
             if self.__force:
-                if not self.run_cmd(f'rm -f {name}*')[1]:
+                try:
+                    for path in Path(name).parent.glob(f'{Path(name).name}*'):
+                        path.unlink()
+                except OSError:
+                    self.log.exception('Failed to remove the Ansible SSH keys')
                     return False
             else:
                 return True
-        return self.run_cmd(f'ssh-keygen -t rsa -b 4096 -C "ansible" -f {name} -N ""')[1]
+        return self.run_cmd(['ssh-keygen', '-t', 'rsa', '-b', '4096', '-C', 'ansible', '-f', name, '-N', ''])[1]
 
     def __initialize_terraform(self) -> bool:
-        """Initialize Terraform by running the init command
+        """Initialize Terraform in the package and bake module working directories. init is skipped when the installed
+        providers already match the dependency lock file, unless forced.
 
         Returns:
             bool: True on success, False otherwise
         """
-        try:
-            self.tf.init()
-            self.log.info('Successfully initialized Terraform')
-            return True
-        except Exception:
-            self.log.exception('Failed to initialize Terraform')
-            return False
+        for tf in [self.tf, self.bake_tf]:
+            if not self.init_terraform(tf, tf.working_dir, self.__force):
+                return False
+        self.log.info('Successfully initialized Terraform')
+        return True
 
     def _run(self) -> bool:
         """Run the initialization process for GCP IaC
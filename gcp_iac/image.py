@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+from hashlib import sha256
+from json import dump, load
+from pathlib import Path
+
+
+BAKE_PLAYBOOKS = ('bake_image.yml', 'install_and_configure_docker.yml')
+
+
+class GoldenImage():
+    def __init__(self, startup_script: str, playbooks_dir: str, record_file: str, playbooks: tuple = BAKE_PLAYBOOKS,
+                 prefix: str = 'giac-golden'):
+        """Naming and selection of the baked golden image. The image is named by a content hash of the startup script
+        and the playbooks the bake runs, so any change to what the bake installs produces a new image name, while app
+        and deploy changes keep the image valid. The last successful bake is recorded locally and apply only uses the
+        baked image while its hash still matches.
+
+        Args:
+            startup_script (str): path to the VM startup script
+            playbooks_dir (str): path to the Ansible playbooks directory
+            record_file (str): path to the JSON file recording the last baked image
+            playbooks (tuple, optional): playbooks run by the bake, relative to playbooks_dir.
+            Defaults to BAKE_PLAYBOOKS.
+            prefix (str, optional): image name prefix. Defaults to 'giac-golden'.
+        """
+        self.startup_script = Path(startup_script)
+        self.playbooks_dir = Path(playbooks_dir)
+        self.record_file = Path(record_file)
+        self.playbooks = playbooks
+        self.prefix = prefix
+
+    @property
+    def sources(self) -> list:
+        """Get the files the image content is built from: the startup script and the bake playbooks
+
+        Returns:
+            list: list of source file paths
+        """
+        return [self.startup_script, *(self.playbooks_dir / playbook for playbook in sorted(self.playbooks))]
+
+    def content_hash(self) -> str:
+        """Hash the relative path and content of every source file
+
+        Returns:
+            str: hex sha256 digest
+        """
+        digest = sha256()
+        for path in self.sources:
+            name = path.name if path == self.startup_script else path.relative_to(self.playbooks_dir).as_posix()
+            digest.update(name.encode() + b'\0' + path.read_bytes() + b'\0')
+        return digest.hexdigest()
+
+    def image_name(self, content_hash: str = None) -> str:
+        """Get the GCP image name for a content hash (lowercase letters, digits and hyphens, max 63 characters)
+
+        Args:
+            content_hash (str, optional): content hash. Defaults to None (hash the current sources).
+
+        Returns:
+            str: image name
+        """
+        return f'{self.prefix}-{(content_hash or self.content_hash())[:24]}'
+
+    def load_record(self) -> dict:
+        """Load the record of the last baked image
+
+        Returns:
+            dict: image record (name, hash, created) or empty dict if nothing was baked
+        """
+        try:
+            with open(self.record_file, 'r') as file:
+                return load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_record(self, content_hash: str) -> dict:
+        """Record a successful bake
+
+        Args:
+            content_hash (str): content hash the image was baked from
+
+        Returns:
+            dict: image record
+        """
+        record = {'name': self.image_name(content_hash), 'hash': content_hash,
+                  'created': datetime.now(timezone.utc).isoformat()}
+        self.record_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.record_file, 'w') as file:
+            dump(record, file, indent=2)
+        return record
+
+    def select(self, record: dict = None, content_hash: str = None) -> str | None:
+        """Select the baked image to boot from. The image is only used when it was baked from the current sources.
+
+        Args:
+            record (dict, optional): image record. Defaults to None (load the record file).
+            content_hash (str, optional): current content hash. Defaults to None (hash the current sources).
+
+        Returns:
+            str | None: image name or None if there is no matching baked image
+        """
+        record = self.load_record() if record is None else record
+        if not record.get('hash'):
+            return None
+        if record['hash'] != (content_hash or self.content_hash()):
+            return None
+        return record.get('name') or self.image_name(record['hash'])
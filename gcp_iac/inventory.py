@@ -0,0 +1,168 @@
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS instances (
+    workspace TEXT NOT NULL,
+    name TEXT NOT NULL,
+    ip TEXT NOT NULL DEFAULT '',
+    image TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'created',
+    configured_at TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (workspace, name)
+)
+'''
+COLUMNS = ('workspace', 'name', 'ip', 'image', 'status', 'configured_at', 'updated_at')
+
+
+class Inventory():
+    def __init__(self, path: str):
+        """Local SQLite index of the instances giac deployed in every workspace: IP, boot image, last configuration
+        status and time. It is updated on apply and destroy so listing what is deployed does not need Terraform.
+        Every call uses its own short lived connection in WAL mode, so concurrent runs in other workspaces can write
+        to it at the same time.
+
+        Args:
+            path (str): path to the SQLite database file
+        """
+        self.path = Path(path)
+
+    def __connect(self) -> sqlite3.Connection:
+        """Open a connection to the database, creating the schema on first use
+
+        Returns:
+            sqlite3.Connection: database connection
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(SCHEMA)
+        return connection
+
+    @staticmethod
+    def __now() -> str:
+        """Get the current UTC time
+
+        Returns:
+            str: ISO 8601 timestamp
+        """
+        return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    def sync(self, workspace: str, hosts: dict, images: dict = None) -> None:
+        """Record the instances of a workspace after an apply. Instances that are no longer deployed are removed and
+        the IP and boot image of the others are updated, keeping their configuration status.
+
+        Args:
+            workspace (str): workspace name
+            hosts (dict): host name to IP address mapping
+            images (dict, optional): host name to boot image mapping. Defaults to None ('' for the public base image).
+        """
+        now = self.__now()
+        images = images or {}
+        with closing(self.__connect()) as connection, connection:
+            connection.executemany(
+                'INSERT INTO instances (workspace, name, ip, image, updated_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (workspace, name) DO UPDATE SET ip = excluded.ip, image = excluded.image, '
+                'updated_at = excluded.updated_at',
+                [(workspace, name, ip, images.get(name, ''), now) for name, ip in hosts.items()])
+            names = list(hosts)
+            connection.execute(f'DELETE FROM instances WHERE workspace = ? AND name NOT IN '
+                               f'({", ".join("?" * len(names))})', [workspace, *names])
+
+    def set_status(self, workspace: str, results: dict, image: str = None) -> None:
+        """Record the configuration result of instances
+
+        Args:
+            workspace (str): workspace name
+            results (dict): host name to configuration result mapping
+            image (str, optional): image the instances were booted from. Defaults to None (unchanged).
+        """
+        now = self.__now()
+        with closing(self.__connect()) as connection, connection:
+            connection.executemany(
+                'UPDATE instances SET status = ?, configured_at = ?, updated_at = ?, image = COALESCE(?, image) '
+                'WHERE workspace = ? AND name = ?',
+                [('configured' if result else 'failed', now, now, image, workspace, name)
+                 for name, result in results.items()])
+
+    def remove(self, workspace: str, names: list = None) -> None:
+        """Remove destroyed instances
+
+        Args:
+            workspace (str): workspace name
+            names (list, optional): instance names. Defaults to None (every instance of the workspace).
+        """
+        with closing(self.__connect()) as connection, connection:
+            if names is None:
+                connection.execute('DELETE FROM instances WHERE workspace = ?', [workspace])
+            else:
+                connection.executemany('DELETE FROM instances WHERE workspace = ? AND name = ?',
+                                       [(workspace, name) for name in names])
+
+    def instances(self, workspace: str = None) -> list:
+        """Get the recorded instances
+
+        Args:
+            workspace (str, optional): only get the instances of this workspace. Defaults to None (all workspaces).
+
+        Returns:
+            list: instance records as dicts, ordered by workspace and name
+        """
+        if not self.path.exists():
+            return []
+        query = f'SELECT {", ".join(COLUMNS)} FROM instances'
+        params = []
+        if workspace:
+            query += ' WHERE workspace = ?'
+            params.append(workspace)
+        with closing(self.__connect()) as connection:
+            return [dict(row) for row in connection.execute(f'{query} ORDER BY workspace, name', params)]
+
+    def names(self, workspace: str) -> list:
+        """Get the names of the recorded instances of a workspace
+
+        Args:
+            workspace (str): workspace name
+
+        Returns:
+            list: instance names
+        """
+        return [instance['name'] for instance in self.instances(workspace)]
+
+    def list_table(self, workspace: str = None) -> str:
+        """Format the recorded instances as a table for the console
+
+        Args:
+            workspace (str, optional): only list the instances of this workspace. Defaults to None (all workspaces).
+
+        Returns:
+            str: instance table
+        """
+        payload = f'{"Workspace":<12} {"Name":<20} {"IP":<16} {"Status":<11} {"Configured":<26} {"Image"}\n'
+        for row in self.instances(workspace):
+            payload += (f'{row["workspace"]:<12} {row["name"]:<20} {row["ip"]:<16} {row["status"]:<11} '
+                        f'{row["configured_at"] or "-":<26} {row["image"] or "-"}\n')
+        return payload
+
+    def status_table(self) -> str:
+        """Format a per workspace summary of the recorded instances for the console
+
+        Returns:
+            str: status table
+        """
+        workspaces = {}
+        for row in self.instances():
+            summary = workspaces.setdefault(row['workspace'], {'total': 0, 'configured': 0, 'failed': 0, 'last': ''})
+            summary['total'] += 1
+            summary[row['status']] = summary.get(row['status'], 0) + 1
+            summary['last'] = max(summary['last'], row['configured_at'])
+        payload = f'{"Workspace":<12} {"Instances":>9} {"Configured":>10} {"Failed":>6}  {"Last configured"}\n'
+        for name, summary in workspaces.items():
+            payload += (f'{name:<12} {summary["total"]:>9} {summary["configured"]:>10} {summary["failed"]:>6}  '
+                        f'{summary["last"] or "-"}\n')
+        return payload
@@ -1,10 +1,69 @@
+import atexit
 import logging
-from os import makedirs
+import logging.handlers
+from copy import copy
+from json import dumps
+from os import makedirs, remove
 from os.path import join
-from time import gmtime
+from queue import SimpleQueue
+from time import gmtime, strftime
 from pathlib import Path
 
 
+EXTRA_FIELDS = ('host', 'phase', 'duration')
+_TRACEBACK_FORMATTER = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        """Format a record as one JSON object per line. The host, phase and duration fields are included when they
+        are passed with extra={...}.
+
+        Args:
+            record (logging.LogRecord): log record
+
+        Returns:
+            str: JSON line
+        """
+        entry = {
+            'time': f'{strftime("%Y-%m-%dT%H:%M:%S", gmtime(record.created))}.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        for field in EXTRA_FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Prepare a record for the queue. The message arguments are merged and the traceback is formatted into
+        exc_text, since exc_info cannot cross threads safely. Unlike QueueHandler.prepare the traceback is not appended
+        to the message, so the JSON formatter can still write it to its exception field.
+
+        Args:
+            record (logging.LogRecord): log record
+
+        Returns:
+            logging.LogRecord: copy of the record to enqueue
+        """
+        record = copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _TRACEBACK_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
 def _log_mapping(level: str) -> int:
     """Maps the log level to the logging level. Will default to INFO if the level is not found.
 
@@ -40,6 +99,19 @@ def _create_log_dir(dir_name: str) -> bool:
     return False
 
 
+def _is_console_record(record: logging.LogRecord) -> bool:
+    """Keep the per task timing records out of the console. They go to the log file only, the console already shows
+    every task result.
+
+    Args:
+        record (logging.LogRecord): log record
+
+    Returns:
+        bool: True if the record is written to the console
+    """
+    return not hasattr(record, 'duration')
+
+
 def _set_stream_handler(logger: logging.Logger, level: int, formatter: logging.Formatter) -> bool:
     """Set the stream handler for the logger.
 
@@ -55,6 +127,7 @@ def _set_stream_handler(logger: logging.Logger, level: int, formatter: logging.F
         stream_handler = logging.StreamHandler()
         stream_handler.setLevel(level)
         stream_handler.setFormatter(formatter)
+        stream_handler.addFilter(_is_console_record)
         logger.addHandler(stream_handler)
         return True
     except Exception as error:
@@ -62,8 +135,45 @@ def _set_stream_handler(logger: logging.Logger, level: int, formatter: logging.F
     return False
 
 
+def _compress_rotated_log(source: str, dest: str) -> None:
+    """Rotate a log file by gzip compressing it to its rotated name.
+
+    Args:
+        source (str): the log file
+        dest (str): the rotated file name
+    """
+    import gzip
+    from shutil import copyfileobj
+    with open(source, 'rb') as file, gzip.open(dest, 'wb') as compressed:
+        copyfileobj(file, compressed)
+    remove(source)
+
+
+def _rotating_file_handler(log_file: str, max_bytes: int, backup_count: int, when: str) -> logging.Handler:
+    """Create a file handler that rotates the log file by size, or by time when when is set, and gzip compresses
+    the rotated files.
+
+    Args:
+        log_file (str): the log file
+        max_bytes (int): size to rotate the log file at
+        backup_count (int): number of rotated files to keep
+        when (str): time interval to rotate the log file at (see TimedRotatingFileHandler), empty for size based
+
+    Returns:
+        logging.Handler: the file handler
+    """
+    if when:
+        handler = logging.handlers.TimedRotatingFileHandler(log_file, when=when, backupCount=backup_count, utc=True)
+    else:
+        handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
+    handler.namer = lambda name: f'{name}.gz'
+    handler.rotator = _compress_rotated_log
+    return handler
+
+
 def _set_file_handler(logger: logging.Logger, name: str, dir_name: str, level: int,
-                      formatter: logging.Formatter) -> bool:
+                      formatter: logging.Formatter, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                      when: str = '') -> bool:
     """Set the file handler for the logger.
 
     Args:
@@ -72,6 +182,9 @@ def _set_file_handler(logger: logging.Logger, name: str, dir_name: str, level: i
         dir_name (str): log directory name
         level (int): the logging level
         formatter (logging.Formatter): the logging formatter
+        max_bytes (int, optional): size to rotate the log file at. Defaults to 10 MiB.
+        backup_count (int, optional): number of compressed rotated files to keep. Defaults to 5.
+        when (str, optional): rotate by time instead of size, e.g. 'midnight'. Defaults to ''.
 
     Returns:
         bool: True if the file handler was set, False otherwise
@@ -82,27 +195,61 @@ def _set_file_handler(logger: logging.Logger, name: str, dir_name: str, level: i
         else:
             dir_name = Path(dir_name)
         log_file = join(dir_name, f'{name}.log')
-        file_handler = logging.FileHandler(log_file)
+        file_handler = _rotating_file_handler(log_file, max_bytes, backup_count, when)
         file_handler.setLevel(level)
         file_handler.setFormatter(formatter)
         logger.addHandler(file_handler)
         return True
     except FileNotFoundError as error:
         if _create_log_dir(dir_name):
-            return _set_file_handler(logger, name, dir_name, level, formatter)
+            return _set_file_handler(logger, name, dir_name, level, formatter, max_bytes, backup_count, when)
         print(f'Failed to create log file: {error}')
     except Exception as error:
         print(f'Failed to create log file: {error}')
     return False
 
 
-def get_logger(name: str, level: str = 'info', dir_name: str = ''):
-    """Get the logger or create it if it does not exist.
+def _set_queue_handler(logger: logging.Logger) -> bool:
+    """Move the handlers of the logger behind a queue. Logging calls only enqueue the record and a background listener
+    thread does the formatting and I/O, so callers never block on the console or disk. The listener is flushed and
+    stopped at exit.
+
+    Args:
+        logger (logging.Logger): logging object
+
+    Returns:
+        bool: True if the queue handler was set, False otherwise
+    """
+    try:
+        queue = SimpleQueue()
+        listener = logging.handlers.QueueListener(queue, *logger.handlers, respect_handler_level=True)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        logger.addHandler(_QueueHandler(queue))
+        listener.start()
+        atexit.register(listener.stop)
+        return True
+    except Exception as error:
+        print(f'Failed to set queue handler: {error}')
+    return False
+
+
+def get_logger(name: str, level: str = 'info', dir_name: str = '', json_lines: bool = False, queued: bool = False,
+               max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5, when: str = '', file_name: str = ''):
+    """Get the logger or create it if it does not exist. The log file is rotated by size (or by time when when is
+    set) and rotated files are gzip compressed. Rotation renames the file under any other process writing to it, so
+    processes that run at the same time must log to different files.
 
     Args:
         name (str): The name of the logger
         level (str, optional): logging level. Defaults to 'info'.
         dir_name (str, optional): directory to store logs. Defaults to ''.
+        json_lines (bool, optional): write the log file as JSON lines. Defaults to False.
+        queued (bool, optional): log through a queue handled by a background thread. Defaults to False.
+        max_bytes (int, optional): size to rotate the log file at. Defaults to 10 MiB.
+        backup_count (int, optional): number of compressed rotated files to keep. Defaults to 5.
+        when (str, optional): rotate by time instead of size, e.g. 'midnight'. Defaults to ''.
+        file_name (str, optional): name of the log file without .log. Defaults to '' (the logger name).
 
     Returns:
         logging.Logger: The logger object
@@ -114,5 +261,8 @@ def get_logger(name: str, level: str = 'info', dir_name: str = ''):
         formatter = logging.Formatter('[%(asctime)s][%(levelname)s][%(module)s,%(lineno)d]: %(message)s')
         formatter.converter = gmtime
         _set_stream_handler(logger, level, formatter)
-        _set_file_handler(logger, name, dir_name, level, formatter)
+        _set_file_handler(logger, file_name or name, dir_name, level, JsonFormatter() if json_lines else formatter,
+                          max_bytes, backup_count, when)
+        if queued:
+            _set_queue_handler(logger)
     return logger
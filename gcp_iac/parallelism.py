@@ -0,0 +1,47 @@
+from os import cpu_count, sysconf
+
+
+STRATEGIES = ('linear', 'free')
+FORKS_PER_CPU = 16
+FORK_MEMORY = 96 * 1024 * 1024
+MAX_FORKS = 64
+
+
+def available_memory() -> int | None:
+    """Get the physical memory currently available on this machine
+
+    Returns:
+        int | None: available memory in bytes or None if it cannot be read on this platform
+    """
+    try:
+        with open('/proc/meminfo') as file:
+            for line in file:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return sysconf('SC_AVPHYS_PAGES') * sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def auto_forks(host_count: int, cpus: int = None, memory: int = None) -> int:
+    """Pick the number of Ansible forks for a fleet run: one fork per host, bounded by FORKS_PER_CPU per CPU, by the
+    available memory and by MAX_FORKS. A fork is a Python process that mostly waits on SSH, so a CPU serves several of
+    them, but it still templates, packs modules and parses results on the control node, which python -m
+    benchmarks.forks cannot show since its fake tasks only sleep. Each fork costs about FORK_MEMORY of resident memory.
+
+    Args:
+        host_count (int): number of hosts in the run
+        cpus (int, optional): number of CPUs. Defaults to None (this machine).
+        memory (int, optional): available memory in bytes. Defaults to None (this machine).
+
+    Returns:
+        int: number of forks, at least 1
+    """
+    forks = min(host_count, (cpus or cpu_count() or 1) * FORKS_PER_CPU, MAX_FORKS)
+    memory = memory if memory is not None else available_memory()
+    if memory is not None:
+        forks = min(forks, memory // FORK_MEMORY)
+    return max(1, forks)
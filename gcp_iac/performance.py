@@ -0,0 +1,87 @@
+from re import fullmatch
+
+
+SHARED_CORE_TYPES = {
+    'e2-micro': (2, 1024),
+    'e2-small': (2, 2048),
+    'e2-medium': (2, 4096),
+    'f1-micro': (1, 614),
+    'g1-small': (1, 1740),
+}
+MEMORY_PER_VCPU = {
+    'standard': 4096,
+    'highmem': 8192,
+    'highcpu': 1024,
+}
+N1_MEMORY_PER_VCPU = {
+    'standard': 3840,
+    'highmem': 6656,
+    'highcpu': 922,
+}
+DEFAULT_RESOURCES = (2, 2048)
+RESERVED_MEMORY_MB = 768
+PHP_WORKER_MEMORY_MB = 48
+PHP_WORKERS_PER_VCPU = 16
+CONNECTIONS_PER_WORKER = 4096
+
+
+def machine_resources(machine_type: str) -> tuple | None:
+    """Get the vCPUs and memory of a GCP machine type from its name: the shared core types, the predefined
+    <family>-<standard|highmem|highcpu>-<vCPUs> types and the [<family>-]custom-<vCPUs>-<MiB> types
+
+    Args:
+        machine_type (str): machine type, e.g. e2-highcpu-2 or n2-custom-4-8192
+
+    Returns:
+        tuple | None: (vCPUs, memory in MiB) or None if the name is not recognized
+    """
+    machine_type = (machine_type or '').strip().lower()
+    if machine_type in SHARED_CORE_TYPES:
+        return SHARED_CORE_TYPES[machine_type]
+    match = fullmatch(r'(?:[a-z0-9]+-)?custom-(\d+)-(\d+)(?:-ext)?', machine_type)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    match = fullmatch(r'([a-z0-9]+)-(standard|highmem|highcpu)-(\d+)', machine_type)
+    if match:
+        family, shape, vcpus = match.group(1), match.group(2), int(match.group(3))
+        per_vcpu = (N1_MEMORY_PER_VCPU if family == 'n1' else MEMORY_PER_VCPU)[shape]
+        return vcpus, vcpus * per_vcpu
+    return None
+
+
+def performance_profile(machine_type: str) -> dict:
+    """Size the nginx and php-fpm configuration of the app to a machine type. nginx runs one worker per vCPU. php-fpm
+    gets the memory left after RESERVED_MEMORY_MB for the OS, Docker, nginx and MySQL and the opcache and JIT buffers,
+    at PHP_WORKER_MEMORY_MB per child and at most PHP_WORKERS_PER_VCPU children per vCPU. A php-fpm child stays bound
+    to a kept alive FastCGI connection, so the nginx upstream keepalive pool of all workers together holds at most half
+    of the children. Unknown machine types get the profile of DEFAULT_RESOURCES.
+
+    Args:
+        machine_type (str): GCP machine type of the app hosts
+
+    Returns:
+        dict: profile values for the nginx and php-fpm templates
+    """
+    vcpus, memory = machine_resources(machine_type) or DEFAULT_RESOURCES
+    opcache = min(256, max(64, memory // 16))
+    jit = min(128, max(32, memory // 32))
+    children = (memory - RESERVED_MEMORY_MB - opcache - jit) // PHP_WORKER_MEMORY_MB
+    children = max(2, min(children, vcpus * PHP_WORKERS_PER_VCPU))
+    spare = max(1, min(children // 4, vcpus * 2))
+    return {
+        'machine_type': machine_type,
+        'vcpus': vcpus,
+        'memory_mb': memory,
+        'nginx_worker_processes': vcpus,
+        'nginx_worker_connections': CONNECTIONS_PER_WORKER,
+        'nginx_worker_rlimit_nofile': CONNECTIONS_PER_WORKER * 2,
+        'nginx_upstream_keepalive': max(1, children // (2 * vcpus)),
+        'php_pm': 'static' if children <= vcpus * 2 else 'dynamic',
+        'php_pm_max_children': children,
+        'php_pm_start_servers': min(children, spare * 2),
+        'php_pm_min_spare_servers': spare,
+        'php_pm_max_spare_servers': min(children, spare * 3),
+        'php_pm_max_requests': 1000,
+        'php_opcache_memory_mb': opcache,
+        'php_opcache_jit_buffer_mb': jit,
+    }
@@ -0,0 +1,101 @@
+from hashlib import sha256
+from json import dumps, loads
+from pathlib import Path
+from shutil import copyfile
+
+from gcp_iac.state_reader import StateReader
+
+
+class PlanCache():
+    def __init__(self, working_dir: str, env_vars_file: str, cache_dir: str = None, max_entries: int = 20):
+        """On disk cache of saved Terraform plans and their parsed JSON. Entries are keyed by the state serial and
+        lineage plus a hash of the tfvars file and the Terraform configuration so a cached plan is only reused while
+        nothing it was built from has changed. A hit is served without spawning Terraform.
+
+        Args:
+            working_dir (str): Terraform working directory
+            env_vars_file (str): path to the Terraform environment variables file
+            cache_dir (str, optional): directory to store the cache in. Defaults to None (<working_dir>/.plan_cache).
+            max_entries (int, optional): max number of cached plans to keep. Defaults to 20.
+        """
+        self.working_dir = Path(working_dir)
+        self.env_vars_file = Path(env_vars_file)
+        self.cache_dir = Path(cache_dir) if cache_dir else self.working_dir / '.plan_cache'
+        self.max_entries = max_entries
+        self.state = StateReader(f'{self.working_dir}/terraform.tfstate')
+
+    @property
+    def config_files(self) -> list:
+        """Get the files Terraform reads the configuration from. startup.sh is included since main.tf loads it into
+        the instance metadata.
+
+        Returns:
+            list: sorted list of configuration file paths
+        """
+        return sorted([*self.working_dir.glob('*.tf'), *self.working_dir.glob('*.sh')])
+
+    def state_version(self) -> str:
+        """Get the lineage and serial of the local Terraform state. The serial is bumped on every state change.
+
+        Returns:
+            str: '<lineage>:<serial>' or an empty string if there is no state
+        """
+        try:
+            return self.state.version()
+        except ValueError:
+            return ''
+
+    def key(self, kind: str, tf_vars: dict = None) -> str:
+        """Build the cache key of a plan
+
+        Args:
+            kind (str): kind of plan (apply or destroy)
+            tf_vars (dict, optional): extra Terraform variables passed to the plan. Defaults to None.
+
+        Returns:
+            str: cache key
+        """
+        digest = sha256(f'{kind}\0{self.state_version()}\0{dumps(tf_vars or {}, sort_keys=True)}\0'.encode())
+        for path in [self.env_vars_file, *self.config_files]:
+            try:
+                digest.update(path.name.encode() + b'\0' + path.read_bytes() + b'\0')
+            except FileNotFoundError:
+                digest.update(path.name.encode() + b'\0\0')
+        return digest.hexdigest()
+
+    def load(self, key: str, plan_file: str) -> dict | None:
+        """Load a cached plan. The saved plan is restored to plan_file so it can be applied.
+
+        Args:
+            key (str): cache key
+            plan_file (str): path to restore the saved plan to
+
+        Returns:
+            dict | None: parsed plan data or None on a cache miss
+        """
+        try:
+            data = loads((self.cache_dir / f'{key}.json').read_text())
+            copyfile(self.cache_dir / f'{key}.tfplan', plan_file)
+            return data
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def store(self, key: str, plan_file: str, data: dict) -> None:
+        """Store a saved plan and its parsed JSON in the cache then prune the oldest entries
+
+        Args:
+            key (str): cache key
+            plan_file (str): path to the saved plan
+            data (dict): parsed plan data
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        copyfile(plan_file, self.cache_dir / f'{key}.tfplan')
+        (self.cache_dir / f'{key}.json').write_text(dumps(data))
+        self.prune()
+
+    def prune(self) -> None:
+        """Remove the oldest cache entries above max_entries"""
+        entries = sorted(self.cache_dir.glob('*.json'), key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in entries[self.max_entries:]:
+            path.unlink(missing_ok=True)
+            path.with_suffix('.tfplan').unlink(missing_ok=True)
@@ -0,0 +1,168 @@
+import re
+from json import JSONDecodeError, JSONDecoder
+from typing import IO, Iterable, Iterator
+
+
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*(")?|[{}\[\]]')
+_DECODER = JSONDecoder()
+
+
+def slim_resource_change(resource: dict) -> dict:
+    """Reduce a plan resource change to the fields giac uses so the before and after values of large resources are not
+    kept in memory
+
+    Args:
+        resource (dict): resource change from the plan JSON
+
+    Returns:
+        dict: resource change with only the address, type, name, index, actions and instance names
+    """
+    change = resource.get('change') or {}
+    return {
+        'address': resource.get('address', ''),
+        'type': resource.get('type', ''),
+        'name': resource.get('name', ''),
+        'index': resource.get('index'),
+        'change': {
+            'actions': change.get('actions', []),
+            'before': {'name': (change.get('before') or {}).get('name', '')},
+            'after': {'name': (change.get('after') or {}).get('name', '')},
+        },
+    }
+
+
+def created_instances(changes: Iterable[dict]) -> set:
+    """Fold resource changes into the names of the instances they create or replace, one change at a time so a stream
+    of changes is never held as a list. An instance is named by its for_each key, the host name of the Terraform
+    outputs, since its GCP name carries the workspace prefix.
+
+    Args:
+        changes (Iterable[dict]): resource changes, such as PlanStream.resource_changes()
+
+    Returns:
+        set: instance names
+    """
+    names = set()
+    for resource in changes:
+        if resource.get('type') != 'google_compute_instance':
+            continue
+        change = resource.get('change') or {}
+        if 'create' in change.get('actions', []):
+            index = resource.get('index')
+            name = index if isinstance(index, str) else (change.get('after') or {}).get('name', '')
+            if name:
+                names.add(name)
+    return names
+
+
+class PlanStream():
+    def __init__(self, stream: IO[str], chunk_size: int = 65536):
+        """Incremental parser for the output of terraform show -json. The stream is read in chunks and only the
+        structure of the document is tracked, so planned values, prior state and configuration are skipped without
+        being decoded. Each resource_changes entry is decoded on its own and yielded before the next one is read, so
+        memory use is bounded by the chunk size and the largest single resource change.
+
+        Args:
+            stream (IO[str]): text stream of the plan JSON, such as the stdout pipe of terraform show -json
+            chunk_size (int, optional): number of characters to read at a time. Defaults to 65536.
+        """
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.__buffer = ''
+        self.__offset = 0
+        self.__keep = None
+
+    def __read(self, pos: int) -> bool:
+        """Read the next chunk into the buffer and drop the data before pos that is no longer needed
+
+        Args:
+            pos (int): absolute position of the first character still needed
+
+        Returns:
+            bool: True if data was read, False at the end of the stream
+        """
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            return False
+        keep = pos if self.__keep is None else min(pos, self.__keep)
+        self.__buffer = self.__buffer[keep - self.__offset:] + chunk
+        self.__offset = keep
+        return True
+
+    def __next_token(self, pos: int) -> tuple:
+        """Find the next string or structural character of the document. Scalars, commas and colons are skipped.
+
+        Args:
+            pos (int): absolute position to search from
+
+        Raises:
+            ValueError: if the stream ends inside a string
+
+        Returns:
+            tuple: (token, absolute start position, absolute end position) or None at the end of the stream
+        """
+        while True:
+            match = _TOKEN.search(self.__buffer, pos - self.__offset)
+            if match is None:
+                pos = self.__offset + len(self.__buffer)
+                if not self.__read(pos):
+                    return None
+                continue
+            start = self.__offset + match.start()
+            if match.group().startswith('"') and match.group(1) is None:
+                if not self.__read(start):
+                    raise ValueError('Plan JSON ended inside a string')
+                pos = start
+                continue
+            return match.group(), start, self.__offset + match.end()
+
+    def __decode_item(self, pos: int) -> tuple:
+        """Decode the JSON value starting at pos, reading more data until the value is complete
+
+        Args:
+            pos (int): absolute position of the value
+
+        Raises:
+            ValueError: if the stream ends before the value is complete
+
+        Returns:
+            tuple: (decoded value, absolute end position)
+        """
+        self.__keep = pos
+        try:
+            while True:
+                try:
+                    item, end = _DECODER.raw_decode(self.__buffer, pos - self.__offset)
+                    return item, self.__offset + end
+                except JSONDecodeError:
+                    if not self.__read(pos):
+                        raise
+        finally:
+            self.__keep = None
+
+    def resource_changes(self) -> Iterator[dict]:
+        """Yield the resource_changes entries of the plan one at a time
+
+        Yields:
+            dict: slim resource change (see slim_resource_change)
+        """
+        depth = 0
+        key = ''
+        in_changes = False
+        pos = 0
+        while (token := self.__next_token(pos)) is not None:
+            token, start, pos = token
+            if token.startswith('"'):
+                if depth == 1:
+                    key = token
+            elif in_changes and token == '{':
+                item, pos = self.__decode_item(start)
+                yield slim_resource_change(item)
+            elif token in '{[':
+                depth += 1
+                if depth == 2 and token == '[' and key == '"resource_changes"':
+                    in_changes = True
+            else:
+                depth -= 1
+                if in_changes:
+                    return
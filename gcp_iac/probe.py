@@ -0,0 +1,155 @@
+import asyncio
+from contextlib import nullcontext
+from random import uniform
+from time import monotonic
+from typing import Callable
+
+
+class ReadinessProber():
+    def __init__(self, port: int = 22, deadline: float = 300.0, connect_timeout: float = 5.0,
+                 base_delay: float = 0.5, max_delay: float = 10.0, max_concurrent: int = 256):
+        """Asyncio readiness prober to wait for many hosts at once to accept SSH connections. A host is only considered
+        ready once it sends a real SSH-2.0 banner so a half-booted sshd is never handed to Ansible. Failed attempts are
+        retried using exponential backoff with jitter until the overall deadline is reached.
+
+        Args:
+            port (int, optional): port to probe. Defaults to 22.
+            deadline (float, optional): max seconds to wait for all hosts. Defaults to 300.0.
+            connect_timeout (float, optional): max seconds for a single connect and banner read. Defaults to 5.0.
+            base_delay (float, optional): delay in seconds before the first retry. Defaults to 0.5.
+            max_delay (float, optional): max delay in seconds between retries. Defaults to 10.0.
+            max_concurrent (int, optional): max number of connection attempts in flight. Defaults to 256.
+        """
+        self.port = port
+        self.deadline = deadline
+        self.connect_timeout = connect_timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_concurrent = max_concurrent
+
+    @staticmethod
+    def is_ssh_banner(line: bytes) -> bool:
+        """Check if a line received from the server is an SSH protocol 2 identification string
+
+        Args:
+            line (bytes): line received from the server
+
+        Returns:
+            bool: True if the line is an SSH-2.0 banner, False otherwise
+        """
+        return line.startswith(b'SSH-2.0-') or line.startswith(b'SSH-1.99-')
+
+    def backoff(self, attempt: int) -> float:
+        """Get the delay before the next attempt using exponential backoff with equal jitter
+
+        Args:
+            attempt (int): number of failed attempts so far
+
+        Returns:
+            float: delay in seconds
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay / 2 + uniform(0, delay / 2)
+
+    async def __read_banner(self, reader: asyncio.StreamReader) -> bool:
+        """Read the server identification lines until the SSH banner is found. The SSH RFC allows a server to send
+        other lines before the banner so a few lines are read before giving up.
+
+        Args:
+            reader (asyncio.StreamReader): connection stream reader
+
+        Returns:
+            bool: True if an SSH banner was received, False otherwise
+        """
+        for _ in range(5):
+            line = await reader.readline()
+            if not line:
+                return False
+            if self.is_ssh_banner(line):
+                return True
+        return False
+
+    async def probe(self, ip: str, semaphore: asyncio.Semaphore = None) -> bool:
+        """Run a single readiness attempt against a host
+
+        Args:
+            ip (str): ip address to check
+            semaphore (asyncio.Semaphore, optional): semaphore limiting in flight attempts. Defaults to None.
+
+        Returns:
+            bool: True if the host sent an SSH banner, False otherwise
+        """
+        async with semaphore or nullcontext():
+            writer = None
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, self.port), self.connect_timeout)
+                return await asyncio.wait_for(self.__read_banner(reader), self.connect_timeout)
+            except (asyncio.TimeoutError, OSError, ValueError):
+                return False
+            finally:
+                if writer is not None:
+                    writer.close()
+                    try:
+                        await writer.wait_closed()
+                    except OSError:
+                        pass
+
+    async def wait_for_host(self, name: str, ip: str, expires: float, semaphore: asyncio.Semaphore = None,
+                            on_ready: Callable[[str, str], None] = None) -> bool:
+        """Probe a host until it is ready or the deadline expires
+
+        Args:
+            name (str): host name
+            ip (str): ip address to check
+            expires (float): monotonic time at which to give up
+            semaphore (asyncio.Semaphore, optional): semaphore limiting in flight attempts. Defaults to None.
+            on_ready (Callable[[str, str], None], optional): called with (name, ip) as soon as the host is ready.
+            Defaults to None.
+
+        Returns:
+            bool: True if the host is ready, False otherwise
+        """
+        attempt = 0
+        while True:
+            if await self.probe(ip, semaphore):
+                if on_ready:
+                    on_ready(name, ip)
+                return True
+            remaining = expires - monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(remaining, self.backoff(attempt)))
+            attempt += 1
+
+    async def wait_for_hosts(self, hosts: dict, on_ready: Callable[[str, str], None] = None) -> dict:
+        """Probe all hosts concurrently until each one is ready or the deadline expires
+
+        Args:
+            hosts (dict): host name to IP address mapping
+            on_ready (Callable[[str, str], None], optional): called with (name, ip) as soon as a host is ready.
+            Defaults to None.
+
+        Returns:
+            dict: host name to readiness result mapping
+        """
+        expires = monotonic() + self.deadline
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        names = list(hosts)
+        results = await asyncio.gather(
+            *[self.wait_for_host(name, hosts[name], expires, semaphore, on_ready) for name in names])
+        return dict(zip(names, results))
+
+    def run(self, hosts: dict, on_ready: Callable[[str, str], None] = None) -> dict:
+        """Probe all hosts concurrently from synchronous code
+
+        Args:
+            hosts (dict): host name to IP address mapping
+            on_ready (Callable[[str, str], None], optional): called with (name, ip) as soon as a host is ready.
+            Defaults to None.
+
+        Returns:
+            dict: host name to readiness result mapping
+        """
+        if not hosts:
+            return {}
+        return asyncio.run(self.wait_for_hosts(hosts, on_ready))
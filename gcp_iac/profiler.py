@@ -0,0 +1,158 @@
+from contextlib import contextmanager
+from json import dump
+from threading import Lock
+from time import perf_counter
+from typing import Callable, Iterator
+
+
+class Profiler():
+    def __init__(self, enabled: bool = True):
+        """Record timed spans of the phases of a run and export them as a Chrome trace (chrome://tracing or
+        ui.perfetto.dev) and a console summary table. Spans are recorded from any thread. Every host gets its own lane
+        in the trace so the fleet timeline is easy to follow. When disabled, spans cost a single attribute check.
+
+        Args:
+            enabled (bool, optional): record spans. Defaults to True.
+        """
+        self.enabled = enabled
+        self.spans = []
+        self.__lock = Lock()
+        self.__origin = perf_counter()
+        self.__lanes = {None: 0}
+
+    def __lane(self, host: str = None) -> int:
+        """Get the trace lane (thread id) of a host. Lane 0 is used for the phases that are not host specific.
+
+        Args:
+            host (str, optional): host name. Defaults to None.
+
+        Returns:
+            int: lane id
+        """
+        if host not in self.__lanes:
+            self.__lanes[host] = len(self.__lanes)
+        return self.__lanes[host]
+
+    def add(self, name: str, category: str, start: float, end: float, host: str = None, **args) -> None:
+        """Record a finished span
+
+        Args:
+            name (str): span name
+            category (str): span category (terraform, readiness, ansible, play, task)
+            start (float): perf_counter value when the span started
+            end (float): perf_counter value when the span ended
+            host (str, optional): host the span belongs to. Defaults to None.
+            args: extra values to show with the span in the trace viewer
+        """
+        if not self.enabled:
+            return
+        with self.__lock:
+            self.spans.append({'name': name, 'category': category, 'start': start - self.__origin,
+                               'duration': max(0.0, end - start), 'lane': self.__lane(host), 'host': host,
+                               'args': args})
+
+    @contextmanager
+    def span(self, name: str, category: str = 'phase', host: str = None, **args) -> Iterator[None]:
+        """Record a span around a block of code
+
+        Args:
+            name (str): span name
+            category (str, optional): span category. Defaults to 'phase'.
+            host (str, optional): host the span belongs to. Defaults to None.
+            args: extra values to show with the span in the trace viewer
+        """
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, category, start, perf_counter(), host, **args)
+
+    def ansible_event_handler(self, host: str) -> Callable[[dict], bool] | None:
+        """Get an ansible_runner event handler that records a span for every play and task run on a host
+
+        Args:
+            host (str): host name
+
+        Returns:
+            Callable[[dict], bool] | None: event handler or None when disabled
+        """
+        if not self.enabled:
+            return None
+        play = {}
+
+        def close_play(now: float) -> None:
+            if play:
+                self.add(play['name'], 'play', play['start'], now, host)
+                play.clear()
+
+        def handler(event: dict) -> bool:
+            now = perf_counter()
+            kind = event.get('event', '')
+            data = event.get('event_data', {})
+            if kind == 'playbook_on_play_start':
+                close_play(now)
+                play.update({'name': data.get('play', ''), 'start': now})
+            elif kind == 'playbook_on_stats':
+                close_play(now)
+            elif kind.startswith('runner_on_') and 'duration' in data:
+                self.add(data.get('task', ''), 'task', now - float(data['duration']), now, host,
+                         status=kind.removeprefix('runner_on_'), play=data.get('play', ''))
+            return True
+
+        return handler
+
+    def trace(self) -> dict:
+        """Build the Chrome trace event document of the recorded spans
+
+        Returns:
+            dict: Chrome trace event document
+        """
+        with self.__lock:
+            events = [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': lane, 'args': {'name': host or 'giac'}}
+                      for host, lane in self.__lanes.items()]
+            for span in self.spans:
+                events.append({'name': span['name'], 'cat': span['category'], 'ph': 'X', 'pid': 1,
+                               'tid': span['lane'], 'ts': round(span['start'] * 1e6),
+                               'dur': round(span['duration'] * 1e6), 'args': span['args']})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, path: str) -> None:
+        """Write the Chrome trace JSON file
+
+        Args:
+            path (str): path to the trace file
+        """
+        with open(path, 'w') as file:
+            dump(self.trace(), file)
+
+    def summary(self) -> list:
+        """Aggregate the recorded spans by category and name
+
+        Returns:
+            list: (category, name, count, total seconds, max seconds) rows sorted by total time
+        """
+        totals = {}
+        with self.__lock:
+            for span in self.spans:
+                key = (span['category'], span['name'])
+                count, total, longest = totals.get(key, (0, 0.0, 0.0))
+                totals[key] = (count + 1, total + span['duration'], max(longest, span['duration']))
+        rows = [(category, name, *values) for (category, name), values in totals.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def summary_table(self, limit: int = 25) -> str:
+        """Format the summary as a table for the console
+
+        Args:
+            limit (int, optional): max number of rows. Defaults to 25.
+
+        Returns:
+            str: summary table
+        """
+        payload = f'{"Category":<10} {"Span":<50} {"Count":>5} {"Total(s)":>9} {"Max(s)":>8}\n'
+        for category, name, count, total, longest in self.summary()[:limit]:
+            payload += f'{category:<10} {name[:50]:<50} {count:>5} {total:>9.2f} {longest:>8.2f}\n'
+        return payload
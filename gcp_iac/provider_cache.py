@@ -0,0 +1,160 @@
+from os import environ, link
+from pathlib import Path
+from platform import machine, system
+from re import findall
+from shutil import copy2, copyfile
+
+
+LOCK_FILE = '.terraform.lock.hcl'
+DEFAULT_REGISTRY = 'registry.terraform.io'
+ARCHITECTURES = {'x86_64': 'amd64', 'amd64': 'amd64', 'aarch64': 'arm64', 'arm64': 'arm64', 'i386': '386',
+                 'i686': '386', 'armv7l': 'arm'}
+
+
+class ProviderCache():
+    def __init__(self, cache_dir: str = None):
+        """Shared cache of installed Terraform provider plugins, laid out like the Terraform plugin cache
+        (<host>/<namespace>/<type>/<version>/<os>_<arch>). Providers are hard linked between the cache and the
+        .terraform directory of every working directory, so each workspace costs no extra disk space or download and a
+        working directory whose providers already match its dependency lock file does not need terraform init.
+
+        Args:
+            cache_dir (str, optional): cache directory. Defaults to None ($TF_PLUGIN_CACHE_DIR or
+            ~/.terraform.d/plugin-cache).
+        """
+        self.cache_dir = Path(cache_dir or environ.get('TF_PLUGIN_CACHE_DIR') or
+                              Path.home() / '.terraform.d' / 'plugin-cache')
+
+    @property
+    def platform(self) -> str:
+        """Get the Terraform platform name of this machine
+
+        Returns:
+            str: <os>_<arch>, e.g. linux_amd64
+        """
+        return f'{system().lower()}_{ARCHITECTURES.get(machine().lower(), machine().lower())}'
+
+    @staticmethod
+    def locked_providers(working_dir: str) -> dict | None:
+        """Get the providers pinned in the dependency lock file of a working directory
+
+        Args:
+            working_dir (str): Terraform working directory
+
+        Returns:
+            dict | None: provider address to version mapping or None if there is no lock file
+        """
+        try:
+            text = (Path(working_dir) / LOCK_FILE).read_text()
+        except FileNotFoundError:
+            return None
+        return dict(findall(r'provider\s+"([^"]+)"\s*\{\s*version\s*=\s*"([^"]+)"', text))
+
+    @staticmethod
+    def required_providers(working_dir: str) -> set:
+        """Get the provider addresses the configuration of a working directory declares in required_providers
+
+        Args:
+            working_dir (str): Terraform working directory
+
+        Returns:
+            set: provider addresses with the registry host
+        """
+        sources = set()
+        for path in Path(working_dir).glob('*.tf'):
+            for source in findall(r'source\s*=\s*"([^"]+/[^"]+)"', path.read_text()):
+                sources.add(source if source.count('/') == 2 else f'{DEFAULT_REGISTRY}/{source}')
+        return {source.lower() for source in sources}
+
+    def __package_dir(self, root: Path, address: str, version: str) -> Path:
+        """Get the directory of an installed provider package
+
+        Args:
+            root (Path): providers root directory
+            address (str): provider address
+            version (str): provider version
+
+        Returns:
+            Path: provider package directory
+        """
+        return root / address / version / self.platform
+
+    def is_initialized(self, working_dir: str) -> bool:
+        """Check if a working directory can run Terraform without init: it has a dependency lock file that covers every
+        required provider and every locked provider is installed for this platform
+
+        Args:
+            working_dir (str): Terraform working directory
+
+        Returns:
+            bool: True if terraform init can be skipped, False otherwise
+        """
+        locked = self.locked_providers(working_dir)
+        if locked is None or not self.required_providers(working_dir) <= set(locked):
+            return False
+        providers = Path(working_dir) / '.terraform' / 'providers'
+        for address, version in locked.items():
+            package = self.__package_dir(providers, address, version)
+            if not package.is_dir() or not any(package.iterdir()):
+                return False
+        return True
+
+    @staticmethod
+    def __link_tree(source: Path, target: Path) -> None:
+        """Hard link every file of a directory tree, falling back to a copy across file systems
+
+        Args:
+            source (Path): source directory
+            target (Path): target directory
+        """
+        for path in source.rglob('*'):
+            if not path.is_file():
+                continue
+            destination = target / path.relative_to(source)
+            if destination.exists():
+                continue
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                link(path, destination)
+            except OSError:
+                copy2(path, destination)
+
+    def store(self, working_dir: str) -> int:
+        """Add the providers installed in a working directory to the cache
+
+        Args:
+            working_dir (str): Terraform working directory
+
+        Returns:
+            int: number of provider packages added
+        """
+        providers = Path(working_dir) / '.terraform' / 'providers'
+        stored = 0
+        for address, version in (self.locked_providers(working_dir) or {}).items():
+            package = self.__package_dir(providers, address, version)
+            cached = self.__package_dir(self.cache_dir, address, version)
+            if package.is_dir() and not cached.is_dir():
+                self.__link_tree(package.resolve(), cached)
+                stored += 1
+        return stored
+
+    def seed(self, working_dir: str, lock_source: str = None) -> bool:
+        """Install the locked providers of a working directory from the cache so terraform init can be skipped. The
+        dependency lock file is copied from lock_source first if the working directory has none.
+
+        Args:
+            working_dir (str): Terraform working directory
+            lock_source (str, optional): working directory to copy the dependency lock file from. Defaults to None.
+
+        Returns:
+            bool: True if the working directory is initialized afterwards, False otherwise
+        """
+        lock_file = Path(working_dir) / LOCK_FILE
+        if not lock_file.exists() and lock_source and (Path(lock_source) / LOCK_FILE).exists():
+            copyfile(Path(lock_source) / LOCK_FILE, lock_file)
+        providers = Path(working_dir) / '.terraform' / 'providers'
+        for address, version in (self.locked_providers(working_dir) or {}).items():
+            cached = self.__package_dir(self.cache_dir, address, version)
+            if cached.is_dir():
+                self.__link_tree(cached, self.__package_dir(providers, address, version))
+        return self.is_initialized(working_dir)
@@ -0,0 +1,151 @@
+from pathlib import Path
+from shutil import rmtree
+from subprocess import DEVNULL, run
+from tempfile import mkdtemp
+from threading import Lock
+from time import sleep
+
+
+class SSHMasters():
+    def __init__(self, key_file: str, user: str = 'ansible', port: int = 22, lifetime: int = 1800,
+                 connect_timeout: int = 30, attempts: int = 3, retry_delay: float = 2.0):
+        """Manage one SSH ControlMaster connection per host. The master is opened as soon as a host is ready and kept
+        alive for the whole run, so every Ansible phase multiplexes over it instead of repeating the key exchange and
+        authentication. The control sockets live in a private temporary directory that Ansible is pointed at.
+
+        Args:
+            key_file (str): path to the SSH private key
+            user (str, optional): remote user. Defaults to 'ansible'.
+            port (int, optional): SSH port. Defaults to 22.
+            lifetime (int, optional): seconds a master stays up once it has no clients (ControlPersist).
+            Defaults to 1800.
+            connect_timeout (int, optional): seconds to wait for the master to connect. Defaults to 30.
+            attempts (int, optional): connection attempts, the guest agent may still be adding the user when sshd
+            is already up. Defaults to 3.
+            retry_delay (float, optional): seconds between connection attempts. Defaults to 2.0.
+        """
+        self.key_file = key_file
+        self.user = user
+        self.port = port
+        self.lifetime = lifetime
+        self.connect_timeout = connect_timeout
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.__control_dir: str | None = None
+        self.__hosts = set()
+        self.__lock = Lock()
+
+    @property
+    def control_dir(self) -> str:
+        """Get the directory of the control sockets. It is created on first use with a short path since unix socket
+        paths are limited to about 100 characters. The readiness threads of all hosts reach it at once, so it is
+        created under the lock and every master ends up in the one directory stop_all() removes.
+
+        Returns:
+            str: control socket directory
+        """
+        with self.__lock:
+            if self.__control_dir is None:
+                self.__control_dir = mkdtemp(prefix='giac-cm-')
+            return self.__control_dir
+
+    @property
+    def ansible_control_path(self) -> str:
+        """Get the control path for Ansible's ssh connection plugin. It expands to the same socket as control_path()
+        (the plugin applies % formatting first, so the ssh tokens are escaped).
+
+        Returns:
+            str: Ansible control path
+        """
+        return f'{self.control_dir}/%%h-%%p-%%r'
+
+    def control_path(self, ip: str) -> str:
+        """Get the control socket path of a host
+
+        Args:
+            ip (str): host IP address
+
+        Returns:
+            str: control socket path
+        """
+        return f'{self.control_dir}/{ip}-{self.port}-{self.user}'
+
+    def __ssh(self, ip: str, *args: str, timeout: float = None) -> bool:
+        """Run ssh against the control socket of a host
+
+        Args:
+            ip (str): host IP address
+            args (str): extra ssh arguments
+            timeout (float, optional): seconds to wait for ssh to return. Defaults to None.
+
+        Returns:
+            bool: True if ssh exited 0, False otherwise
+        """
+        cmd = ['ssh', '-o', f'ControlPath={self.control_path(ip)}', '-p', str(self.port), *args, f'{self.user}@{ip}']
+        try:
+            return run(cmd, stdin=DEVNULL, stdout=DEVNULL, stderr=DEVNULL, timeout=timeout).returncode == 0
+        except Exception:
+            return False
+
+    def start(self, ip: str) -> bool:
+        """Open the master connection of a host. ssh returns once authentication succeeded and the master went to the
+        background.
+
+        Args:
+            ip (str): host IP address
+
+        Returns:
+            bool: True if the master is up, False otherwise
+        """
+        if self.check(ip):
+            return True
+        for attempt in range(max(1, self.attempts)):
+            if attempt:
+                sleep(self.retry_delay)
+            if self.__ssh(ip, '-f', '-N', '-o', 'ControlMaster=yes', '-o', f'ControlPersist={self.lifetime}s',
+                          '-o', 'BatchMode=yes', '-o', 'StrictHostKeyChecking=no', '-o', 'UserKnownHostsFile=/dev/null',
+                          '-o', f'ConnectTimeout={self.connect_timeout}', '-o', 'ServerAliveInterval=15',
+                          '-i', self.key_file, timeout=self.connect_timeout + 5):
+                with self.__lock:
+                    self.__hosts.add(ip)
+                return True
+        return False
+
+    def check(self, ip: str) -> bool:
+        """Check if the master connection of a host is up
+
+        Args:
+            ip (str): host IP address
+
+        Returns:
+            bool: True if the master is up, False otherwise
+        """
+        if not Path(self.control_path(ip)).exists():
+            return False
+        return self.__ssh(ip, '-O', 'check', timeout=10)
+
+    def stop(self, ip: str) -> bool:
+        """Close the master connection of a host
+
+        Args:
+            ip (str): host IP address
+
+        Returns:
+            bool: True if the master was closed or was not running, False otherwise
+        """
+        with self.__lock:
+            self.__hosts.discard(ip)
+        if not Path(self.control_path(ip)).exists():
+            return True
+        return self.__ssh(ip, '-O', 'exit', timeout=10)
+
+    def stop_all(self) -> None:
+        """Close every master connection and remove the control socket directory"""
+        with self.__lock:
+            hosts = list(self.__hosts)
+        for ip in hosts:
+            self.stop(ip)
+        with self.__lock:
+            control_dir, self.__control_dir = self.__control_dir, None
+        if control_dir is not None:
+            rmtree(control_dir, ignore_errors=True)
@@ -0,0 +1,91 @@
+from shlex import quote
+from subprocess import DEVNULL, TimeoutExpired, run
+from time import sleep
+
+
+MARKER = '/run/startup-done'
+TIMED_OUT = 3
+SSH_ERROR = 255
+
+
+class StartupGate():
+    def __init__(self, key_file: str, user: str = 'ansible', port: int = 22, marker: str = MARKER,
+                 timeout: int = 600, interval: float = 0.2, connect_timeout: int = 30, attempts: int = 3,
+                 retry_delay: float = 2.0):
+        """Wait for the startup script of a host to finish from a single SSH session. The session runs a small shell
+        loop on the host that checks for the marker file every interval seconds and exits the moment it appears, so
+        no Ansible play has to start and no new connection is opened per check. The session goes through the host's
+        shared SSH connection when one is open.
+
+        Args:
+            key_file (str): path to the SSH private key
+            user (str, optional): remote user. Defaults to 'ansible'.
+            port (int, optional): SSH port. Defaults to 22.
+            marker (str, optional): file the startup script creates once it is done on each boot, on a tmpfs so a
+            golden image never carries it. Defaults to '/run/startup-done'.
+            timeout (int, optional): seconds to wait for the marker, longer than the fleet cache wait and the package
+            installs of the startup script together. Defaults to 600.
+            interval (float, optional): seconds between marker checks on the host. Defaults to 0.2.
+            connect_timeout (int, optional): seconds to wait for the SSH connection. Defaults to 30.
+            attempts (int, optional): connection attempts, the guest agent may still be adding the user when sshd
+            is already up. Defaults to 3.
+            retry_delay (float, optional): seconds between connection attempts. Defaults to 2.0.
+        """
+        self.key_file = key_file
+        self.user = user
+        self.port = port
+        self.marker = marker
+        self.timeout = timeout
+        self.interval = interval
+        self.connect_timeout = connect_timeout
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+
+    @property
+    def command(self) -> str:
+        """Get the shell loop run on the host. It exits 0 once the marker exists and TIMED_OUT once it checked for
+        timeout seconds. Counting checks instead of reading the clock keeps the loop down to one sleep per check.
+
+        Returns:
+            str: remote command
+        """
+        checks = max(1, int(self.timeout / self.interval))
+        return (f'i=0; while [ ! -e {quote(self.marker)} ]; do [ "$i" -lt {checks} ] || exit {TIMED_OUT}; '
+                f'i=$((i+1)); sleep {self.interval}; done')
+
+    def wait(self, ip: str, control_path: str = None) -> tuple:
+        """Wait for the marker file of a host
+
+        Args:
+            ip (str): host IP address
+            control_path (str, optional): control socket of the host's shared SSH connection. Defaults to None (open
+            a new connection).
+
+        Returns:
+            tuple: (True if the marker appeared, error message)
+        """
+        cmd = ['ssh', '-p', str(self.port), '-i', self.key_file, '-o', 'BatchMode=yes',
+               '-o', 'StrictHostKeyChecking=no', '-o', 'UserKnownHostsFile=/dev/null',
+               '-o', f'ConnectTimeout={self.connect_timeout}', '-o', 'ServerAliveInterval=15']
+        if control_path:
+            cmd += ['-o', f'ControlPath={control_path}']
+        cmd += [f'{self.user}@{ip}', self.command]
+        error = ''
+        for attempt in range(max(1, self.attempts)):
+            if attempt:
+                sleep(self.retry_delay)
+            try:
+                returncode = run(cmd, stdin=DEVNULL, stdout=DEVNULL, stderr=DEVNULL,
+                                 timeout=self.timeout + self.connect_timeout + 5).returncode
+            except TimeoutExpired:
+                return False, f'startup marker {self.marker} did not appear in {self.timeout}s'
+            except OSError as exc:
+                return False, f'failed to run ssh: {exc}'
+            if returncode == 0:
+                return True, ''
+            if returncode == TIMED_OUT:
+                return False, f'startup marker {self.marker} did not appear in {self.timeout}s'
+            error = f'ssh exited with {returncode}'
+            if returncode != SSH_ERROR:
+                break
+        return False, error
@@ -0,0 +1,244 @@
+import re
+from json import JSONDecoder, loads
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from typing import Any
+
+
+_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"(\s*:)?|[{}\[\]]')
+_DECODER = JSONDecoder()
+_RESOURCE_FIELDS = {'mode', 'type', 'name', 'module'}
+_INDENTED_KEY = re.compile(rb'^  ("[^"\\]*(?:\\.[^"\\]*)*"): ', re.MULTILINE)
+_INDENTED_FIELD = re.compile(rb'^      "(mode|type|name|module)": ("[^"\\]*(?:\\.[^"\\]*)*")', re.MULTILINE)
+
+
+class StateReader():
+    def __init__(self, path: str):
+        """Read outputs and resources straight from a local Terraform state file (terraform.tfstate, or a state saved
+        with terraform state pull) without starting Terraform. The file is memory mapped and scanned once to index the
+        byte span of every top level key and every resource by its address. Values are only decoded when they are
+        looked up, so the instances of a large state are never decoded unless asked for. Terraform writes state with a
+        fixed two space indent, which lets the index be built from line anchored matches only, other layouts are
+        scanned token by token. The index is rebuilt when the file changes, and the file is only mapped for the
+        duration of a call since Terraform rewrites it in place.
+
+        Args:
+            path (str): path to the state file
+        """
+        self.path = Path(path)
+        self.__stamp = None
+        self.__keys = {}
+        self.__resources = {}
+        self.__values = {}
+
+    def __read(self, start: int, end: int) -> str:
+        """Read a byte span of the state file
+
+        Args:
+            start (int): start offset
+            end (int): end offset
+
+        Returns:
+            str: decoded text of the span
+        """
+        with open(self.path, 'rb') as file, mmap(file.fileno(), 0, access=ACCESS_READ) as data:
+            return data[start:end].decode()
+
+    def __scan_indented(self, data: mmap) -> None:
+        """Index the top level keys and the resources of a state written with Terraform's two space indent. JSON
+        strings cannot hold a raw newline, so a line starting with exactly two spaces and a quote is always a top level
+        key and a line of four spaces and a brace is always a resource boundary. Only those lines are searched for.
+
+        Args:
+            data (mmap): mapped state file
+        """
+        keys = []
+        pos = data.find(b'\n  "')
+        while pos != -1:
+            match = _INDENTED_KEY.match(data, pos + 1)
+            if match:
+                keys.append((loads(match.group(1)), match.start(), match.end()))
+            pos = data.find(b'\n  "', pos + 1)
+        end = data.rfind(b'}')
+        for index, (key, _, start) in enumerate(keys):
+            self.__keys[key] = (start, keys[index + 1][1] if index + 1 < len(keys) else end)
+        if 'resources' not in self.__keys:
+            return
+        pos, end = self.__keys['resources']
+        while (start := data.find(b'\n    {', pos, end)) != -1:
+            close = data.find(b'\n    }', start, end)
+            if close == -1:
+                break
+            header_end = data.find(b'\n      "instances"', start, close)
+            fields = {name.decode(): loads(value) for name, value in
+                      _INDENTED_FIELD.findall(data, start, close if header_end == -1 else header_end)}
+            self.__resources[self.__address(fields)] = (start + 1, close + 6)
+            pos = close + 6
+
+    def __scan(self, data: mmap) -> None:
+        """Index the top level keys and the resources of the state token by token
+
+        Args:
+            data (mmap): mapped state file
+        """
+        depth = 0
+        key = None
+        in_resources = False
+        resource_start = 0
+        fields = {}
+        field = None
+        for match in _TOKEN.finditer(data):
+            token = match.group()
+            if token[:1] == b'"':
+                is_key = match.group(1) is not None
+                if depth == 1 and is_key:
+                    if key is not None:
+                        self.__keys[key] = (self.__keys[key][0], match.start())
+                    key = loads(token[:token.rindex(b'"') + 1])
+                    self.__keys[key] = (match.end(), match.end())
+                elif in_resources and depth == 3:
+                    if is_key:
+                        name = loads(token[:token.rindex(b'"') + 1])
+                        field = name if name in _RESOURCE_FIELDS else None
+                    elif field:
+                        fields[field] = loads(token)
+                        field = None
+                continue
+            field = None
+            if token in b'{[':
+                if in_resources and depth == 2 and token == b'{':
+                    resource_start = match.start()
+                    fields = {}
+                depth += 1
+                if depth == 2 and key == 'resources' and token == b'[':
+                    in_resources = True
+                continue
+            depth -= 1
+            if in_resources and depth == 2:
+                self.__resources[self.__address(fields)] = (resource_start, match.end())
+            elif depth == 1 and in_resources:
+                in_resources = False
+            elif depth == 0 and key is not None:
+                self.__keys[key] = (self.__keys[key][0], match.start())
+
+    @staticmethod
+    def __address(fields: dict) -> str:
+        """Build the address of a resource from its mode, type, name and module
+
+        Args:
+            fields (dict): resource fields
+
+        Returns:
+            str: resource address, e.g. google_compute_instance.vm_instance
+        """
+        address = f'{fields.get("type", "")}.{fields.get("name", "")}'
+        if fields.get('mode') == 'data':
+            address = f'data.{address}'
+        if fields.get('module'):
+            address = f'{fields["module"]}.{address}'
+        return address
+
+    def __index(self) -> bool:
+        """Index the state file if it changed since it was last indexed
+
+        Returns:
+            bool: True if there is a state to read, False otherwise
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            self.__stamp = None
+            self.__keys, self.__resources, self.__values = {}, {}, {}
+            return False
+        stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if stamp == self.__stamp:
+            return bool(self.__keys)
+        self.__stamp = stamp
+        self.__keys, self.__resources, self.__values = {}, {}, {}
+        if stat.st_size:
+            with open(self.path, 'rb') as file, mmap(file.fileno(), 0, access=ACCESS_READ) as data:
+                if data[:5] == b'{\n  "':
+                    self.__scan_indented(data)
+                else:
+                    self.__scan(data)
+        return bool(self.__keys)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a top level value of the state, e.g. serial, lineage or outputs
+
+        Args:
+            key (str): top level key
+            default (Any, optional): value returned if the key is missing. Defaults to None.
+
+        Returns:
+            Any: decoded value
+        """
+        if not self.__index() or key not in self.__keys:
+            return default
+        if key not in self.__values:
+            self.__values[key] = _DECODER.raw_decode(self.__read(*self.__keys[key]).lstrip())[0]
+        return self.__values[key]
+
+    def version(self) -> str:
+        """Get the lineage and serial of the state. The serial is bumped on every state change.
+
+        Returns:
+            str: '<lineage>:<serial>' or an empty string if there is no state
+        """
+        if not self.__index():
+            return ''
+        return f'{self.get("lineage", "")}:{self.get("serial", 0)}'
+
+    def outputs(self) -> dict:
+        """Get the outputs of the state in the format of terraform output -json
+
+        Returns:
+            dict: output name to {'value': ..., 'type': ...} mapping
+        """
+        return self.get('outputs', {})
+
+    def output(self, name: str, default: Any = None) -> Any:
+        """Get the value of an output
+
+        Args:
+            name (str): output name
+            default (Any, optional): value returned if the output is missing. Defaults to None.
+
+        Returns:
+            Any: output value
+        """
+        return self.outputs().get(name, {}).get('value', default)
+
+    def addresses(self) -> list:
+        """Get the addresses of the resources in the state
+
+        Returns:
+            list: resource addresses
+        """
+        self.__index()
+        return list(self.__resources)
+
+    def resource(self, address: str) -> dict | None:
+        """Get a resource of the state with its instances
+
+        Args:
+            address (str): resource address, e.g. google_compute_instance.vm_instance
+
+        Returns:
+            dict | None: decoded resource or None if it is not in the state
+        """
+        if not self.__index() or address not in self.__resources:
+            return None
+        return loads(self.__read(*self.__resources[address]))
+
+    def instance_keys(self, address: str) -> list:
+        """Get the instance keys of a resource (for_each keys or count indexes)
+
+        Args:
+            address (str): resource address
+
+        Returns:
+            list: instance keys
+        """
+        resource = self.resource(address) or {}
+        return [instance.get('index_key') for instance in resource.get('instances', [])]
@@ -0,0 +1,94 @@
+from json import dump, load
+from os import replace
+from pathlib import Path
+from statistics import median
+from threading import Lock
+
+
+class TaskHistory():
+    def __init__(self, path: str, window: int = 50, threshold: float = 2.0, min_samples: int = 5):
+        """Rolling store of Ansible task durations kept across runs. Durations seen during a run are held as pending
+        samples and compared against the stored baseline (p50 of the last window samples of the task) so a task that
+        got slower than usual can be flagged, then merged into the store when the run is saved.
+
+        Args:
+            path (str): path to the JSON history file
+            window (int, optional): number of samples to keep per task. Defaults to 50.
+            threshold (float, optional): ratio to the baseline above which a task is flagged as slow. Defaults to 2.0.
+            min_samples (int, optional): samples needed before a task has a baseline. Defaults to 5.
+        """
+        self.path = Path(path)
+        self.window = window
+        self.threshold = threshold
+        self.min_samples = min_samples
+        self.__tasks: dict | None = None
+        self.__pending = []
+        self.__lock = Lock()
+
+    @property
+    def tasks(self) -> dict:
+        """Get the stored task durations, loading them from the history file on first use
+
+        Returns:
+            dict: task name to list of durations in seconds mapping
+        """
+        if self.__tasks is None:
+            try:
+                with open(self.path, 'r') as file:
+                    self.__tasks = load(file).get('tasks', {})
+            except (FileNotFoundError, ValueError):
+                self.__tasks = {}
+        return self.__tasks
+
+    def baseline(self, task: str) -> float | None:
+        """Get the p50 duration of a task
+
+        Args:
+            task (str): task name
+
+        Returns:
+            float | None: p50 duration in seconds or None if there are not enough samples
+        """
+        samples = self.tasks.get(task, [])
+        if len(samples) < self.min_samples:
+            return None
+        return median(samples)
+
+    def add(self, host: str, task: str, duration: float) -> None:
+        """Add a task duration seen during the current run. Safe to call from multiple threads.
+
+        Args:
+            host (str): host the task ran on
+            task (str): task name
+            duration (float): task duration in seconds
+        """
+        with self.__lock:
+            self.__pending.append((host, task, duration))
+
+    def slow_tasks(self) -> list:
+        """Get the tasks of the current run that took longer than threshold times their baseline
+
+        Returns:
+            list: (host, task, duration, baseline) tuples sorted by slowdown ratio
+        """
+        slow = []
+        with self.__lock:
+            for host, task, duration in self.__pending:
+                baseline = self.baseline(task)
+                if baseline and duration >= baseline * self.threshold:
+                    slow.append((host, task, duration, baseline))
+        return sorted(slow, key=lambda item: item[2] / item[3], reverse=True)
+
+    def save(self) -> None:
+        """Merge the pending durations into the store and write the history file"""
+        with self.__lock:
+            for _, task, duration in self.__pending:
+                samples = self.tasks.setdefault(task, [])
+                samples.append(round(duration, 2))
+                del samples[:-self.window]
+            self.__pending.clear()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            with open(tmp, 'w') as file:
+                dump({'version': 1, 'tasks': self.tasks}, file, separators=(',', ':'))
+            replace(tmp, self.path)
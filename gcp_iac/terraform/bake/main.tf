@@ -0,0 +1,64 @@
+terraform {
+  required_version = ">= 1.3"
+  required_providers {
+    google = {
+      source  = "hashicorp/google"
+    }
+  }
+}
+
+locals {
+  resolved_sa_file = (
+    var.gcp_iac_sa_file != "" ?
+    var.gcp_iac_sa_file: "${path.module}/../../gcp_env/keys/.sa.json"
+  )
+}
+
+locals {
+  resolved_ansible_pubkey = (
+    var.ansible_ssh_pub_key_file != "" ?
+    var.ansible_ssh_pub_key_file: "${path.module}/../../gcp_env/keys/.ansible_rsa.pub"
+  )
+}
+
+provider "google" {
+  project=var.project_id
+  region=var.region
+  credentials=file(local.resolved_sa_file)
+}
+
+locals {
+  name_prefix = var.workspace == "default" ? "" : "${var.workspace}-"
+}
+
+resource "google_compute_instance" "builder" {
+  name="${local.name_prefix}${var.builder_name}"
+  machine_type=var.instance_machine_type
+  zone=var.zone
+  desired_status=var.create_image ? "TERMINATED" : "RUNNING"
+  boot_disk {
+    initialize_params {image=var.boot_image}
+  }
+  network_interface {
+    network="default"
+    access_config {}
+  }
+  metadata = {
+    ssh-keys="ansible:${file(local.resolved_ansible_pubkey)}"
+    startup-script=file("${path.module}/../startup.sh")
+  }
+  tags=var.instance_tags
+}
+
+resource "google_compute_image" "golden" {
+  count=var.create_image ? 1 : 0
+  name=var.image_name
+  family=var.image_family
+  source_disk=google_compute_instance.builder.boot_disk[0].source
+}
+
+output "instances" {
+  value={
+    (google_compute_instance.builder.name)=try(google_compute_instance.builder.network_interface[0].access_config[0].nat_ip, "")
+  }
+}
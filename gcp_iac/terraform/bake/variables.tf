@@ -0,0 +1,71 @@
+variable "project_id" {
+  type=string
+  default=""
+}
+
+variable "workspace" {
+  type=string
+  description="giac workspace, prefixes the builder name outside the default workspace"
+  default="default"
+}
+
+variable "region" {
+  type=string
+  default="us-central1"
+}
+
+variable "zone" {
+  type=string
+  default="us-central1-a"
+}
+
+variable "instance_tags" {
+  type=list(string)
+  default=["ssh"]
+}
+
+variable "instance_machine_type" {
+  type=string
+  default="e2-highcpu-2"
+}
+
+variable "boot_image" {
+  type=string
+  description="Base image the golden image is baked from"
+  default="rocky-linux-cloud/rocky-linux-9"
+}
+
+variable "builder_name" {
+  type=string
+  description="Name of the temporary instance the image is baked on"
+  default="giac-bake"
+}
+
+variable "image_name" {
+  type=string
+  description="Name of the golden image (giac-golden-<content hash>)"
+  default=""
+}
+
+variable "image_family" {
+  type=string
+  default="giac-golden"
+}
+
+variable "create_image" {
+  type=bool
+  description="Stop the builder instance and create the golden image from its boot disk"
+  default=false
+}
+
+variable "ansible_ssh_pub_key_file" {
+  type=string
+  description="Path to the Ansible SSH public key"
+  default=""
+}
+
+variable "gcp_iac_sa_file" {
+  type=string
+  description="Path to the GCP service account file"
+  default=""
+}
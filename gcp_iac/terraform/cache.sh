@@ -0,0 +1,70 @@
+#!/bin/bash
+
+exec > /var/log/startup-script.log 2>&1
+set -xe
+
+if ! command -v docker; then
+  dnf install -y dnf-plugins-core
+  dnf config-manager --add-repo https://download.docker.com/linux/centos/docker-ce.repo
+  dnf install -y docker-ce docker-ce-cli containerd.io
+fi
+systemctl enable --now docker
+
+mkdir -p /etc/giac-cache /var/cache/giac-packages /var/lib/giac-registry
+
+# Package proxy: /<upstream host>/<path> is fetched from the upstream once and served from disk. Concurrent requests for
+# the same file wait for the first fetch (proxy_cache_lock), expired files are revalidated with a conditional request.
+cat > /etc/giac-cache/packages.conf <<'CONF'
+proxy_cache_path /var/cache/nginx levels=1:2 keys_zone=packages:50m max_size=40g inactive=30d use_temp_path=off;
+
+server {
+  listen 8080;
+
+  proxy_cache packages;
+  proxy_cache_lock on;
+  proxy_cache_lock_timeout 10m;
+  proxy_cache_valid 200 206 10m;
+  proxy_cache_revalidate on;
+  proxy_cache_use_stale error timeout updating http_500 http_502 http_503 http_504;
+  proxy_http_version 1.1;
+  proxy_ssl_server_name on;
+  add_header X-Cache-Status $upstream_cache_status;
+
+  location = /healthz {
+    return 200 "ok\n";
+  }
+
+  location /dl.rockylinux.org/ {
+    proxy_pass http://dl.rockylinux.org/;
+    proxy_set_header Host dl.rockylinux.org;
+  }
+
+  location /deb.debian.org/ {
+    proxy_pass http://deb.debian.org/;
+    proxy_set_header Host deb.debian.org;
+  }
+
+  location /archive.ubuntu.com/ {
+    proxy_pass http://archive.ubuntu.com/;
+    proxy_set_header Host archive.ubuntu.com;
+  }
+
+  location /download.docker.com/ {
+    proxy_pass https://download.docker.com/;
+    proxy_set_header Host download.docker.com;
+  }
+}
+CONF
+
+docker rm -f giac-packages giac-registry || true
+docker run -d --restart always --name giac-packages -p 8080:8080 \
+  -v /etc/giac-cache/packages.conf:/etc/nginx/conf.d/default.conf:ro,Z \
+  -v /var/cache/giac-packages:/var/cache/nginx:Z \
+  nginx:stable
+docker run -d --restart always --name giac-registry -p 5000:5000 \
+  -e REGISTRY_PROXY_REMOTEURL=https://registry-1.docker.io \
+  -v /var/lib/giac-registry:/var/lib/registry:Z \
+  registry:2
+
+echo "done" > /run/startup-done
+exit 0
@@ -27,8 +27,43 @@ provider "google" {
   credentials=file(local.resolved_sa_file)
 }
 
+locals {
+  # Workspaces share the GCP project of the default tfvars, so the names of their resources carry the workspace name
+  name_prefix = var.workspace == "default" ? "" : "${var.workspace}-"
+  instance_names = (
+    length(var.instance_names) > 0 ?
+    var.instance_names: [for i in range(var.instance_count): format("docker-%02d", i + 1)]
+  )
+}
+
+resource "google_compute_instance" "cache" {
+  count=var.cache_enabled ? 1 : 0
+  name="${local.name_prefix}${var.cache_name}"
+  machine_type=var.cache_machine_type
+  zone=var.zone
+  boot_disk {
+    initialize_params {
+      image="rocky-linux-cloud/rocky-linux-9"
+      size=var.cache_disk_size
+    }
+  }
+  network_interface {
+    network="default"
+    access_config {}
+  }
+  metadata = {
+    startup-script=file("${path.module}/cache.sh")
+  }
+  tags=["giac-cache"]
+}
+
+locals {
+  cache_ip = var.cache_enabled ? google_compute_instance.cache[0].network_interface[0].network_ip : ""
+}
+
 resource "google_compute_instance" "vm_instance" {
-  name="docker-01"
+  for_each=toset(local.instance_names)
+  name="${local.name_prefix}${each.key}"
   machine_type=var.instance_machine_type
   zone=var.zone
   boot_disk {
@@ -40,11 +75,37 @@ resource "google_compute_instance" "vm_instance" {
   }
   metadata = {
     ssh-keys="ansible:${file(local.resolved_ansible_pubkey)}"
-    startup-script=file("${path.module}/startup.sh")
+    startup-script=var.baked_image && !var.cache_enabled ? "" : file("${path.module}/startup.sh")
+    giac-cache=local.cache_ip
   }
   tags=var.instance_tags
+  lifecycle {
+    # Running instances keep the image they booted from, a new golden image or a fallback to the stock image only
+    # applies to new instances
+    ignore_changes=[boot_disk[0].initialize_params[0].image]
+  }
+}
+
+moved {
+  from=google_compute_instance.vm_instance
+  to=google_compute_instance.vm_instance["docker-01"]
+}
+
+output "instances" {
+  value={for name, vm in google_compute_instance.vm_instance: name => vm.network_interface[0].access_config[0].nat_ip}
 }
 
-output "instance_name" {value=google_compute_instance.vm_instance.name}
+output "boot_images" {
+  value={for name, vm in google_compute_instance.vm_instance: name => vm.boot_disk[0].initialize_params[0].image}
+}
 
-output "instance_ip" {value=google_compute_instance.vm_instance.network_interface[0].access_config[0].nat_ip}
+output "cache" {
+  value={for key, url in {
+    package_mirror="http://${local.cache_ip}:8080"
+    registry_mirror="${local.cache_ip}:5000"
+  }: key => url if var.cache_enabled}
+}
+
+output "machine_type" {
+  value=var.instance_machine_type
+}
@@ -3,6 +3,39 @@
 exec > /var/log/startup-script.log 2>&1
 set -xe
 
+# Point the package manager and Docker at the fleet cache VM when giac created one (giac-cache metadata). The wait for
+# the cache is kept well below the 600s giac waits for the startup marker
+cache=$(curl -sf -H 'Metadata-Flavor: Google' \
+  http://metadata.google.internal/computeMetadata/v1/instance/attributes/giac-cache || true)
+if [ -n "$cache" ]; then
+  for _ in $(seq 24); do
+    curl -sf --max-time 3 "http://$cache:8080/healthz" && break
+    sleep 5
+  done
+  if curl -sf --max-time 3 "http://$cache:8080/healthz"; then
+    mirror="http://$cache:8080"
+    if ls /etc/yum.repos.d/rocky*.repo; then
+      sed -i -e 's|^mirrorlist=|#mirrorlist=|' \
+        -e "s|^#\?baseurl=http://dl.rockylinux.org/|baseurl=$mirror/dl.rockylinux.org/|" /etc/yum.repos.d/rocky*.repo
+    fi
+    if [ -d /etc/apt ]; then
+      find /etc/apt -name '*.list' -o -name '*.sources' | xargs -r sed -i -E \
+        "s#https?://([a-z0-9.-]+\.)?(deb\.debian\.org|archive\.ubuntu\.com)/#$mirror/\2/#g"
+    fi
+    mkdir -p /etc/docker
+    echo "{\"registry-mirrors\": [\"http://$cache:5000\"], \"insecure-registries\": [\"$cache:5000\"]}" \
+      > /etc/docker/daemon.json
+    systemctl try-restart docker || true
+  fi
+fi
+
+# A golden image already went through the package installs when it was baked. giac waits for /run/startup-done, which
+# lives on a tmpfs and is written on every boot, so it never starts configuring a host while this script still runs
+if [ -f /var/log/startup-done.marker ]; then
+  echo "done" > /run/startup-done
+  exit 0
+fi
+
 if [ -f /etc/os-release ]; then
   # shellcheck disable=SC1091
   source /etc/os-release
@@ -21,4 +54,5 @@ if [[ "$ID" =~ (rhel|rocky|centos|fedora|ol) ]]; then
 fi
 
 echo "done" > /var/log/startup-done.marker
+echo "done" > /run/startup-done
 exit 0
@@ -3,6 +3,12 @@ variable "project_id" {
   default=""
 }
 
+variable "workspace" {
+  type=string
+  description="giac workspace, prefixes the instance and cache names outside the default workspace"
+  default="default"
+}
+
 variable "region" {
   type=string
   default="us-central1"
@@ -18,6 +24,18 @@ variable "instance_tags" {
   default=["web", "ssh"]
 }
 
+variable "instance_count" {
+  type=number
+  description="Number of instances to create when instance_names is empty (named docker-01..docker-NN)"
+  default=1
+}
+
+variable "instance_names" {
+  type=list(string)
+  description="Explicit list of instance names to create. Overrides instance_count when set"
+  default=[]
+}
+
 variable "instance_machine_type" {
   type=string
   default="e2-highcpu-2"
@@ -28,6 +46,34 @@ variable "boot_image" {
   default="rocky-linux-cloud/rocky-linux-9"
 }
 
+variable "baked_image" {
+  type=bool
+  description="boot_image is a giac golden image with Python and Docker installed, skip the startup script"
+  default=false
+}
+
+variable "cache_enabled" {
+  type=bool
+  description="Create a cache VM with a package proxy and a Docker pull-through registry mirror and point the hosts at it"
+  default=false
+}
+
+variable "cache_name" {
+  type=string
+  default="giac-cache"
+}
+
+variable "cache_machine_type" {
+  type=string
+  default="e2-small"
+}
+
+variable "cache_disk_size" {
+  type=number
+  description="Boot disk size of the cache VM in GB, holds the cached packages and images"
+  default=50
+}
+
 variable "ansible_ssh_pub_key_file" {
   type=string
   description="Path to the Ansible SSH public key"
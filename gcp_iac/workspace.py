@@ -0,0 +1,223 @@
+from contextlib import contextmanager
+from fcntl import LOCK_EX, LOCK_NB, LOCK_UN, flock
+from os import getpid
+from pathlib import Path
+from re import MULTILINE, fullmatch, search, subn
+from time import monotonic, sleep
+from typing import Iterator
+
+
+DEFAULT_WORKSPACE = 'default'
+CONFIG_PATTERNS = ('*.tf', '*.sh')
+
+
+class WorkspaceLocked(Exception):
+    """Raised when a workspace is locked by another giac run"""
+
+
+@contextmanager
+def file_lock(path: str, timeout: float = 0.0) -> Iterator[None]:
+    """Hold an exclusive advisory lock on a file. The holder writes its PID into the file so a blocked run can tell
+    who holds it. The lock is released by the kernel if the holder dies.
+
+    Args:
+        path (str): path to the lock file
+        timeout (float, optional): seconds to wait for the lock. Defaults to 0.0 (fail right away).
+
+    Raises:
+        WorkspaceLocked: if the lock is still held by another process after timeout seconds
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a+') as file:
+        deadline = monotonic() + timeout
+        while True:
+            try:
+                flock(file, LOCK_EX | LOCK_NB)
+                break
+            except BlockingIOError:
+                if monotonic() >= deadline:
+                    file.seek(0)
+                    holder = file.read().strip() or 'unknown'
+                    raise WorkspaceLocked(f'{path} is locked by another giac run (pid {holder})')
+                sleep(0.2)
+        try:
+            file.seek(0)
+            file.truncate()
+            file.write(f'{getpid()}\n')
+            file.flush()
+            yield
+        finally:
+            file.seek(0)
+            file.truncate()
+            flock(file, LOCK_UN)
+
+
+def save_tf_vars(path: str, values: dict) -> None:
+    """Set variables in a tfvars file so later runs plan with them. Existing assignments are replaced in place, new
+    ones are appended.
+
+    Args:
+        path (str): tfvars file
+        values (dict): variable name to value mapping (str, int or bool)
+    """
+    path = Path(path)
+    data = path.read_text() if path.exists() else ''
+    for var, value in values.items():
+        if isinstance(value, bool):
+            value = 'true' if value else 'false'
+        elif isinstance(value, str):
+            value = f'"{value}"'
+        line = f'{var}={value}'
+        data, replaced = subn(rf'^\s*{var}\s*=.*$', lambda _: line, data, count=1, flags=MULTILINE)
+        if not replaced:
+            data = (data.rstrip('\n') + '\n' if data.strip() else '') + line + '\n'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(data)
+
+
+class Workspace():
+    def __init__(self, name: str = DEFAULT_WORKSPACE, package_dir: str = None):
+        """Named environment with its own Terraform working directory, tfvars, state, saved plan and Ansible client
+        directories so independent environments can be applied at the same time. The working directory of a named
+        workspace links to the Terraform configuration of the package, and its tfvars start as a copy of the default
+        tfvars with the key file paths made absolute and the workspace variable set, which prefixes the GCP resource
+        names so workspaces sharing a project do not collide. The default workspace keeps the original package layout
+        and unprefixed names.
+
+        Args:
+            name (str, optional): workspace name (a lowercase letter, then lowercase letters, digits and -, it is part
+            of the GCP resource names). Defaults to 'default'.
+            package_dir (str, optional): path to the gcp_iac package. Defaults to None (this package).
+
+        Raises:
+            ValueError: if the workspace name is invalid
+        """
+        if not fullmatch(r'[a-z][a-z0-9-]{0,31}', name or ''):
+            raise ValueError(f'Invalid workspace name: {name!r} (start with a lowercase letter, then use lowercase '
+                             'letters, digits and -)')
+        self.name = name
+        self.package_dir = Path(package_dir) if package_dir else Path(__file__).parent
+
+    @property
+    def is_default(self) -> bool:
+        """Check if this is the default workspace
+
+        Returns:
+            bool: True for the default workspace, False otherwise
+        """
+        return self.name == DEFAULT_WORKSPACE
+
+    @property
+    def directory(self) -> Path:
+        """Get the directory holding the workspace files
+
+        Returns:
+            Path: workspace directory
+        """
+        if self.is_default:
+            return self.package_dir / 'gcp_env'
+        return self.package_dir / 'gcp_env' / 'workspaces' / self.name
+
+    @property
+    def terraform_dir(self) -> Path:
+        """Get the Terraform working directory of the workspace
+
+        Returns:
+            Path: Terraform working directory
+        """
+        if self.is_default:
+            return self.package_dir / 'terraform'
+        return self.directory / 'terraform'
+
+    @property
+    def env_vars_file(self) -> Path:
+        """Get the Terraform variables file of the workspace
+
+        Returns:
+            Path: tfvars file
+        """
+        return self.directory / 'env.tfvars'
+
+    @property
+    def clients_dir(self) -> Path:
+        """Get the directory of the Ansible client directories of the workspace
+
+        Returns:
+            Path: Ansible clients directory
+        """
+        if self.is_default:
+            return self.package_dir / 'ansible' / 'clients'
+        return self.directory / 'clients'
+
+    @property
+    def facts_dir(self) -> Path:
+        """Get the Ansible fact cache directory of the workspace. Facts are cached by inventory hostname, which is the
+        same docker-NN name in every workspace.
+
+        Returns:
+            Path: fact cache directory
+        """
+        return self.directory / 'facts'
+
+    @property
+    def lock_file(self) -> Path:
+        """Get the lock file of the workspace
+
+        Returns:
+            Path: lock file
+        """
+        return self.directory / '.giac.lock'
+
+    def lock(self, timeout: float = 0.0):
+        """Lock the workspace for a run
+
+        Args:
+            timeout (float, optional): seconds to wait for the lock. Defaults to 0.0 (fail right away).
+
+        Returns:
+            ContextManager: held lock
+        """
+        return file_lock(str(self.lock_file), timeout)
+
+    def __link_config(self) -> None:
+        """Link the Terraform configuration files of the package into the working directory and drop links to files
+        that no longer exist"""
+        source_dir = self.package_dir / 'terraform'
+        sources = {path.name: path for pattern in CONFIG_PATTERNS for path in source_dir.glob(pattern)}
+        for pattern in CONFIG_PATTERNS:
+            for path in self.terraform_dir.glob(pattern):
+                if path.is_symlink() and path.name not in sources:
+                    path.unlink()
+        for name, source in sources.items():
+            target = self.terraform_dir / name
+            if target.is_symlink() and target.resolve() == source.resolve():
+                continue
+            target.unlink(missing_ok=True)
+            target.symlink_to(source.resolve())
+
+    def __create_env_vars_file(self) -> None:
+        """Create the tfvars of the workspace from the default tfvars. The key files are referenced relative to the
+        package Terraform module, so their absolute paths are set explicitly. The workspace variable is set on every
+        run so tfvars created by an older release or copied from another workspace get the right name prefix."""
+        if self.env_vars_file.exists():
+            if not search(rf'^\s*workspace\s*=\s*"{self.name}"\s*$', self.env_vars_file.read_text(), MULTILINE):
+                save_tf_vars(str(self.env_vars_file), {'workspace': self.name})
+            return
+        default = Workspace(DEFAULT_WORKSPACE, str(self.package_dir)).env_vars_file
+        data = default.read_text().rstrip('\n') + '\n' if default.exists() else ''
+        keys_dir = (self.package_dir / 'gcp_env' / 'keys').resolve()
+        for var, path in [('gcp_iac_sa_file', keys_dir / '.sa.json'),
+                          ('ansible_ssh_pub_key_file', keys_dir / '.ansible_rsa.pub')]:
+            if not search(rf'^\s*{var}\s*=', data, MULTILINE):
+                data += f'{var}="{path}"\n'
+        self.env_vars_file.write_text(data)
+        save_tf_vars(str(self.env_vars_file), {'workspace': self.name})
+
+    def create(self) -> None:
+        """Create the workspace directories and files. Safe to call on every run."""
+        if self.is_default:
+            return
+        self.terraform_dir.mkdir(parents=True, exist_ok=True)
+        self.clients_dir.mkdir(parents=True, exist_ok=True)
+        self.__link_config()
+        self.__create_env_vars_file()
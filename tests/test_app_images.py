@@ -0,0 +1,79 @@
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Thread
+
+from gcp_iac.app_images import AppImages
+
+
+class Registry(BaseHTTPRequestHandler):
+    manifests = set()
+    private = False
+    requests = []
+
+    def do_HEAD(self):
+        Registry.requests.append((self.command, self.path, self.headers.get('Accept', '')))
+        if Registry.private:
+            self.send_response(401)
+        else:
+            self.send_response(200 if self.path in Registry.manifests else 404)
+        self.end_headers()
+
+    def log_message(self, *_):
+        pass
+
+
+class TestAppImages(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Registry)
+        Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        files = Path(self.tmp.name)
+        for source in ['web/nginx.conf', 'php/Dockerfile', 'web/index.php', 'sql/init.sql']:
+            (files / source).parent.mkdir(parents=True, exist_ok=True)
+            (files / source).write_text(source)
+        registry = f'http://127.0.0.1:{self.server.server_address[1]}'
+        self.images = AppImages(str(files), registry, str(files / 'app_images.json'))
+        Registry.manifests, Registry.private, Registry.requests = set(), False, []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_manifest_url(self):
+        images = AppImages(self.tmp.name, 'us-docker.pkg.dev/project/repo', '/nonexistent')
+        self.assertEqual(images.manifest_url('app1_web'), 'https://us-docker.pkg.dev/v2/project/repo/app1_web/'
+                                                          f'manifests/{images.context_hash("app1_web")}')
+        self.assertTrue(self.images.manifest_url('app1_web').startswith('http://127.0.0.1:'))
+
+    def test_manifest_exists(self):
+        Registry.manifests.add(f'/v2/app1_web/manifests/{self.images.context_hash("app1_web")}')
+        self.assertTrue(self.images.manifest_exists('app1_web'))
+        method, _, accept = Registry.requests[0]
+        self.assertEqual(method, 'HEAD')
+        self.assertIn('application/vnd.oci.image.index.v1+json', accept)
+
+    def test_manifest_missing_after_registry_wipe(self):
+        self.images.record_pushed(list(self.images.tags().values()))
+        self.assertIn(self.images.tag('app1_php'), self.images.pushed())
+        self.assertIs(self.images.manifest_exists('app1_php'), False)
+
+    def test_registry_needs_credentials(self):
+        Registry.private = True
+        self.assertIsNone(self.images.manifest_exists('app1_db'))
+
+    def test_registry_unreachable(self):
+        images = AppImages(self.tmp.name, 'http://127.0.0.1:9', '/nonexistent')
+        self.assertIsNone(images.manifest_exists('app1_db', timeout=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import sys
+import unittest
+from pathlib import Path
+from statistics import median
+from subprocess import run
+from textwrap import dedent
+from time import perf_counter
+
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_MS = 100
+RUNS = 5
+HEAVY_MODULES = ['python_terraform', 'ansible_runner', 'ansible', 'googleapiclient', 'asyncio', 'gcp_iac.iac']
+MARKER = 'giac-modules:'
+HELP = dedent(f'''
+    import sys
+    sys.argv = ['giac', '--help']
+    from gcp_iac.cli import iac_parent
+    try:
+        iac_parent()
+    except SystemExit:
+        pass
+    print('\\n{MARKER}' + ','.join(sys.modules))
+''')
+
+
+def giac_help() -> tuple:
+    """Run giac --help in a fresh interpreter
+
+    Returns:
+        tuple: (wall time of the process in milliseconds, names of the modules it loaded)
+    """
+    began = perf_counter()
+    rsp = run([sys.executable, '-c', HELP], cwd=ROOT, capture_output=True, text=True, check=True)
+    elapsed = (perf_counter() - began) * 1000
+    return elapsed, set(rsp.stdout.rsplit(MARKER, 1)[-1].strip().split(','))
+
+
+class TestCliStartup(unittest.TestCase):
+    def test_help_loads_no_heavy_modules(self):
+        _, modules = giac_help()
+        self.assertEqual([name for name in HEAVY_MODULES if name in modules], [])
+
+    def test_help_within_budget(self):
+        giac_help()
+        elapsed = median(giac_help()[0] for _ in range(RUNS))
+        self.assertLess(elapsed, BUDGET_MS, f'giac --help took {elapsed:.1f}ms, budget is {BUDGET_MS}ms')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from pathlib import Path
+from re import fullmatch
+from tempfile import TemporaryDirectory
+
+from gcp_iac.image import BAKE_PLAYBOOKS, GoldenImage
+
+
+PACKAGE = Path(__file__).resolve().parent.parent / 'gcp_iac'
+
+
+class TestGoldenImage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.startup = root / 'startup.sh'
+        self.startup.write_text('#!/bin/bash\necho done\n')
+        self.playbooks = root / 'playbooks'
+        self.playbooks.mkdir()
+        for playbook in [*BAKE_PLAYBOOKS, 'deploy_app1.yml']:
+            (self.playbooks / playbook).write_text(f'- name: {playbook}\n')
+        (self.playbooks / 'templates').mkdir()
+        (self.playbooks / 'templates' / 'nginx.conf.j2').write_text('worker_processes 1;\n')
+        self.image = GoldenImage(str(self.startup), str(self.playbooks), str(root / 'golden_image.json'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sources_are_the_startup_script_and_bake_playbooks(self):
+        playbooks = [self.playbooks / name for name in sorted(BAKE_PLAYBOOKS)]
+        self.assertEqual(self.image.sources, [self.startup, *playbooks])
+
+    def test_package_sources_exist(self):
+        image = GoldenImage(f'{PACKAGE}/terraform/startup.sh', f'{PACKAGE}/ansible/playbooks', '/nonexistent')
+        self.assertTrue(all(path.is_file() for path in image.sources))
+        self.assertRegex(image.content_hash(), r'^[0-9a-f]{64}$')
+
+    def test_hash_changes_with_bake_inputs(self):
+        for path in [self.startup, *(self.playbooks / name for name in BAKE_PLAYBOOKS)]:
+            with self.subTest(path=path.name):
+                before = self.image.content_hash()
+                path.write_text(path.read_text() + '# changed\n')
+                self.assertNotEqual(self.image.content_hash(), before)
+
+    def test_hash_ignores_deploy_playbook_and_templates(self):
+        before = self.image.content_hash()
+        (self.playbooks / 'deploy_app1.yml').write_text('- name: changed\n')
+        (self.playbooks / 'templates' / 'nginx.conf.j2').write_text('worker_processes 4;\n')
+        (self.playbooks / 'new_playbook.yml').write_text('- name: new\n')
+        self.assertEqual(self.image.content_hash(), before)
+
+    def test_image_name_is_a_valid_gcp_name(self):
+        name = self.image.image_name()
+        self.assertTrue(name.startswith('giac-golden-'))
+        self.assertTrue(fullmatch(r'[a-z]([-a-z0-9]{0,61}[a-z0-9])?', name), name)
+        self.assertEqual(name, self.image.image_name(self.image.content_hash()))
+
+    def test_select_without_record(self):
+        self.assertEqual(self.image.load_record(), {})
+        self.assertIsNone(self.image.select())
+
+    def test_select_current_image(self):
+        record = self.image.save_record(self.image.content_hash())
+        self.assertEqual(self.image.load_record(), record)
+        self.assertEqual(self.image.select(), record['name'])
+
+    def test_select_stale_image(self):
+        self.image.save_record(self.image.content_hash())
+        (self.playbooks / 'bake_image.yml').write_text('- name: changed\n')
+        self.assertIsNone(self.image.select())
+        self.assertTrue(self.image.load_record())
+
+    def test_select_record_without_name(self):
+        content_hash = self.image.content_hash()
+        self.assertEqual(self.image.select({'hash': content_hash}), self.image.image_name(content_hash))
+
+    def test_corrupt_record(self):
+        self.image.record_file.write_text('{not json')
+        self.assertEqual(self.image.load_record(), {})
+        self.assertIsNone(self.image.select())
+
+
+if __name__ == '__main__':
+    unittest.main()
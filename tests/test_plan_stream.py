@@ -0,0 +1,55 @@
+import unittest
+from io import StringIO
+from json import dumps
+from tracemalloc import get_traced_memory, start, stop
+
+from gcp_iac.plan_stream import PlanStream, created_instances
+
+
+def change(address: str, actions: list, index=None, name: str = '', kind: str = 'google_compute_instance') -> dict:
+    return {'address': address, 'type': kind, 'name': address.split('.')[-1].split('[')[0], 'index': index,
+            'change': {'actions': actions, 'before': None, 'after': {'name': name, 'metadata': {'x': 'y' * 100}}}}
+
+
+def plan(changes: list) -> str:
+    return dumps({'format_version': '1.2', 'planned_values': {'root_module': {}}, 'resource_changes': changes,
+                  'prior_state': {'values': {'root_module': {'resources': [{'values': {'name': 'docker-99'}}]}}},
+                  'configuration': {'root_module': {}}})
+
+
+class TestPlanStream(unittest.TestCase):
+    def test_created_instances_from_stream(self):
+        changes = [
+            change('google_compute_instance.vm_instance["docker-01"]', ['create'], 'docker-01', 'staging-docker-01'),
+            change('google_compute_instance.vm_instance["docker-02"]', ['delete', 'create'], 'docker-02'),
+            change('google_compute_instance.vm_instance["docker-03"]', ['no-op'], 'docker-03'),
+            change('google_compute_instance.vm_instance["docker-04"]', ['delete'], 'docker-04'),
+            change('google_compute_instance.cache[0]', ['create'], 0, 'staging-giac-cache'),
+            change('google_compute_firewall.web', ['create'], None, 'web', 'google_compute_firewall'),
+        ]
+        stream = PlanStream(StringIO(plan(changes)), chunk_size=64)
+        self.assertEqual(created_instances(stream.resource_changes()), {'docker-01', 'docker-02', 'staging-giac-cache'})
+
+    def test_resource_changes_are_slim(self):
+        address = 'google_compute_instance.vm_instance["docker-01"]'
+        document = plan([change(address, ['create'], 'docker-01', 'docker-01')])
+        changes = list(PlanStream(StringIO(document)).resource_changes())
+        self.assertEqual(changes, [{'address': address,
+                                    'type': 'google_compute_instance', 'name': 'vm_instance', 'index': 'docker-01',
+                                    'change': {'actions': ['create'], 'before': {'name': ''},
+                                               'after': {'name': 'docker-01'}}}])
+
+    def test_memory_does_not_grow_with_the_plan(self):
+        peaks = []
+        for count in [2000, 10000]:
+            document = StringIO(plan([change(f'google_compute_instance.vm_instance["docker-{index}"]', ['delete'],
+                                             f'docker-{index}') for index in range(count)]))
+            start()
+            self.assertEqual(sum(1 for _ in PlanStream(document).resource_changes()), count)
+            peaks.append(get_traced_memory()[1])
+            stop()
+        self.assertLess(peaks[1], peaks[0] * 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
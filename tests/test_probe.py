@@ -0,0 +1,119 @@
+import socket
+import unittest
+from threading import Event, Thread
+from time import monotonic, sleep
+
+from gcp_iac.probe import ReadinessProber
+
+
+class LocalServer():
+    def __init__(self, greeting: bytes = b'SSH-2.0-OpenSSH_9.6\r\n', delay: float = 0.0, port: int = 0):
+        """Listener on 127.0.0.1 that sends a greeting to every connection and keeps it open until stopped
+
+        Args:
+            greeting (bytes, optional): bytes sent after accepting. Defaults to an SSH banner. Empty sends nothing.
+            delay (float, optional): seconds to wait before listening. Defaults to 0.0.
+            port (int, optional): port to listen on. Defaults to 0 (any free port).
+        """
+        self.greeting = greeting
+        self.delay = delay
+        self.port = port or free_port()
+        self.stopped = Event()
+        self.connections = []
+        self.thread = Thread(target=self.__serve, daemon=True)
+
+    def __serve(self) -> None:
+        if self.stopped.wait(self.delay):
+            return
+        with socket.socket() as server:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server.bind(('127.0.0.1', self.port))
+            server.listen()
+            server.settimeout(0.05)
+            while not self.stopped.is_set():
+                try:
+                    connection, _ = server.accept()
+                except socket.timeout:
+                    continue
+                self.connections.append(connection)
+                if self.greeting:
+                    connection.sendall(self.greeting)
+
+    def __enter__(self) -> 'LocalServer':
+        self.thread.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.stopped.set()
+        self.thread.join()
+        for connection in self.connections:
+            connection.close()
+
+
+def free_port() -> int:
+    """Get a local port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class TestReadinessProber(unittest.TestCase):
+    def test_ssh_banner(self):
+        with LocalServer() as server:
+            sleep(0.05)
+            self.assertEqual(ReadinessProber(server.port).run({'docker-01': '127.0.0.1'}), {'docker-01': True})
+
+    def test_banner_after_other_lines(self):
+        with LocalServer(b'Welcome\r\nSSH-2.0-OpenSSH_9.6\r\n') as server:
+            sleep(0.05)
+            self.assertTrue(ReadinessProber(server.port).run({'docker-01': '127.0.0.1'})['docker-01'])
+
+    def test_closed_port(self):
+        prober = ReadinessProber(free_port(), deadline=0.3, base_delay=0.05)
+        began = monotonic()
+        self.assertEqual(prober.run({'docker-01': '127.0.0.1'}), {'docker-01': False})
+        self.assertLess(monotonic() - began, 2)
+
+    def test_not_ssh(self):
+        with LocalServer(b'HTTP/1.1 400 Bad Request\r\n\r\n') as server:
+            sleep(0.05)
+            prober = ReadinessProber(server.port, deadline=0.3, connect_timeout=0.3, base_delay=0.05)
+            self.assertEqual(prober.run({'docker-01': '127.0.0.1'}), {'docker-01': False})
+
+    def test_silent_server_times_out(self):
+        with LocalServer(b'') as server:
+            sleep(0.05)
+            prober = ReadinessProber(server.port, deadline=0.1, connect_timeout=0.3)
+            began = monotonic()
+            self.assertFalse(prober.run({'docker-01': '127.0.0.1'})['docker-01'])
+            elapsed = monotonic() - began
+        self.assertGreaterEqual(elapsed, 0.3)
+        self.assertLess(elapsed, 2)
+
+    def test_host_becomes_ready(self):
+        with LocalServer(delay=0.3) as server:
+            prober = ReadinessProber(server.port, deadline=5, base_delay=0.05, max_delay=0.1)
+            self.assertTrue(prober.run({'docker-01': '127.0.0.1'})['docker-01'])
+
+    def test_mixed_hosts_report_ready_hosts_only(self):
+        ready = []
+        with LocalServer() as server:
+            sleep(0.05)
+            prober = ReadinessProber(server.port, deadline=0.3, base_delay=0.05)
+            results = prober.run({'docker-01': '127.0.0.1', 'docker-02': '127.0.0.2'},
+                                 lambda name, ip: ready.append((name, ip)))
+        self.assertEqual(results, {'docker-01': True, 'docker-02': False})
+        self.assertEqual(ready, [('docker-01', '127.0.0.1')])
+
+    def test_no_hosts(self):
+        self.assertEqual(ReadinessProber().run({}), {})
+
+    def test_backoff_bounds(self):
+        prober = ReadinessProber(base_delay=0.5, max_delay=10.0)
+        for attempt in range(10):
+            delay = min(10.0, 0.5 * 2 ** attempt)
+            self.assertTrue(delay / 2 <= prober.backoff(attempt) <= delay)
+
+
+if __name__ == '__main__':
+    unittest.main()
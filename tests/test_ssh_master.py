@@ -0,0 +1,27 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Barrier
+
+from gcp_iac.ssh_master import SSHMasters
+
+
+class TestSSHMasters(unittest.TestCase):
+    def test_control_dir_created_once_across_threads(self):
+        masters = SSHMasters('/dev/null')
+        barrier = Barrier(32)
+
+        def control_path(index: int) -> str:
+            barrier.wait()
+            return masters.control_path(f'10.0.0.{index}')
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            paths = list(pool.map(control_path, range(32)))
+        control_dir = masters.control_dir
+        self.assertEqual({str(Path(path).parent) for path in paths}, {control_dir})
+        masters.stop_all()
+        self.assertFalse(Path(control_dir).exists())
+
+
+if __name__ == '__main__':
+    unittest.main()